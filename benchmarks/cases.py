@@ -0,0 +1,112 @@
+"""
+The benchmarked code paths.
+
+Each case is a function that takes the scale `n` and does any setup
+(generating synthetic data with `winlp_scripts.fake_services.synthetic`)
+outside the timed region, returning the function to time.
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+
+from winlp_scripts.fake_services import synthetic
+from winlp_scripts.fake_services.data import SUBMISSION_FIELDS
+from winlp_scripts.fake_services.server import xls_bytes
+from winlp_scripts.utils import load_yml
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LETTER_TEMPLATE = os.path.join(ROOT, 'data', 'email_templates', 'WiNLP Travel Grant Letter.docx')
+APPROVAL_TEMPLATE = os.path.join(ROOT, 'data', 'email_templates', 'travel_grant_approval.txt')
+BUDGET_MAPPING = os.path.join(ROOT, 'data', 'budget_mapping.yml')
+
+# name -> (setup function, largest n to run it at, or None)
+CASES = OrderedDict()
+
+def case(name: str, max_n: int = None):
+    def register(setup):
+        CASES[name] = (setup, max_n)
+        return setup
+    return register
+
+def load_script(name: str):
+    """
+    Import one of the scripts in scripts/ as a module.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, 'scripts', name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def grant_keys(n: int):
+    return [{'name': 'Recipient {}'.format(i), 'paper_title': 'Paper {}'.format(i),
+             'date': '01 Jul 2020', 'amount': '{:.02f}'.format(i % 1500),
+             'text_amount': 'some dollars'} for i in range(n)]
+
+@case('replace_keys')
+def replace_keys_case(n: int):
+    from winlp_scripts.template import replace_keys
+    with open(APPROVAL_TEMPLATE) as template_f:
+        text = template_f.read()
+    keys = grant_keys(n)
+    return lambda: [replace_keys(text, k) for k in keys]
+
+# Each letter takes milliseconds to load and save
+@case('docx_template', max_n=1000)
+def docx_template_case(n: int):
+    from winlp_scripts.template import docx_template
+    keys = grant_keys(n)
+
+    def render():
+        for k in keys:
+            docx_template(LETTER_TEMPLATE, k).save(io.BytesIO())
+    return render
+
+@case('assign_submissions')
+def assign_submissions_case(n: int):
+    workshop_assignments = load_script('workshop_assignments')
+    submissions = synthetic.submissions(n, text_size=10)
+    return lambda: list(workshop_assignments.assign_submissions(submissions, k=1, seed=1))
+
+@case('parse_sheet')
+def parse_sheet_case(n: int):
+    parse_reimbursements = load_script('parse_reimbursements')
+    responses = synthetic.survey_responses(n)
+    zip_bytes = synthetic.attachments_zip(responses)
+
+    def parse():
+        with tempfile.TemporaryDirectory() as output_dir:
+            with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_f:
+                parse_reimbursements.parse_sheet(responses, output_dir, zip_f, 66.4)
+    return parse
+
+@case('analyze_sheet')
+def analyze_sheet_case(n: int):
+    travel_grant_stats = load_script('travel_grant_stats')
+    mapping = load_yml(BUDGET_MAPPING)
+    rows = synthetic.budget_sheet(mapping, n)[1:]
+
+    def analyze():
+        with contextlib.redirect_stdout(io.StringIO()):
+            travel_grant_stats.analyze_sheet(rows, mapping)
+    return analyze
+
+@case('read_spreadsheet')
+def read_spreadsheet_case(n: int):
+    from winlp_scripts.softconf import read_spreadsheet
+    content = xls_bytes(synthetic.submissions(n), SUBMISSION_FIELDS)
+    return lambda: read_spreadsheet(content, SUBMISSION_FIELDS)
+
+@case('generate_notes')
+def generate_notes_case(n: int):
+    send_author_notes = load_script('send_author_notes')
+    from pandas import DataFrame
+    submissions = synthetic.submissions(n, text_size=10)
+    rows = synthetic.notes_sheet(submissions)
+    notes = DataFrame(rows[1:], columns=rows[0])
+    template = os.path.join(ROOT, 'data', 'email_templates', 'acceptance_notes.txt')
+    return lambda: list(send_author_notes.generate_notes(submissions, notes, template))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Time the hot paths of the scripts on synthetic data at several
+scales, and save the results as JSON (by default to
+benchmarks/results/<commit>.json), so that runs on different
+commits can be compared:
+
+    export PYTHONPATH=.; python3 benchmarks/run.py
+    export PYTHONPATH=.; python3 benchmarks/run.py --compare benchmarks/results/<other commit>.json
+"""
+
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.cases import CASES, ROOT
+
+DEFAULT_SCALES = [100, 1000, 10000]
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Slowdown (relative to the baseline median) reported as a regression
+REGRESSION_RATIO = 1.2
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def time_case(setup, n: int, repeat: int) -> dict:
+    """
+    Run the case set up at scale `n` `repeat` times, and return the timings.
+    """
+    func = setup(n)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'n': n, 'repeat': repeat, 'times': times,
+            'min': min(times), 'median': statistics.median(times)}
+
+def run(names, scales, repeat: int, ignore_limits: bool = False) -> dict:
+    results = {}
+    for name in names:
+        setup, max_n = CASES[name]
+        results[name] = {}
+        for n in scales:
+            if max_n is not None and n > max_n and not ignore_limits:
+                print('{:<24s} {:>6d}  skipped (limit {})'.format(name, n, max_n), file=sys.stderr)
+                continue
+            result = time_case(setup, n, repeat)
+            results[name][str(n)] = result
+            print('{:<24s} {:>6d}  {:10.4f}s'.format(name, n, result['median']), file=sys.stderr)
+    return results
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Return (name, n, baseline median, median, ratio) for every
+    case run in both `results` and `baseline`.
+    """
+    rows = []
+    for name, by_n in results.items():
+        for n, result in by_n.items():
+            before = baseline.get(name, {}).get(n)
+            if before:
+                rows.append((name, int(n), before['median'], result['median'],
+                             result['median'] / before['median']))
+    return rows
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('names', nargs='*', help='Cases to run (default: all of them). One of: {}'.format(', '.join(CASES)))
+    p.add_argument('-s', '--scales', nargs='+', type=int, default=DEFAULT_SCALES)
+    p.add_argument('-r', '--repeat', type=int, default=3)
+    p.add_argument('--ignore-limits', action='store_true', help='Also run cases at scales above their limits.')
+    p.add_argument('-o', '--output', help='Path to write the JSON results (default: benchmarks/results/<commit>.json).')
+    p.add_argument('--compare', help='JSON results of a previous run to compare against.')
+
+    args = p.parse_args()
+
+    unknown = [name for name in args.names if name not in CASES]
+    if unknown:
+        p.error('Unknown cases: {}'.format(', '.join(unknown)))
+
+    commit = git_commit()
+    results = run(args.names or list(CASES), args.scales, args.repeat, args.ignore_limits)
+
+    output = args.output or os.path.join(RESULTS_DIR, '{}.json'.format(commit))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as output_f:
+        json.dump({'commit': commit,
+                   'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'results': results}, output_f, indent=2)
+    print('Wrote {}'.format(output), file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as baseline_f:
+            baseline = json.load(baseline_f)
+        print('{:<24s} {:>6s} {:>10s} {:>10s} {:>7s}'.format('case', 'n', 'before', 'after', 'ratio'))
+        for name, n, before, after, ratio in compare(results, baseline['results']):
+            flag = '  REGRESSION' if ratio > REGRESSION_RATIO else ''
+            print('{:<24s} {:>6d} {:10.4f} {:10.4f} {:7.2f}{}'.format(name, n, before, after, ratio, flag))
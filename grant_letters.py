@@ -27,11 +27,14 @@ import yaml
 from docx import Document
 from docx.text.paragraph import Paragraph
 import xlrd
+from winlp_scripts.profiling import add_profile_arguments, start_profiling, timed
+from winlp_scripts.template import RenderManifest
 
 import time
 
 
 
+@timed('gmail.send', items=1)
 def gmail_send(to_addr, msg: MIMEMultipart):
     server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
     server.ehlo()
@@ -40,6 +43,7 @@ def gmail_send(to_addr, msg: MIMEMultipart):
     server.close()
     return server
 
+@timed('render.docx', items=1)
 def modify_docx(docx_path: str,
                 recipient_name: str,
                 award_amt: float,
@@ -72,6 +76,10 @@ def generate_email(config: dict,
     workbook = xlrd.open_workbook(spreadsheet_path)
     worksheet = workbook.sheet_by_index(1)
 
+    dir = os.path.join(os.getcwd(), 'letters')
+    os.makedirs(dir, exist_ok=True)
+    manifest = RenderManifest(dir)
+
     # Get non-header rows
     for i, row in enumerate(worksheet.get_rows()):
 
@@ -92,16 +100,19 @@ def generate_email(config: dict,
         if sent or award_amt == 0:
             continue
 
-        # Create the new document
-        document = modify_docx(docx_path, recipient_name, award_amt, paper_title, sent)
-
         # Generate the directory to store the letters, and save
-        # the modified document.
+        # the modified document, unless the letter is already
+        # there and the recipient's details haven't changed.
         filename = 'WiNLP Travel Grant Invitation Letter - {}.docx'.format(recipient_name)
-        dir = os.path.join(os.getcwd(), 'letters')
         fullpath = os.path.join(dir, filename)
-        os.makedirs(dir, exist_ok=True)
-        document.save(fullpath)
+        keys = {'name': recipient_name, 'amount': award_amt, 'paper_title': paper_title}
+        if manifest.is_current(fullpath, docx_path, keys):
+            document = Document(fullpath)
+        else:
+            # Create the new document
+            document = modify_docx(docx_path, recipient_name, award_amt, paper_title, sent)
+            document.save(fullpath)
+            manifest.record(fullpath, docx_path, keys)
 
         # Now, generate the email
 
@@ -117,8 +128,11 @@ def generate_email(config: dict,
         # Add the docx
         doc_attach.seek(0)
         msg.attach(MIMEApplication(doc_attach.read(), Name=filename))
+        manifest.save()
         return msg
 
+    manifest.save()
+
 
 
         # gmail_send(email, msg)
@@ -152,7 +166,9 @@ if __name__ == '__main__':
     p.add_argument('-c', '--config', help='Path to the email config file.', default='config.yml', type=load_yml)
     p.add_argument('-w', '--worksheet', help='Worksheet number for the grant info', default=1)
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     # Generate the email
     msg = generate_email(args.config,
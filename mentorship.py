@@ -27,11 +27,13 @@ import yaml
 from docx import Document
 from docx.text.paragraph import Paragraph
 import xlrd
+from winlp_scripts.profiling import add_profile_arguments, start_profiling, timed
 
 import time
 
 
 
+@timed('gmail.send', items=1)
 def gmail_send(config:dict, to_addr, msg: MIMEMultipart):
     server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
     server.ehlo()
@@ -40,6 +42,7 @@ def gmail_send(config:dict, to_addr, msg: MIMEMultipart):
     server.close()
     return server
 
+@timed('render.docx', items=1)
 def modify_docx(docx_path: str,
                 recipient_name: str,
                 award_amt: float,
@@ -159,7 +162,9 @@ if __name__ == '__main__':
     p.add_argument('-c', '--config', help='Path to the email config file.', default='config.yml', type=load_yml)
     p.add_argument('-w', '--worksheet', help='Worksheet number for the grant info', default=1)
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     # Generate the email
     msg = generate_email(args.config,
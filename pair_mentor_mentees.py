@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+This script pairs mentors with mentees, based on the answers they
+gave to the mentorship program form.
+
+It expects one spreadsheet of mentor responses and one of mentee
+responses, each with a range of "Yes"/"No" columns (e.g. topics of
+interest, or available time slots) in the same order. Mentees are
+assigned to the mentor they share the most "Yes" answers with, with
+each mentor taking at most --capacity mentees.
+"""
+
+import os
+from argparse import ArgumentParser
+
+import pandas
+
+from winlp_scripts.matching import answer_columns, pack_answers, overlap_matrix, match_mentors
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+
+def load_responses(path: str) -> pandas.DataFrame:
+    """
+    Load survey responses from a .csv or excel file.
+    """
+    if path.endswith('.csv'):
+        return pandas.read_csv(path)
+    return pandas.read_excel(path)
+
+def pair_mentors(mentors: pandas.DataFrame, mentees: pandas.DataFrame,
+                 mentor_cols: str, mentee_cols: str, capacity: int = 1) -> pandas.DataFrame:
+    """
+    Return a dataframe with one row per pairing, with the mentor and
+    mentee rows (prefixed with "mentor_" and "mentee_") and their overlap.
+
+    `mentor_cols` and `mentee_cols` are column letter ranges, like "F:P".
+    """
+    mentor_answers = pack_answers(mentors, answer_columns(mentors, *mentor_cols.split(':')))
+    mentee_answers = pack_answers(mentees, answer_columns(mentees, *mentee_cols.split(':')))
+
+    overlap = overlap_matrix(mentor_answers, mentee_answers)
+    pairs = match_mentors(overlap, capacity)
+
+    mentor_idx, mentee_idx, overlaps = zip(*pairs) if pairs else ([], [], [])
+    paired_mentors = mentors.iloc[list(mentor_idx)].add_prefix('mentor_').reset_index(drop=True)
+    paired_mentees = mentees.iloc[list(mentee_idx)].add_prefix('mentee_').reset_index(drop=True)
+    return pandas.concat([paired_mentors, paired_mentees], axis=1).assign(overlap=list(overlaps))
+
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('--mentors', required=True, help='Spreadsheet (.csv or excel) of mentor responses.')
+    p.add_argument('--mentees', required=True, help='Spreadsheet (.csv or excel) of mentee responses.')
+    p.add_argument('--mentor-cols', required=True, help='Range of Yes/No columns in the mentor sheet, e.g. "F:P"')
+    p.add_argument('--mentee-cols', required=True, help='Range of Yes/No columns in the mentee sheet, e.g. "F:P"')
+    p.add_argument('-n', '--capacity', type=int, default=1, help='Maximum number of mentees per mentor.')
+    p.add_argument('-o', '--output', default='mentor_pairs.csv', help='Path to write the pairings to.')
+    p.add_argument('-t', '--template', help='Optional template (e.g. mentors/mentorship_template) to fill for each pair.')
+    p.add_argument('-d', '--letters', default='mentors/letters', help='Directory to write the filled templates to.')
+
+    add_profile_arguments(p)
+    args = p.parse_args()
+    start_profiling(args)
+
+    pairs = pair_mentors(load_responses(args.mentors), load_responses(args.mentees),
+                         args.mentor_cols, args.mentee_cols, args.capacity)
+    pairs.to_csv(args.output, index=False)
+    print('Paired {} mentees with mentors.'.format(len(pairs)))
+
+    # The template's keys are the sheet columns, prefixed by
+    # "mentor_" or "mentee_" (e.g. {mentor_name}).
+    if args.template:
+        with open(args.template) as template_f:
+            template_text = template_f.read()
+        os.makedirs(args.letters, exist_ok=True)
+        for i, pair in enumerate(pairs.astype(str).to_dict('records')):
+            with open(os.path.join(args.letters, '{:04d}.txt'.format(i)), 'w') as letter_f:
+                letter_f.write(template_text.format(**pair))
@@ -1,6 +1,7 @@
 from argparse import ArgumentParser
-from winlp_scripts.budget_sheet import grab_sheet, get_col
+from winlp_scripts.google_sheets import grab_sheet, get_col
 from winlp_scripts.utils import load_yml, usd
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
 
 
 def calc_fees(rows, mapping):
@@ -29,7 +30,9 @@ if __name__ == '__main__':
     p.add_argument('-n', '--numrows', type=int, default=48, help='The number of the last populated row in the spreadsheet')
     p.add_argument('-m', '--mapping', type=load_yml, default='data/budget_mapping.yml')
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     # Grab values from the config
     google_dict = args.config.get('google', {})
@@ -38,6 +41,7 @@ if __name__ == '__main__':
 
     # Also get the column mappings
 
-    headers, rows = grab_sheet(sheet_id, api_key)
+    headers, rows = grab_sheet(sheet_id, args.index, api_key=api_key, num_rows=args.numrows,
+                               url_base=google_dict.get('url_base'))
 
     calc_fees(rows, args.mapping)
\ No newline at end of file
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+This script checks the reviewer assignments in softconf for conflicts
+of interest with the authors of the papers being reviewed: reviewers
+who are authors, who share an (institutional) email domain with an
+author, or who share an affiliation with the main contact.
+"""
+from argparse import ArgumentParser
+
+from winlp_scripts.coi import COIIndex
+from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, MC_EMAIL, ALL_EMAILS, MC_AFFILLIATION, REVIEWER, REVIEWER_EMAIL
+from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-o', '--output', help='Path to write the flagged conflicts to, as a CSV.')
+
+    add_profile_arguments(p)
+    args = p.parse_args()
+    start_profiling(args)
+
+    scc = SoftconfConnection.from_conf(args.config)
+    submissions = scc.submission_information(keys=[PAPER_ID, MC_EMAIL, ALL_EMAILS, MC_AFFILLIATION])
+    reviews = scc.reviews(keys=[PAPER_ID, REVIEWER, REVIEWER_EMAIL])
+
+    conflicts = COIIndex(submissions).check_reviews(reviews)
+    if args.output:
+        conflicts.to_csv(args.output, index=False)
+
+    if len(conflicts):
+        print(conflicts.to_string(index=False))
+    else:
+        print('No conflicts found in {} reviews.'.format(len(reviews)))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+This script checks this year's submissions for near-duplicates, both
+among themselves (dual submissions) and against an archive of past
+submissions, using the abstracts (and optionally the PDF text).
+
+The archive is a MinHash index saved on disk; with --add, this
+year's submissions are added to it after checking.
+"""
+import logging
+from argparse import ArgumentParser
+
+from winlp_scripts.minhash import MinHashIndex, is_empty, pdf_text
+from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, PAPER_TITLE, PAPER_ABSTRACT
+from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+LOG = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-i', '--index', default='data/minhash_archive.npz', help='Path to the archive index.')
+    p.add_argument('-l', '--label', required=True, help='Label for this batch of submissions (e.g. "2020"), used to prefix their IDs in the archive.')
+    p.add_argument('--pdfs', action='store_true', help='Also compare the text of the submitted PDFs (requires pypdf).')
+    p.add_argument('-t', '--threshold', type=float, default=0.5, help='Minimum estimated similarity to report.')
+    p.add_argument('--add', action='store_true', help='Add this batch to the archive after checking.')
+
+    add_profile_arguments(p)
+    args = p.parse_args()
+    start_profiling(args)
+
+    scc = SoftconfConnection.from_conf(args.config)
+    submissions = scc.submission_information(keys=[PAPER_ID, PAPER_TITLE, PAPER_ABSTRACT])
+    # Missing titles or abstracts would otherwise be hashed as "nan"
+    submissions[[PAPER_TITLE, PAPER_ABSTRACT]] = submissions[[PAPER_TITLE, PAPER_ABSTRACT]].fillna('')
+
+    index = MinHashIndex.load_or_create(args.index)
+    print('Checking {} submissions against {} archived texts.'.format(len(submissions), len(index)))
+
+    for paper_id, title, abstract in zip(submissions[PAPER_ID], submissions[PAPER_TITLE], submissions[PAPER_ABSTRACT]):
+        texts = {'abstract': '{} {}'.format(title, abstract).strip()}
+        if args.pdfs:
+            texts['pdf'] = pdf_text(scc.retrieve_pdf(paper_id))
+
+        for kind, text in texts.items():
+            id = '{}/{}/{}'.format(args.label, paper_id, kind)
+            signature = index.signature(text)
+            if is_empty(signature):
+                LOG.warning('Skipping the {} of {}, which has no text to compare'.format(kind, paper_id))
+                continue
+            for match_id, similarity in index.query(signature=signature, threshold=args.threshold):
+                if match_id != id:
+                    print('{} ({}) is {:.0%} similar to {}'.format(paper_id, kind, similarity, match_id))
+
+            # Later submissions in this batch are also checked against this one
+            if id not in index:
+                index.add(id, signature=signature)
+
+    if args.add:
+        index.save(args.index)
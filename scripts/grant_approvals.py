@@ -2,9 +2,10 @@ from argparse import ArgumentParser
 import os
 import datetime
 
-from winlp_scripts.budget_sheet import grab_sheet, get_col
-from winlp_scripts.template import process_docx_template
+from winlp_scripts.google_sheets import grab_sheet, get_col
+from winlp_scripts.template import render_docx, RenderManifest
 from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
 
 from num2words import num2words
 
@@ -12,8 +13,15 @@ from num2words import num2words
 def generate_approvals(rows, mapping, invitation_template, output_dir: str):
     """
     Scan through the budget spreadsheet
-    to generate approvals
+    to generate approvals.
+
+    Letters whose template and details haven't changed since they
+    were last generated (see winlp_scripts.template.RenderManifest)
+    are left alone. Returns the number of letters (re)generated.
     """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = RenderManifest(output_dir)
+    rendered = 0
 
     # Create the output
     for row in rows:
@@ -28,17 +36,18 @@ def generate_approvals(rows, mapping, invitation_template, output_dir: str):
         file_name = 'Travel Grant Letter - {}.docx'.format(name)
         full_path = os.path.join(output_dir, file_name)
 
-        if awarded is not '':
-
-            d = process_docx_template(invitation_template,
-                                      keys={'date': datetime.datetime.now().strftime('%B %m, %Y'),
-                                            'name':name,
-                                            'email':email,
-                                            'paper_title':paper_title,
-                                            'amount':awarded,
-                                            'text_amount':num2words(awarded)})
-            os.makedirs(output_dir, exist_ok=True)
-            d.save(full_path)
+        if awarded:
+            rendered += render_docx(invitation_template,
+                                    keys={'date': datetime.datetime.now().strftime('%B %d, %Y'),
+                                          'name':name,
+                                          'email':email,
+                                          'paper_title':paper_title,
+                                          'amount':awarded,
+                                          'text_amount':num2words(awarded)},
+                                    output_path=full_path,
+                                    manifest=manifest)
+    manifest.save()
+    return rendered
 
 
 
@@ -48,8 +57,11 @@ if __name__ == '__main__':
     p.add_argument('-m', '--mapping', default='data/budget_mapping.yml', type=load_yml,
                    help='Mapping for columns to fields in the budget spreadsheet')
     p.add_argument('-o', '--output', default='letters', help='Directory to output invitation letters in.')
+    p.add_argument('-i', '--index', type=int, default=1, help='The index of the page on the provided sheet that the travel grants live.')
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     # Get Google API info
     google_sheet = args.config.get('google', {})
@@ -59,13 +71,18 @@ if __name__ == '__main__':
 
     # Retrieve the current state of the grant sheet
     headers, rows = grab_sheet(sheet_id,
+                               args.index,
                                cred_path=cred_path,
+                               client_path=google_sheet.get('client_file'),
+                               api_key=api_key,
+                               url_base=google_sheet.get('url_base'),
                                num_rows=args.mapping.get('num_rows'),
                                last_col=args.mapping.get('last_col'))
 
     invitation_template = args.config['templates']['invitation']
     email_template = args.config['templates']['grant_email']
 
-    # generate_approvals(rows, args.mapping, invitation_template, args.output)
+    rendered = generate_approvals(rows, args.mapping, invitation_template, args.output)
+    print('Generated {} letters in {}'.format(rendered, args.output))
 
     print(email_template)
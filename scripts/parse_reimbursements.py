@@ -6,29 +6,82 @@ with them, and create folders to arrange the data for manual inspection.
 import pickle
 from argparse import ArgumentParser
 import os
+import sys
 from collections import OrderedDict, defaultdict
-from io import BytesIO
+import tempfile
 
 import logging
 LOG = logging.getLogger(__file__)
 
-from pandas import DataFrame
+from pandas import DataFrame, read_sql
+import sqlite3
 import zipfile
 import json
 import urllib.parse
 import datetime
 
 from winlp_scripts.limesurvey import LimeSurveyConnection
-from winlp_scripts.utils import load_yml, usd
+from winlp_scripts.receipts import ReceiptIndex
+from winlp_scripts.utils import load_yml, usd, mmap_zip
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+
+# Columns of the consolidated reimbursement ledger,
+# one row per respondent and cost category.
+LEDGER_COLUMNS = ['response_id', 'name', 'email', 'category',
+                  'amount', 'hotel_days', 'max_hotel', 'total']
+
+# View over the ledger listing hotel claims above the
+# number of nights times the daily rate.
+OVER_CAP_VIEW = """
+CREATE VIEW over_cap AS
+SELECT response_id, name, email, amount, hotel_days, max_hotel,
+       amount - max_hotel AS overage
+FROM ledger
+WHERE category = 'hotel' AND amount > max_hotel
+ORDER BY overage DESC
+"""
 
+def write_ledger(ledger: DataFrame, ledger_path: str):
+    """
+    Write the ledger to a SQLite database in a single bulk insert,
+    replacing any ledger from a previous run, along with the
+    `over_cap` view for the chairs to query.
+    """
+    with sqlite3.connect(ledger_path) as conn:
+        conn.execute('DROP VIEW IF EXISTS over_cap')
+        ledger.to_sql('ledger', conn, if_exists='replace', index=False)
+        conn.execute('CREATE INDEX idx_ledger_response ON ledger (response_id)')
+        conn.execute(OVER_CAP_VIEW)
+    conn.close()
+
+def over_cap(ledger_path: str) -> DataFrame:
+    """
+    Return the hotel claims in the ledger at `ledger_path` that
+    exceed the maximum allowed for the number of nights stayed
+    (the rows of its `over_cap` view).
+    """
+    with sqlite3.connect(ledger_path) as conn:
+        over = read_sql('SELECT * FROM over_cap', conn)
+    conn.close()
+    return over
 
 def parse_sheet(responses: DataFrame,
                 output_dir,
                 zip: zipfile.ZipFile,
-                daily_rate: int):
+                daily_rate: int,
+                ledger_path: str = None,
+                receipts: ReceiptIndex = None) -> DataFrame:
     """
-    Process the returned responses
+    Process the returned responses, and return the ledger
+    of claimed amounts (also written to `ledger_path`, if given).
+
+    Every extracted file is added to `receipts`, and any receipts
+    submitted more than once are written to duplicate_receipts.csv
+    in the output directory.
     """
+    ledger_rows = []
+    receipts = receipts if receipts is not None else ReceiptIndex()
 
     for row in responses.iterrows():
         data = row[1]
@@ -86,7 +139,10 @@ def parse_sheet(responses: DataFrame,
 
                 if len(target_file) == 1:
                     files_for_post -= target_file
-                    zip.extract(target_file.pop().filename, target_dir)
+                    extracted = zip.extract(target_file.pop().filename, target_dir)
+                    for match in receipts.add(extracted, response_id, dir_name):
+                        LOG.warning('Receipt "{}" for {} ({}) duplicates "{}" for {} ({})'.format(
+                            file_name, response_id, dir_name, match.path, match.owner, match.category))
 
             # Now do amounts
             if usd(data[amt_key]):
@@ -111,7 +167,15 @@ def parse_sheet(responses: DataFrame,
 
         # Now, extract any other files
         for file in files_for_post:
-            zip.extract(file, respondent_dir)
+            extracted = zip.extract(file, respondent_dir)
+            for match in receipts.add(extracted, response_id, 'unsorted'):
+                LOG.warning('Receipt "{}" for {} (unsorted) duplicates "{}" for {} ({})'.format(
+                    os.path.basename(file.filename), response_id, match.path, match.owner, match.category))
+
+        # Record the claimed amounts in the ledger
+        for key in cost_dict:
+            ledger_rows.append((response_id, name, email, key, cost_dict[key],
+                                hotel_days, max_hotel, total_amt))
 
         # Also, create a summary file for the claimed amounts.
         summary_path = os.path.join(respondent_dir, 'summary.txt')
@@ -142,6 +206,17 @@ def parse_sheet(responses: DataFrame,
                 else:
                     summary_f.write('ONLINE\n')
 
+    duplicate_rows = [(group_id, r.owner, r.category, r.path)
+                      for group_id, group in enumerate(receipts.duplicates())
+                      for r in group]
+    DataFrame(duplicate_rows, columns=['group', 'response_id', 'category', 'path']).to_csv(
+        os.path.join(output_dir, 'duplicate_receipts.csv'), index=False)
+
+    ledger = DataFrame(ledger_rows, columns=LEDGER_COLUMNS)
+    if ledger_path is not None:
+        write_ledger(ledger, ledger_path)
+    return ledger
+
 if __name__ == '__main__':
     p = ArgumentParser()
     p.add_argument('-z', '--zip', help='Path to save the zip of attached files.')
@@ -151,42 +226,52 @@ if __name__ == '__main__':
     p.add_argument('--sheet', help='Path to the sheet destination', type=str)
     p.add_argument('-f', '--force', help='Overwrite previously downloaded data', action='store_true')
     p.add_argument('-d', '--daily', default=66.4, type=float)
+    p.add_argument('-l', '--ledger', help='Path to write the SQLite ledger of claimed amounts. Defaults to ledger.sqlite in the output directory.')
     p.add_argument('-v', '--verbose', action='count', default=0)
 
+    add_profile_arguments(p)
     args = p.parse_args()
-
-    # Get the limesurvey params
-    lime_dict = args.config.get('limesurvey', {})
-    lime_user = lime_dict.get('user')
-    lime_pass = lime_dict.get('pass')
-    lime_base = lime_dict.get('url_base')
+    start_profiling(args)
 
     loglevel = logging.WARNING - 10*args.verbose
     logging.basicConfig(level=loglevel)
 
-    with LimeSurveyConnection(lime_base, lime_user, lime_pass) as c:
+    with LimeSurveyConnection.from_conf(args.config) as c, tempfile.TemporaryDirectory() as tmp_dir:
         LOG.info('Opening up connection to limesurvey')
         responses = c.export_responses(args.surveyid)
 
+        # The attachments can run to several GB, so always spool them
+        # to disk and read them through a memory map rather than
+        # keeping the archive in memory.
+        zip_path = args.zip
+        if zip_path is None:
+            zip_path = os.path.join(tmp_dir, 'attachments.zip')
+
         # Download the zipfile only if it doesn't already exist.
         if args.zip and os.path.exists(args.zip) and not args.force:
             LOG.info('Loading files from previously downloaded zip file: {}'.format(args.zip))
-            zip = zipfile.ZipFile(args.zip)
+            zip = mmap_zip(zip_path)
         else:
             LOG.info('Downloading zip files for responses')
-            zip = c.get_download_for_response_list(args.surveyid, list(responses['id']), bytes=True)
-            if args.zip:
-                with open(args.zip, 'wb') as zip_f:
-                    zip_f.write(zip)
-            zip = zipfile.ZipFile(BytesIO(zip))
-
-
-        # Now, get the survey responses
-        if args.sheet or args.force:
-            if os.path.exists(args.sheet):
-                with open(args.sheet, 'r') as pickle_f:
-                    responses = pickle.load(pickle_f)
-            else:
-                responses.to_pickle(args.sheet)
-
-        parse_sheet(responses, args.output, zip, args.daily)
\ No newline at end of file
+            zip = c.get_download_for_response_list(args.surveyid, list(responses['id']), path=zip_path)
+
+        if zip is None:
+            sys.exit('The attachments in "{}" are empty or not a valid zip file.'.format(zip_path))
+
+        # Unmap the attachments before the temporary directory is removed
+        with zip:
+            # Now, get the survey responses
+            if args.sheet or args.force:
+                if os.path.exists(args.sheet):
+                    with open(args.sheet, 'r') as pickle_f:
+                        responses = pickle.load(pickle_f)
+                else:
+                    responses.to_pickle(args.sheet)
+
+            ledger_path = args.ledger or os.path.join(args.output, 'ledger.sqlite')
+            ledger = parse_sheet(responses, args.output, zip, args.daily, ledger_path=ledger_path)
+
+            over = over_cap(ledger_path)
+            if len(over):
+                print('Hotel claims over the allowed maximum:')
+                print(over[['response_id', 'name', 'amount', 'hotel_days', 'max_hotel', 'overage']].to_string(index=False))
\ No newline at end of file
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+This script downloads the reviews from softconf, and produces
+a table of the papers ranked by their (reviewer-calibrated)
+recommendation scores, along with the spread of the scores
+for each paper, to help the program committee make decisions.
+"""
+from argparse import ArgumentParser
+
+from winlp_scripts.review_analysis import decision_table, SCORE_KEYS
+from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, PAPER_TITLE, REVIEWER_EMAIL
+from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-o', '--output', default='decisions.csv', help='Path to write the decision table to.')
+
+    add_profile_arguments(p)
+    args = p.parse_args()
+    start_profiling(args)
+
+    scc = SoftconfConnection.from_conf(args.config)
+    reviews = scc.reviews(keys=[PAPER_ID, REVIEWER_EMAIL] + SCORE_KEYS)
+    submissions = scc.submission_information(keys=[PAPER_ID, PAPER_TITLE])
+
+    table = decision_table(reviews)
+    table = table.join(submissions.set_index(PAPER_ID)[PAPER_TITLE])
+    table.to_csv(args.output)
+    print(table[['rank', 'count', 'mean', 'var', 'disagreement', PAPER_TITLE]].to_string())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+This script assigns accepted papers to poster or oral sessions,
+so that no author is presenting in two sessions at once.
+
+Any conflicts that can't be avoided (e.g. an author with more
+papers than there are sessions) are reported at the end.
+"""
+from argparse import ArgumentParser
+
+from winlp_scripts.conflicts import submission_emails
+from winlp_scripts.scheduling import schedule_sessions, overbooked_authors
+from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, PAPER_TITLE, PAPER_ACCEPT, MC_EMAIL, ALL_EMAILS
+from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-n', '--sessions', type=int, required=True, help='Number of sessions to split the papers into.')
+    p.add_argument('--capacity', type=int, help='Maximum number of papers per session. Defaults to an even split.')
+    p.add_argument('-a', '--accepted', default='Accept', help='Value of the acceptance status for papers to schedule.')
+    p.add_argument('-o', '--output', default='sessions.csv', help='Path to write the schedule to.')
+
+    add_profile_arguments(p)
+    args = p.parse_args()
+    start_profiling(args)
+
+    scc = SoftconfConnection.from_conf(args.config)
+    submissions = scc.submission_information(keys=[PAPER_ID, PAPER_TITLE, PAPER_ACCEPT, MC_EMAIL, ALL_EMAILS])
+    accepted = submissions[submissions[PAPER_ACCEPT] == args.accepted].reset_index(drop=True)
+
+    email_sets = submission_emails(accepted)
+    schedule = schedule_sessions(email_sets, args.sessions, capacity=args.capacity)
+
+    accepted.assign(session=schedule.sessions + 1)[[PAPER_ID, PAPER_TITLE, 'session']].sort_values(
+        ['session', PAPER_ID]).to_csv(args.output, index=False)
+    print('Scheduled {} papers into {} sessions.'.format(len(accepted), args.sessions))
+
+    for author in overbooked_authors(email_sets, args.sessions):
+        print('{} has more papers than there are sessions.'.format(author))
+    for i, j in schedule.conflicts:
+        shared = ', '.join(sorted(email_sets[i] & email_sets[j]))
+        print('Papers {} and {} are both in session {} (shared authors: {})'.format(
+            accepted[PAPER_ID][i], accepted[PAPER_ID][j], schedule.sessions[i] + 1, shared))
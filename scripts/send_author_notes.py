@@ -11,57 +11,81 @@ It uses:
 import os
 import sys
 from argparse import ArgumentParser
-from pandas import DataFrame, isna
+from typing import Generator, Tuple
 
-from winlp_scripts.email_tools import gmail_send, craft_text_email
-from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST, PASSCODE
+import numpy as np
+from pandas import DataFrame, to_numeric
+
+from winlp_scripts.email_tools import gmail_send, craft_text_email, MailSink
+from winlp_scripts.softconf import PAPER_ID, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST, PASSCODE
 from winlp_scripts.utils import load_yml
-from winlp_scripts.google_sheets import GoogleSheetInterface
+from winlp_scripts.prefetch import Prefetcher
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
+
+REJECT_TEXT = '''I am sorry to inform you that the following submission was not selected by the program committee.'''
+ACCEPT_TEXT = '''On behalf of the WiNLP 2020 Program Committee, I am delighted to inform you that the following submission has been accepted to appear at the workshop.'''
+
+class NotesException(Exception): pass
 
-def generate_notes(submission_data: DataFrame, notes: DataFrame, template_path: str):
+def merge_notes(submission_data: DataFrame, notes: DataFrame) -> DataFrame:
     """
-    Given the submission information
+    Join the notes sheet (with the paper ID in the first column, the
+    decision third from last, and the note last) to the submissions
+    by paper ID, keeping the rows that have a note.
 
-    :param submission_data:
-    :param notes:
-    :param template_path:
-    :return:
+    Raises a NotesException listing any paper IDs that are not in
+    the submissions or appear more than once in the sheet, so that
+    nothing is sent until the sheet is fixed.
+    """
+    notes = notes.iloc[:, [0, -3, -1]].copy()
+    notes.columns = ['sheet_id', 'decision', 'note']
+
+    # Skip rows without an ID (e.g. blank rows at the end of the sheet)
+    notes = notes[notes['sheet_id'].notna() & (notes['sheet_id'].astype(str).str.strip() != '')]
+    notes['paper_id'] = to_numeric(notes['sheet_id'], errors='coerce').astype('Int64')
+
+    submissions = submission_data[[PAPER_ID, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST]].copy()
+    submissions[PAPER_ID] = to_numeric(submissions[PAPER_ID]).astype('Int64')
+    merged = notes.merge(submissions, how='left', left_on='paper_id', right_on=PAPER_ID,
+                         indicator=True, validate='many_to_one')
+
+    missing = merged.loc[merged['_merge'] == 'left_only', 'sheet_id'].astype(str).tolist()
+    duplicates = merged.loc[merged['paper_id'].duplicated() & merged['paper_id'].notna(),
+                            'paper_id'].unique().tolist()
+    problems = []
+    if missing:
+        problems.append('not in the submissions: {}'.format(', '.join(missing)))
+    if duplicates:
+        problems.append('listed more than once: {}'.format(', '.join(str(i) for i in duplicates)))
+    if problems:
+        raise NotesException('Paper IDs in the notes sheet {}'.format('; '.join(problems)))
+
+    merged = merged[merged['note'].notna() & (merged['note'].astype(str).str.strip() != '')]
+    merged['decision_text'] = np.where(merged['decision'] == 'reject', REJECT_TEXT, ACCEPT_TEXT)
+    return merged
+
+def generate_notes(submission_data: DataFrame, notes: DataFrame,
+                   template_path: str) -> Generator[Tuple[str, str], None, None]:
+    """
+    Given the submission information and the notes sheet, yield
+    the text of each note email and the address to send it to
+    (see `merge_notes`).
     """
     with open(template_path, 'r') as template_f:
         template_text = template_f.read()
 
-    # Fill a dictionary keyed by the submission ID
-    # with the author contact information
-    sub_dict = {}
-    for row_id, sub_row in submission_data.iterrows():
-        mc_last, mc_first, mc_email, paper_title, paper_id = [sub_row.get(key) for key in [MC_LAST, MC_FIRST, MC_EMAIL, PAPER_TITLE, PAPER_ID]]
-        sub_dict[int(paper_id)] = (paper_title, mc_email, mc_first, mc_last)
-
-    # Now, examine the rows in the notes spreadsheet.
-    for row_id, note_row in notes.iterrows():
-        paper_id = int(note_row[0])
-        note = note_row[-1]
-        decision = note_row[-3]
-
-        if decision == 'reject':
-            decision_txt = '''I am sorry to inform you that the following submission was not selected by the program committee.'''
-        else:
-            decision_txt = '''On behalf of the WiNLP 2020 Program Committee, I am delighted to inform you that the following submission has been accepted to appear at the workshop.'''
-
-        paper_title, mc_email, mc_first, mc_last = sub_dict.get(paper_id)
-
-        if note:
-            # print(note_row, submission_data.keys())
-            # print(sub_dict.get(paper_id), note)
-
-            yield template_text.format(**{
-                'paper_id': paper_id,
-                'mc_first': mc_first,
-                'mc_last': mc_last,
-                'paper_title': paper_title,
-                'decision': decision_txt,
-                'note': note
-            }), mc_email
+    merged = merge_notes(submission_data, notes)
+    for paper_id, mc_first, mc_last, paper_title, decision_txt, note, mc_email in zip(
+            merged['paper_id'], merged[MC_FIRST], merged[MC_LAST], merged[PAPER_TITLE],
+            merged['decision_text'], merged['note'], merged[MC_EMAIL]):
+        yield template_text.format(**{
+            'paper_id': paper_id,
+            'mc_first': mc_first,
+            'mc_last': mc_last,
+            'paper_title': paper_title,
+            'decision': decision_txt,
+            'note': note
+        }), mc_email
 
 
 if __name__ == '__main__':
@@ -70,31 +94,44 @@ if __name__ == '__main__':
     p.add_argument('-s', '--sheet', type=str, required=True, help='id of the google sheet to draw the author notes from.')
     p.add_argument('-t', '--template', type=str, help='Path to the template to generate emails from.', required=True)
     p.add_argument('-e', '--email', type=bool, help='Actually send the emails. Defaults to just printing the messages.')
+    p.add_argument('--dry-run', metavar='PATH', help='Rather than printing the messages, write them to an mbox file (if PATH ends in .mbox) or a directory of .eml files, with an index CSV.')
 
+    add_profile_arguments(p)
     args = p.parse_args()
-
-    # --1) Set up the connection to SoftConf
-    softconf_settings = args.config.get('softconf') # type: dict
-    scc = SoftconfConnection(softconf_settings.get('user'),
-                             softconf_settings.get('pass'),
-                             softconf_settings.get('url_base'))
-    # reviews = scc.reviews()
-    submissions = scc.submission_information(keys=[PAPER_ID, PASSCODE, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST])
-
-    # --2) Set up the connection to Google Sheets
+    start_profiling(args)
+
+    # --1) Download the softconf submissions and the notes sheet
+    #      at the same time
+    prefetch = Prefetcher()
+    prefetch.softconf_submissions('submissions', args.config,
+                                  keys=[PAPER_ID, PASSCODE, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST])
+    prefetch.sheet('notes', args.config, args.sheet)
+    data = prefetch.fetch()
+    submissions, review_sheet = data['submissions'], data['notes']
+    print(prefetch.report(), file=sys.stderr)
+
+    # --2) Obtain google email credentials
     google_settings = args.config.get('google')
-    gsi = GoogleSheetInterface(google_settings.get('token_file'),
-                               google_settings.get('client_file'))
-
-    # --3) Obtain google email credentials
     gmail_user = google_settings.get('user')
     gmail_pass = google_settings.get('pass')
 
-    review_sheet =  gsi.get_sheet(args.sheet)
+    # --3) Prepare all the messages before sending any, so that
+    #      problems with the notes sheet are found up front.
+    try:
+        messages = list(generate_notes(submissions, review_sheet, args.template))
+    except NotesException as e:
+        sys.exit(str(e))
 
-    for text, to_email in generate_notes(submissions, review_sheet, args.template): # type: str
+    sink = MailSink(args.dry_run) if args.dry_run and not args.email else None
+    for text, to_email in messages: # type: str
         msg = craft_text_email(text, 'WiNLP 2020 Submission Notification')
+        to_addrs = ['winlp-chairs@googlegroups.com', to_email]
         if args.email:
-            gmail_send(gmail_user, gmail_pass, ['winlp-chairs@googlegroups.com', to_email], msg)
+            gmail_send(gmail_user, gmail_pass, to_addrs, msg)
+        elif sink is not None:
+            sink.add(to_addrs, msg)
         else:
-            print(msg)
\ No newline at end of file
+            print(msg)
+    if sink is not None:
+        sink.close()
+        print('Wrote {} messages to {}'.format(sink.count, args.dry_run), file=sys.stderr)
@@ -1,17 +1,24 @@
 import sys
 from argparse import ArgumentParser
 
-from winlp_scripts.budget_sheet import grab_sheet, get_col
-from winlp_scripts.email_tools import create_html_email, gmail_send
+from winlp_scripts.google_sheets import grab_sheet, get_col
+from winlp_scripts.email_tools import create_html_email, gmail_send, MailSink
 from winlp_scripts.utils import load_yml, usd
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
 
 if __name__ == '__main__':
     p = ArgumentParser()
     p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-e', '--email', action='store_true', help='Actually send the emails. Defaults to writing them to --dry-run.')
+    p.add_argument('--dry-run', metavar='PATH', default='travel_grant_emails.mbox',
+                   help='Where to write the messages when not sending them: an mbox file (if PATH ends in .mbox) or a directory of .eml files, with an index CSV.')
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     cred_path = args.config['google']['token_file']
+    client_path = args.config['google'].get('client_file')
     sheet_id = args.config['budget']['sheet_id']
     mappings = load_yml(args.config['budget']['mapping'])
     template_path = args.config['templates']['reimburse_email']
@@ -21,7 +28,8 @@ if __name__ == '__main__':
     gmail_user = args.config['google']['user']
     gmail_pass = args.config['google']['pass']
 
-    header, rows = grab_sheet(sheet_id, 1, cred_path)
+    header, rows = grab_sheet(sheet_id, 1, cred_path, client_path=client_path)
+    sink = None if args.email else MailSink(args.dry_run)
     for row in rows:
         local = lambda x: get_col(row, x, mappings)
         method = local('method')
@@ -40,7 +48,13 @@ if __name__ == '__main__':
                                             total_amt=approved_amt+acl_refund)
 
         msg = create_html_email(template_str, 'WiNLP Reimbursement: Payment Method Information Requested')
-        if 'Georgi' in name:
+        if args.email:
             gmail_send(gmail_user, gmail_pass, [email], msg)
+        else:
+            sink.add([email], msg)
+
+    if sink is not None:
+        sink.close()
+        print('Wrote {} messages to {}'.format(sink.count, args.dry_run), file=sys.stderr)
     sys.exit()
 
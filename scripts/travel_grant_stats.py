@@ -1,7 +1,8 @@
 from argparse import ArgumentParser
 
-from winlp_scripts.budget_sheet import grab_sheet
+from winlp_scripts.google_sheets import grab_sheet, get_col, GoogleSheetInterface
 from winlp_scripts.utils import load_yml, col_letter, usd
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
 import googleapiclient.discovery
 
 def analyze_sheet(rows, letter_mapping):
@@ -55,8 +56,11 @@ if __name__ == '__main__':
     p.add_argument('-i', '--index', type=int, default=1, help='The index of the page on the provided sheet that the travel grants live.')
     p.add_argument('-n', '--numrows', type=int, default=48, help='The number of the last populated row in the spreadsheet')
     p.add_argument('-m', '--mapping', type=load_yml, default='data/budget_mapping.yml')
+    p.add_argument('-w', '--watch', type=float, metavar='SECONDS', help='Keep watching the sheet, checking for edits every SECONDS, and update the stats when rows change.')
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
     # Grab values from the config
     google_dict = args.config.get('google', {})
@@ -65,6 +69,29 @@ if __name__ == '__main__':
 
     # Also get the column mappings
 
-    analyze_sheet(grab_sheet(sheet_id, api_key)[1], args.mapping)
+    if args.watch:
+        # Rows are keyed by the recipient's email
+        watcher = GoogleSheetInterface.from_conf(args.config).watch(
+            sheet_id, key_column=col_letter(args.mapping['email']), page_index=args.index,
+            cell_range='A1:{}{}'.format(args.mapping.get('last_col', 'zz'), args.numrows),
+            interval=args.watch)
+
+        @watcher.subscribe_batch
+        def report(events):
+            if watcher.polls > 1:
+                for event in events:
+                    row = event.row if event.row is not None else event.old_row
+                    print('{:<8s} {}'.format(event.kind, get_col(row, 'name', args.mapping)))
+            analyze_sheet(list(watcher.rows.values()), args.mapping)
+            print(flush=True)
+
+        try:
+            watcher.watch()
+        except KeyboardInterrupt:
+            pass
+    else:
+        headers, rows = grab_sheet(sheet_id, args.index, api_key=api_key, num_rows=args.numrows,
+                                   url_base=google_dict.get('url_base'))
+        analyze_sheet(rows, args.mapping)
 
 
@@ -6,134 +6,101 @@ on what is provided in softconf.
 The logic is:
     - Select all papers who don't have an author in common (as determined
       by the all_author_emails information)
+    - Assign each paper k readers from among those papers, with each
+      reader reading at most k papers (see winlp_scripts.assignment)
 """
-import re
+from contextlib import nullcontext
 from typing import Generator, Tuple
 
-from winlp_scripts.softconf import SoftconfConnection
+from winlp_scripts.assignment import assign_readers, CANDIDATE_FACTOR
+from winlp_scripts.conflicts import submission_emails, conflict_matrix
+from winlp_scripts.similarity import SimilarityIndex
+from winlp_scripts.store import Store
+from winlp_scripts.softconf import SoftconfConnection, PAPER_ID, PASSCODE, MC_USERNAME, MC_EMAIL, PAPER_TITLE, ALL_EMAILS, PAPER_ABSTRACT
 from winlp_scripts.utils import load_yml
+from winlp_scripts.profiling import add_profile_arguments, start_profiling
 from argparse import ArgumentParser
-from collections import defaultdict
 from pandas import DataFrame
 
-# igraph
-from igraph import Graph, Matching, Edge
-
-def build_graph(submissions: DataFrame) -> Graph:
+def assign_submissions(submissions: DataFrame, k: int = 1, seed=None,
+                       costs=None) -> Generator[Tuple[int, int], None, None]:
     """
-    Build a bipartite graph from the submissions
+    Assign every submission `k` readers from the other submissions,
+    returning (reader, paper) submission ID pairs.
 
+    Each submission reads (through its main contact) at most `k`
+    papers, so an author who is the main contact for several
+    submissions reads up to `k` papers for each of them.
     """
-    # Keep an index of what author emails are associated
-    # with what submissions, and vice-versa
-    subs_to_authors = defaultdict(set)
-
-    # Initialize a graph, where the vertices are
-    # all of the submission IDs.
-    g = Graph()
-
-    # print([sub_id[1] for sub_id in submission_info['Submission ID']])
-    sub_ids = sorted(list(submissions['Submission ID']))
-
-    # Shuffle the src/tgt just to get
-    # more randomized pairings
-    from random import Random
-    r = Random()
-    shuffled_src = sub_ids.copy()
-    r.shuffle(shuffled_src)
-    shuffled_tgt = sub_ids.copy()
-    r.shuffle(shuffled_tgt)
-
-    # Add all the sub_ids as vertices as both potential sources
-    # and targets
-    for sub_id in shuffled_src:
-        g.add_vertex('src_{}'.format(sub_id), type=0)
-    for sub_id in shuffled_tgt:
-        g.add_vertex('tgt_{}'.format(sub_id), type=1)
-
-    # Build the mappings of which submissions have which authors
-    for row_id, row in submissions.iterrows():
-        submission_id = row['Submission ID']
-        main_email = row['Main Contact Email']
-        other_emails = set(re.split('[;\s]+', row['All Author Emails']))
-        all_emails = set([main_email]) | other_emails
-        subs_to_authors[submission_id] |= all_emails
-
-    print(sub_ids)
-
-
-
-    for src_sub in shuffled_src:
-        emails_i = subs_to_authors[src_sub]
-        for tgt_sub in shuffled_tgt:
-            emails_j = subs_to_authors[tgt_sub]
-            # Two submissions should only be connected
-            # if they have no overlapping authors.
-            if not (emails_i & emails_j):
-                g.add_edge('src_{}'.format(src_sub), 'tgt_{}'.format(tgt_sub))
-
-    return g
-
-def retrieve_pairs(graph: Graph, matching: Matching) -> Generator[Tuple[int, int], None, None]:
-    """
-    Given the graph matching, return a list
-    of submission ID pairs that will be
-    paired for workshopping.
-    """
-    vertices = graph.vs
-    for edge in matching.edges(): # type: Edge
-        source_vertex = vertices[edge.source]
-        source_name = source_vertex['name'][4:]
-        target_vertex = vertices[edge.target]
-        target_name = target_vertex['name'][4:]
-
-
-        if source_vertex['type'] == 0:
-            yield(int(source_name), int(target_name))
-        else:
-            yield(int(target_name), int(source_name))
+    sub_ids = list(submissions[PAPER_ID])
+    conflicts = conflict_matrix(submission_emails(submissions))
+    for reader, paper in assign_readers(conflicts, k=k, costs=costs, seed=seed):
+        yield sub_ids[reader], sub_ids[paper]
 
-
-
-def do_assignments(conf):
+def do_assignments(conf, readers: int = 1, seed=None, similarity_cache: str = None,
+                   store: Store = None, refresh: bool = False):
     """
     Retrieve the submission information from Softconf,
     and determine which submissions should be sent
     to which other workshop participants.
-    """
-    scc = SoftconfConnection.from_conf(conf)
-    submission_info = scc.submission_information()
-
-    sub_id_to_authors = {row_data['Submission ID']:row_data for row_id, row_data in submission_info.iterrows()}
-
-    # -- 1) Build a bipartite graph of submission pairings.
-    graph = build_graph(submission_info)
-
-    # -- 2) Find a maximal matching graph
-    matching = graph.maximum_bipartite_matching()
-    assert matching.is_maximal()
-
-    # -- 3) Retrieve the pairings
-    assignments = retrieve_pairs(graph, matching)
-
-    # -- 4) Given these pairings,
-    # Find the match for each source vertex...
-    for source_id, tgt_id in assignments:
-        source_sub = sub_id_to_authors[source_id]
-        tgt_sub = sub_id_to_authors[tgt_id]
-
-        print('{} will be assigned to read over the paper for {}'.format(source_sub['Main Contact Username'],
-                                                                         tgt_sub['Main Contact Username']))
-
-
 
+    If `similarity_cache` is given, readers are matched to papers
+    with similar titles and abstracts where possible, and the
+    similarity matrix is cached at that path.
 
+    If a `store` (see winlp_scripts.store) already holds the
+    submissions, they are read from it rather than from softconf,
+    unless `refresh` is set (or they are needed with the abstracts,
+    which the store doesn't have).
+    """
+    keys = [PAPER_ID, PASSCODE, MC_USERNAME, MC_EMAIL, PAPER_TITLE, ALL_EMAILS]
+    # The abstracts are only used to compare topics, but are kept
+    # in a store in case a later run does.
+    if similarity_cache is not None or store is not None:
+        keys.append(PAPER_ABSTRACT)
+
+    # A store made here (in memory) is closed once the assignments are printed
+    with (nullcontext(store) if store is not None else Store()) as store:
+        submission_info = store.submissions() if store.has('submissions') and not refresh else None
+        if submission_info is None or (similarity_cache is not None and PAPER_ABSTRACT not in submission_info):
+            scc = SoftconfConnection.from_conf(conf)
+            store.ingest_submissions(scc.submission_information(keys=keys))
+            submission_info = store.submissions()
+
+        # Prefer pairing up submissions on similar topics, with only
+        # each reader's most similar papers given a (negative) cost
+        costs = None
+        if similarity_cache is not None:
+            similarity = SimilarityIndex.from_submissions(submission_info, cache_path=similarity_cache)
+            costs = -similarity.top_k_matrix(CANDIDATE_FACTOR*readers)
+
+        # -- 1) Find an assignment of readers to each submission
+        #       that avoids authors reading their own papers.
+        assignments = assign_submissions(submission_info, k=readers, seed=seed, costs=costs)
+
+        # -- 2) Given these pairings,
+        # Find the match for each source vertex...
+        for source_id, tgt_id in assignments:
+            source_sub = store.submission(source_id)
+            tgt_sub = store.submission(tgt_id)
+
+            print('{} will be assigned to read over the paper for {}'.format(source_sub[MC_USERNAME],
+                                                                             tgt_sub[MC_USERNAME]))
 
 
 if __name__ == '__main__':
     p = ArgumentParser()
     p.add_argument('-c', '--conf', default='config.yml', type=load_yml)
+    p.add_argument('-k', '--readers', default=1, type=int, help='Number of readers to assign to each paper.')
+    p.add_argument('--seed', type=int, help='Random seed, for reproducible assignments.')
+    p.add_argument('--similarity', help='Match readers to papers on similar topics, caching the similarity matrix at this path.')
+    p.add_argument('--store', help='Keep the submissions in a local store (see winlp_scripts.store) at this path, and reuse them on later runs.')
+    p.add_argument('--refresh', action='store_true', help='Download the submissions again, even if they are in the store.')
 
+    add_profile_arguments(p)
     args = p.parse_args()
+    start_profiling(args)
 
-    do_assignments(args.conf)
\ No newline at end of file
+    with (Store(args.store) if args.store else nullcontext()) as store:
+        do_assignments(args.conf, readers=args.readers, seed=args.seed, similarity_cache=args.similarity,
+                       store=store, refresh=args.refresh)
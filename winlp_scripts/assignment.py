@@ -0,0 +1,156 @@
+"""
+Assign peer readers to workshop submissions, so that every paper
+is read by `k` other submissions, no submission reads more than `k`
+papers, and no submission reads a paper it shares an author with.
+
+This is solved as a min-cost flow (a transportation problem:
+readers supply k units, papers demand k units, and each compatible
+reader/paper edge has capacity 1). The constraint matrix is totally
+unimodular, so the linear program solved by HiGHS has an integral
+solution without the need for integer programming.
+
+The readers are the submissions themselves (each read by its main
+contact on its behalf), so the cap of `k` papers is per submission
+rather than per author: someone who is the main contact for m
+submissions reads up to m*k papers. A cap of k per author can't be
+met whenever anyone has more than one submission, since the n papers
+need n*k readings and fewer than n readers can supply at most (n-1)*k.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix, issparse
+
+class AssignmentException(Exception): pass
+
+# The number of candidate readers considered for each paper (and
+# candidate papers for each reader), as a multiple of k. Restricting
+# the candidates keeps the flow problem small for large workshops;
+# it's widened automatically if no assignment can be found.
+CANDIDATE_FACTOR = 4
+
+# Scale of the random noise added to the costs, which breaks
+# ties between otherwise-equal assignments (in place of shuffling)
+NOISE_SCALE = 1e-6
+
+# Number of papers to process at a time when choosing candidates.
+BLOCK_SIZE = 512
+
+def _cheapest_per_column(costs: np.ndarray, conflicts: np.ndarray,
+                         candidates: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the (row, column) indices of the `candidates` cheapest
+    non-conflicting rows in every column of `costs`.
+    """
+    n = conflicts.shape[0]
+    rows_found, cols_found = [], []
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        block = rng.random((n, stop - start)) * NOISE_SCALE
+        if costs is not None:
+            block_costs = costs[:, start:stop]
+            block += block_costs.toarray() if issparse(block_costs) else block_costs
+        block[conflicts[:, start:stop]] = np.inf
+
+        if candidates < n:
+            rows = np.argpartition(block, candidates - 1, axis=0)[:candidates]
+        else:
+            rows = np.broadcast_to(np.arange(n)[:, None], block.shape)
+        cols = np.broadcast_to(np.arange(stop - start), rows.shape)
+
+        keep = np.isfinite(block[rows, cols])
+        rows_found.append(rows[keep])
+        cols_found.append(cols[keep] + start)
+    return np.concatenate(rows_found), np.concatenate(cols_found)
+
+def _candidate_edges(conflicts: np.ndarray, costs: np.ndarray,
+                     candidates: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the (readers, papers, costs) of the candidate edges: the
+    `candidates` cheapest compatible readers for every paper, together
+    with the `candidates` cheapest compatible papers for every reader,
+    so that nobody is left without enough options.
+    """
+    n = conflicts.shape[0]
+    readers, papers = _cheapest_per_column(costs, conflicts, candidates, rng)
+    papers_t, readers_t = _cheapest_per_column(None if costs is None else costs.T,
+                                               conflicts.T, candidates, rng)
+    edges = np.unique(np.concatenate([readers*n + papers, readers_t*n + papers_t]))
+    readers, papers = edges // n, edges % n
+
+    # Random tie-breaking, in place of shuffling
+    edge_costs = rng.random(len(edges)) * NOISE_SCALE
+    if costs is not None:
+        edge_costs += np.asarray(costs[readers, papers]).ravel()
+    return readers, papers, edge_costs
+
+# linprog's status for a problem with no solution (as opposed
+# to one the solver failed on)
+INFEASIBLE_STATUS = 2
+
+def _solve_flow(n: int, k: int, readers: np.ndarray, papers: np.ndarray, costs: np.ndarray):
+    """
+    Solve the flow problem over the given edges, returning
+    the mask of edges used, or None if it's infeasible.
+    """
+    num_edges = len(readers)
+    edge_ids = np.arange(num_edges)
+    ones = np.ones(num_edges)
+    paper_rows = csr_matrix((ones, (papers, edge_ids)), shape=(n, num_edges))
+    reader_rows = csr_matrix((ones, (readers, edge_ids)), shape=(n, num_edges))
+
+    result = linprog(costs,
+                     A_ub=reader_rows, b_ub=np.full(n, k),
+                     A_eq=paper_rows, b_eq=np.full(n, k),
+                     bounds=(0, 1), method='highs-ipm')
+    if result.status == INFEASIBLE_STATUS:
+        return None
+    if not result.success or result.x is None:
+        raise AssignmentException('The solver failed (status {}): {}'.format(result.status, result.message))
+
+    # The crossover step after the interior point method returns a
+    # vertex of the polytope, which is integral for flow problems.
+    used = result.x > 0.5
+    if np.abs(result.x - used).max() > 1e-6:
+        raise AssignmentException('Solver returned a fractional assignment')
+    return used
+
+def assign_readers(conflicts: np.ndarray,
+                   k: int = 1,
+                   costs: np.ndarray = None,
+                   seed: int = None,
+                   candidates: int = None) -> List[Tuple[int, int]]:
+    """
+    Given an (n, n) boolean matrix of which submissions conflict
+    (see `winlp_scripts.conflicts.conflict_matrix`), return a list
+    of (reader, paper) index pairs such that every paper has `k`
+    readers and every reader (submission) has at most `k` papers.
+
+    :param costs: Optional (n, n) matrix of the cost of reader i
+                  reading paper j; the total cost is minimized. It
+                  may be a sparse matrix, where the missing entries
+                  cost 0 (e.g. only the most similar papers of each
+                  reader, with negative costs).
+    :param seed: Seed for breaking ties between equal assignments.
+    :param candidates: Number of candidate readers to consider per paper.
+    """
+    n = conflicts.shape[0]
+    if n == 0:
+        return []
+    if (~conflicts).sum(axis=0).min(initial=n) < k:
+        raise AssignmentException('Some papers have fewer than {} non-conflicting readers'.format(k))
+
+    rng = np.random.default_rng(seed)
+    candidates = candidates if candidates is not None else CANDIDATE_FACTOR*k
+    while True:
+        candidates = min(candidates, n)
+        readers, papers, edge_costs = _candidate_edges(conflicts, costs, candidates, rng)
+        used = _solve_flow(n, k, readers, papers, edge_costs)
+        if used is not None:
+            order = np.lexsort([readers[used], papers[used]])
+            return list(zip(readers[used][order].tolist(), papers[used][order].tolist()))
+        if candidates == n:
+            raise AssignmentException('No assignment of {} readers per paper exists'.format(k))
+        candidates *= 2
@@ -0,0 +1,141 @@
+"""
+Check reviewer assignments for conflicts of interest with
+the authors of the papers they review.
+
+Authors are indexed by normalized email, email domain and
+affiliation token, and each review is checked against those
+indexes, so the whole check is linear in the number of
+authors and reviews.
+"""
+
+import re
+from collections import defaultdict, namedtuple
+from typing import Iterable, List, Set
+
+from pandas import DataFrame, isna
+
+from winlp_scripts.conflicts import split_emails
+from winlp_scripts.softconf import PAPER_ID, MC_EMAIL, ALL_EMAILS, MC_AFFILLIATION, REVIEWER_EMAIL
+
+# Email providers shared by unrelated people, whose domains
+# say nothing about affiliation.
+GENERIC_DOMAINS = {'gmail.com', 'googlemail.com', 'yahoo.com', 'hotmail.com',
+                   'outlook.com', 'live.com', 'icloud.com', 'me.com', 'aol.com',
+                   'protonmail.com', 'qq.com', '163.com', '126.com', 'mail.ru',
+                   'yandex.ru', 'gmx.de', 'web.de'}
+
+# Words too common in affiliation names to indicate a conflict
+AFFILIATION_STOP_WORDS = {'university', 'universidad', 'universite', 'universitat',
+                          'of', 'the', 'and', 'for', 'at', 'in', 'de', 'la', 'du',
+                          'institute', 'institut', 'department', 'dept', 'school',
+                          'college', 'faculty', 'technology', 'science', 'sciences',
+                          'research', 'lab', 'labs', 'laboratory', 'center', 'centre',
+                          'national', 'state', 'inc', 'ltd', 'llc', 'corp', 'group'}
+
+# Second-level domains under which organizations register their own
+# (so that the organizational domain is three labels long)
+SECOND_LEVEL_SUFFIXES = {
+    'ac.uk', 'co.uk', 'org.uk', 'gov.uk', 'nhs.uk', 'ltd.uk',
+    'ac.jp', 'co.jp', 'or.jp', 'ne.jp', 'go.jp',
+    'edu.au', 'com.au', 'org.au', 'gov.au', 'net.au',
+    'ac.nz', 'co.nz', 'org.nz', 'govt.nz',
+    'ac.kr', 'co.kr', 're.kr', 'or.kr',
+    'edu.cn', 'com.cn', 'org.cn', 'ac.cn', 'gov.cn',
+    'edu.hk', 'com.hk', 'org.hk',
+    'edu.tw', 'com.tw', 'org.tw',
+    'edu.sg', 'com.sg', 'org.sg',
+    'ac.in', 'co.in', 'edu.in', 'res.in', 'org.in',
+    'ac.il', 'co.il', 'org.il',
+    'ac.za', 'co.za', 'org.za',
+    'ac.ir', 'ac.th', 'co.th', 'ac.id', 'co.id',
+    'edu.br', 'com.br', 'org.br', 'edu.mx', 'com.mx', 'edu.ar', 'com.ar',
+    'edu.co', 'edu.pe', 'edu.pk', 'edu.eg', 'edu.tr', 'com.tr', 'edu.my', 'com.my',
+    'edu.ng', 'edu.gh', 'ac.ke', 'ac.ug', 'ac.tz', 'edu.et', 'edu.vn', 'edu.ph',
+    'ac.at', 'co.at', 'ac.be', 'com.pl', 'edu.pl',
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+Conflict = namedtuple('Conflict', ['paper_id', 'reviewer_email', 'reason', 'match'])
+
+def email_domain(email: str) -> str:
+    """
+    Return the organizational part of the domain of `email`,
+    e.g. "cs.washington.edu" -> "washington.edu", "nlp.ibm.de" ->
+    "ibm.de", and "cl.cam.ac.uk" -> "cam.ac.uk".
+    """
+    labels = email.rsplit('@', 1)[-1].lower().split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in SECOND_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def affiliation_tokens(affiliation) -> Set[str]:
+    """
+    Return the distinctive words of an affiliation name.
+    """
+    if affiliation is None or (not isinstance(affiliation, str) and isna(affiliation)):
+        return set()
+    return {t for t in TOKEN_PATTERN.findall(affiliation.lower())
+            if t not in AFFILIATION_STOP_WORDS and len(t) > 1}
+
+class COIIndex(object):
+    """
+    Index of the authors of each submission, for checking reviewers against.
+    """
+    def __init__(self, submissions: DataFrame,
+                 id_key: str = PAPER_ID,
+                 email_keys: Iterable[str] = (MC_EMAIL, ALL_EMAILS),
+                 affiliation_key: str = MC_AFFILLIATION):
+        self.by_email = defaultdict(set)
+        self.by_domain = defaultdict(set)
+        self.by_affiliation = defaultdict(set)
+
+        # Affiliations are only known for the main contacts, so
+        # keep them by email to look up reviewers who are also authors.
+        self.email_affiliations = defaultdict(set)
+
+        email_keys = list(email_keys)
+        for row in submissions.to_dict('records'):
+            paper_id = row[id_key]
+            emails = split_emails(*[row.get(key) for key in email_keys])
+            tokens = affiliation_tokens(row.get(affiliation_key))
+
+            for email in emails:
+                self.by_email[email].add(paper_id)
+                domain = email_domain(email)
+                if domain not in GENERIC_DOMAINS:
+                    self.by_domain[domain].add(paper_id)
+            for token in tokens:
+                self.by_affiliation[token].add(paper_id)
+            for email in split_emails(row.get(email_keys[0])):
+                self.email_affiliations[email] |= tokens
+
+    def check(self, paper_id, reviewer_email: str) -> List[Conflict]:
+        """
+        Return the conflicts between the reviewer and the authors of the paper.
+        """
+        conflicts = []
+        for email in split_emails(reviewer_email):
+            domain = email_domain(email)
+            if paper_id in self.by_email.get(email, ()):
+                conflicts.append(Conflict(paper_id, email, 'author', email))
+            elif paper_id in self.by_domain.get(domain, ()):
+                conflicts.append(Conflict(paper_id, email, 'domain', domain))
+
+            shared = sorted(t for t in self.email_affiliations.get(email, ())
+                            if paper_id in self.by_affiliation.get(t, ()))
+            if shared and paper_id not in self.by_email.get(email, ()):
+                conflicts.append(Conflict(paper_id, email, 'affiliation', ' '.join(shared)))
+        return conflicts
+
+    def check_reviews(self, reviews: DataFrame,
+                      paper_key: str = PAPER_ID,
+                      reviewer_key: str = REVIEWER_EMAIL) -> DataFrame:
+        """
+        Check every review assignment, and return a dataframe
+        of the flagged conflicts.
+        """
+        conflicts = []
+        for paper_id, reviewer_email in zip(reviews[paper_key], reviews[reviewer_key]):
+            conflicts += self.check(paper_id, reviewer_email)
+        return DataFrame(conflicts, columns=Conflict._fields)
@@ -0,0 +1,79 @@
+"""
+Determine which submissions share authors.
+
+Rather than comparing the author lists of every pair of
+submissions, build an inverted index from each author email
+to the submissions it appears on; any two submissions in the
+same list are in conflict.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+import numpy as np
+from pandas import DataFrame, isna
+
+from winlp_scripts.softconf import MC_EMAIL, ALL_EMAILS
+
+EMAIL_SEPARATORS = re.compile(r'[;,\s]+')
+
+def split_emails(*fields) -> Set[str]:
+    """
+    Split the given email fields (which may contain several
+    addresses separated by semicolons, commas or whitespace)
+    into a set of normalized addresses.
+    """
+    emails = set()
+    for field in fields:
+        if field is None or (not isinstance(field, str) and isna(field)):
+            continue
+        emails |= {e.lower() for e in EMAIL_SEPARATORS.split(field.strip()) if e}
+    return emails
+
+def submission_emails(submissions: DataFrame,
+                      email_keys: Iterable[str] = (MC_EMAIL, ALL_EMAILS)) -> List[Set[str]]:
+    """
+    Return the set of author emails for each row of `submissions`.
+    """
+    columns = [submissions[key] for key in email_keys]
+    return [split_emails(*fields) for fields in zip(*columns)]
+
+def author_index(email_sets: List[Set[str]]) -> Dict[str, List[int]]:
+    """
+    Map each email to the (positional) indices of the
+    submissions it appears on.
+    """
+    index = defaultdict(list)
+    for i, emails in enumerate(email_sets):
+        for email in emails:
+            index[email].append(i)
+    return index
+
+def conflict_pairs(email_sets: List[Set[str]]) -> np.ndarray:
+    """
+    Return an (m, 2) array of the unique index pairs (i < j)
+    of submissions that share at least one author.
+    """
+    pairs = []
+    for postings in author_index(email_sets).values():
+        if len(postings) > 1:
+            postings = np.array(sorted(postings))
+            i, j = np.triu_indices(len(postings), k=1)
+            pairs.append(np.column_stack([postings[i], postings[j]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=int)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def conflict_matrix(email_sets: List[Set[str]]) -> np.ndarray:
+    """
+    Return a symmetric boolean matrix that is True where two
+    submissions share an author. Every submission conflicts
+    with itself.
+    """
+    n = len(email_sets)
+    conflicts = np.eye(n, dtype=bool)
+    pairs = conflict_pairs(email_sets)
+    conflicts[pairs[:, 0], pairs[:, 1]] = True
+    conflicts[pairs[:, 1], pairs[:, 0]] = True
+    return conflicts
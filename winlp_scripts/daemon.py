@@ -0,0 +1,360 @@
+"""
+A long-lived local process that runs the scripts as jobs, so that
+back-to-back runs don't each pay for importing pandas and the Google
+API client, and for logging into softconf, LimeSurvey and Google.
+
+The daemon keeps the connections created through the clients'
+`from_conf` (one per service and config), and the docx templates
+it has loaded, between jobs. Jobs are sent over a Unix socket, and
+run one at a time with their output streamed back. The socket is
+only accessible by the user who started the daemon:
+
+    python3 -m winlp_scripts.daemon start &
+    python3 -m winlp_scripts.daemon run scripts/review_report.py -c config.yml -o reviews.csv
+    python3 -m winlp_scripts.daemon stop
+
+Cached connections are dropped after SESSION_TTL seconds, or when a
+job fails (in case its session had expired), and are logged in
+again by the next job that needs them.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import runpy
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from argparse import ArgumentParser
+from typing import Callable, List
+
+LOG = logging.getLogger(__name__)
+
+# Seconds to keep a logged-in connection before logging in again
+SESSION_TTL = 30*60
+
+# Modules to import when the daemon starts, rather than in the first job
+PRELOAD = ['pandas', 'numpy', 'googleapiclient.discovery', 'docx', 'lxml.html', 'bs4', 'xlrd',
+           'winlp_scripts.softconf', 'winlp_scripts.limesurvey', 'winlp_scripts.google_sheets',
+           'winlp_scripts.template', 'winlp_scripts.email_tools']
+
+class DaemonException(Exception): pass
+
+def default_socket_path() -> str:
+    """
+    The socket in $XDG_RUNTIME_DIR, or else in a directory of the
+    temp dir that only the current user can use.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'winlp-scripts.sock')
+    return os.path.join(tempfile.gettempdir(), 'winlp-scripts-{}'.format(os.getuid()), 'daemon.sock')
+
+def _private_dir(path: str):
+    """
+    Create the directory `path` (readable only by the current user)
+    if needed, and check that no one else owns or can use it.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise DaemonException('"{}" must be a directory only accessible by the current user'.format(path))
+
+def _remove_stale_socket(path: str):
+    """
+    Remove a socket left behind by an earlier daemon, refusing to
+    remove anything other than a socket of the current user's, or
+    the socket of a daemon that is still running.
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise DaemonException('"{}" exists and is not a socket of the current user'.format(path))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        sock.close()
+    raise DaemonException('A daemon is already running on "{}"'.format(path))
+
+class ConnectionCache(object):
+    """
+    Logged-in client connections, by client class and config settings.
+    """
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    @staticmethod
+    def _key(cls, conf: dict) -> tuple:
+        section = {'SoftconfConnection': 'softconf',
+                   'LimeSurveyConnection': 'limesurvey',
+                   'GoogleSheetInterface': 'google'}.get(cls.__name__)
+        return (cls, json.dumps([conf.get(section), conf.get('http')], sort_keys=True, default=str))
+
+    def get(self, cls, conf: dict, factory: Callable):
+        """
+        Return the cached connection of class `cls` for `conf`,
+        creating it with `factory(conf)` if needed.
+        """
+        key = self._key(cls, conf)
+        with self._lock:
+            cached = self._connections.get(key)
+            if cached is not None and time.time() - cached[0] < self.ttl:
+                return cached[1]
+            if cached is not None:
+                self._close(cached[1])
+
+            LOG.info('Logging in with {}'.format(cls.__name__))
+            connection = factory(conf)
+            # Keep LimeSurvey sessions open after the script's `with` block
+            connection.persistent = True
+            self._connections[key] = (time.time(), connection)
+            return connection
+
+    def __len__(self):
+        return len(self._connections)
+
+    @staticmethod
+    def _close(connection):
+        if hasattr(connection, 'close'):
+            try:
+                connection.close()
+            except Exception:
+                LOG.warning('Failed to close {}'.format(type(connection).__name__), exc_info=True)
+
+    def clear(self):
+        with self._lock:
+            for _, connection in self._connections.values():
+                self._close(connection)
+            self._connections.clear()
+
+    @contextlib.contextmanager
+    def installed(self):
+        """
+        Make the clients' `from_conf` constructors return cached
+        connections within the block.
+        """
+        from winlp_scripts.softconf import SoftconfConnection
+        from winlp_scripts.limesurvey import LimeSurveyConnection
+        from winlp_scripts.google_sheets import GoogleSheetInterface
+
+        originals = {}
+        for cls in [SoftconfConnection, LimeSurveyConnection, GoogleSheetInterface]:
+            originals[cls] = cls.__dict__['from_conf']
+            factory = originals[cls].__get__(None, cls)
+            cls.from_conf = classmethod(lambda cls, conf, _factory=factory: self.get(cls, conf, _factory))
+        try:
+            yield self
+        finally:
+            for cls, from_conf in originals.items():
+                cls.from_conf = from_conf
+
+class _StreamWriter(io.TextIOBase):
+    """
+    Text stream that sends what is written to the client as
+    {"stream": name, "data": text} lines.
+    """
+    def __init__(self, sock_file, name: str, lock: threading.Lock):
+        self.sock_file = sock_file
+        self.name = name
+        self.lock = lock
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            with self.lock:
+                self.sock_file.write((json.dumps({'stream': self.name, 'data': text}) + '\n').encode('utf-8'))
+                self.sock_file.flush()
+        return len(text)
+
+def run_job(script: str, args: List[str], cwd: str, stdout, stderr) -> int:
+    """
+    Run a script as `__main__` with the given arguments and working
+    directory, returning its exit code.
+    """
+    from winlp_scripts.profiling import finish_profiling
+
+    saved = (sys.argv, os.getcwd(), list(sys.path))
+    # Set logging up for the job as in a new process, so that the
+    # script's `basicConfig` takes effect (rather than doing nothing
+    # because of the daemon's handlers), and logs to the job's stderr.
+    root = logging.getLogger()
+    root_handlers, root_level = root.handlers[:], root.level
+    for handler in root_handlers:
+        root.removeHandler(handler)
+    root.setLevel(logging.WARNING)
+    script_path = os.path.join(cwd, script)
+    sys.argv = [script_path] + list(args)
+    os.chdir(cwd)
+    # As when running `python3 <script>` with PYTHONPATH=.
+    sys.path[:0] = [cwd, os.path.dirname(script_path)]
+    code = 0
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                runpy.run_path(script_path, run_name='__main__')
+            except SystemExit as exit:
+                code = exit.code if isinstance(exit.code, int) else (0 if exit.code is None else 1)
+                if not isinstance(exit.code, (int, type(None))):
+                    print(exit.code, file=sys.stderr)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                finish_profiling()
+                sys.stdout.flush()
+    finally:
+        sys.argv, cwd, sys.path[:] = saved[0], saved[1], saved[2]
+        os.chdir(cwd)
+        # Drop any logging handlers the script added, which
+        # would write to this job's (closed) output.
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in root_handlers:
+            root.addHandler(handler)
+        root.setLevel(root_level)
+    return code
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # Another daemon checking whether this one is running
+            return
+        request = json.loads(line.decode('utf-8'))
+        command = request.get('command')
+
+        if command == 'stop':
+            self._reply({'exit': 0})
+            threading.Thread(target=self.server.shutdown).start()
+        elif command == 'status':
+            self._reply({'exit': 0, 'connections': len(self.server.cache),
+                         'jobs': self.server.jobs, 'uptime': time.time() - self.server.started})
+        elif command == 'run':
+            lock = threading.Lock()
+            stdout = _StreamWriter(self.wfile, 'stdout', lock)
+            stderr = _StreamWriter(self.wfile, 'stderr', lock)
+            with self.server.cache.installed():
+                code = run_job(request['script'], request.get('args', []),
+                               request.get('cwd', os.getcwd()), stdout, stderr)
+            self.server.jobs += 1
+            if code:
+                self.server.cache.clear()
+            self._reply({'exit': code})
+        else:
+            self._reply({'exit': 2, 'error': 'Unknown command "{}"'.format(command)})
+
+    def _reply(self, message: dict):
+        self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+class Daemon(socketserver.UnixStreamServer):
+    """
+    The daemon's server, which handles one job at a time.
+    """
+    def __init__(self, socket_path: str, ttl: float = SESSION_TTL):
+        if socket_path == default_socket_path():
+            _private_dir(os.path.dirname(socket_path))
+        _remove_stale_socket(socket_path)
+        # Create the socket as only connectable by the current user,
+        # rather than restricting it after it is bound.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, DaemonHandler)
+        finally:
+            os.umask(umask)
+        self.socket_path = socket_path
+        self.cache = ConnectionCache(ttl)
+        self.jobs = 0
+        self.started = time.time()
+
+    def preload(self, modules: List[str] = PRELOAD):
+        import importlib
+        for module in modules:
+            importlib.import_module(module)
+
+    def server_close(self):
+        super().server_close()
+        self.cache.clear()
+        # Our socket no longer accepts connections, so one that does
+        # is another daemon's that has since bound the same path.
+        try:
+            _remove_stale_socket(self.socket_path)
+        except DaemonException:
+            pass
+
+def request(message: dict, socket_path: str = None, stdout=None, stderr=None) -> dict:
+    """
+    Send a request to the daemon, copying any streamed output
+    to `stdout` and `stderr`, and return the final reply.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise DaemonException('The daemon is not running (start it with "python3 -m winlp_scripts.daemon start")')
+    with sock, sock.makefile('rwb') as sock_file:
+        sock_file.write((json.dumps(message) + '\n').encode('utf-8'))
+        sock_file.flush()
+        for line in sock_file:
+            reply = json.loads(line.decode('utf-8'))
+            if 'stream' in reply:
+                (stdout if reply['stream'] == 'stdout' else stderr).write(reply['data'])
+            else:
+                return reply
+    raise DaemonException('The daemon closed the connection')
+
+def run(script: str, args: List[str], socket_path: str = None, stdout=None, stderr=None) -> int:
+    """
+    Run a script in the daemon, returning its exit code.
+    """
+    return request({'command': 'run', 'script': script, 'args': list(args), 'cwd': os.getcwd()},
+                   socket_path, stdout, stderr)['exit']
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('-s', '--socket', default=default_socket_path(), help='Path of the Unix socket to use.')
+    sub = p.add_subparsers(dest='command', required=True)
+    start_p = sub.add_parser('start', help='Run the daemon (in the foreground).')
+    start_p.add_argument('--ttl', type=float, default=SESSION_TTL, help='Seconds to keep logged-in connections.')
+    run_p = sub.add_parser('run', help='Run a script in the daemon.')
+    run_p.add_argument('script')
+    run_p.add_argument('args', nargs='...')
+    sub.add_parser('status')
+    sub.add_parser('stop')
+
+    args = p.parse_args()
+
+    if args.command == 'start':
+        logging.basicConfig(level=logging.INFO)
+        daemon = Daemon(args.socket, ttl=args.ttl)
+        daemon.preload()
+        LOG.info('Listening on {}'.format(args.socket))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.server_close()
+    elif args.command == 'run':
+        sys.exit(run(args.script, args.args, args.socket))
+    else:
+        print(json.dumps(request({'command': args.command}, args.socket)))
@@ -1,36 +1,62 @@
+from email.generator import BytesGenerator
 from email.mime.text import MIMEText
 from email.utils import formatdate
 from email.mime.multipart import MIMEMultipart
+import csv
+import hashlib
+import io
+import json
+import os
 import smtplib
 from typing import List
 import time
 from html2text import html2text
 
+from winlp_scripts.profiling import stage, timed
+
+class EmailException(Exception): pass
+
+# Attempts at sending a message before giving up, and the
+# seconds to wait between them
+SEND_ATTEMPTS = 3
+SEND_RETRY_DELAY = 3
+
 def gmail_send(gmail_user,
                gmail_pass,
                to_addrs,
                msg: MIMEMultipart):
     """
     Actually perform the sending of the email.
+
+    Raises an EmailException if every attempt timed out, so that
+    callers never take an unsent message as sent.
     """
+    del msg['To']
     msg['To'] = ','.join(to_addrs)
-    for i in range(3):
+    for i in range(SEND_ATTEMPTS):
         try:
-            server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-            server.ehlo()
-            server.login(gmail_user, gmail_pass)
-            server.sendmail(gmail_user, to_addrs, msg.as_string())
-            server.close()
+            with stage('gmail.send') as record:
+                msg_text = msg.as_string()
+                server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
+                server.ehlo()
+                server.login(gmail_user, gmail_pass)
+                server.sendmail(gmail_user, to_addrs, msg_text)
+                server.close()
+                record.add(bytes=len(msg_text), items=1)
             return server
         except TimeoutError as te:
-            print("Attempt #{}/{} timed out. ".format(i+1, 3))
-    time.sleep(3)
+            print("Attempt #{}/{} timed out. ".format(i+1, SEND_ATTEMPTS))
+            if i + 1 < SEND_ATTEMPTS:
+                time.sleep(SEND_RETRY_DELAY)
+    raise EmailException('Sending to {} timed out {} times'.format(','.join(to_addrs), SEND_ATTEMPTS))
 
 
+@timed('render.email', items=1)
 def craft_text_email(text, subject) -> MIMEMultipart:
     part = MIMEText(text, "plain")
     return draft_msg(subject, [part])
 
+@timed('render.email', items=1)
 def create_html_email(html, subject, ) -> MIMEMultipart:
     html_part = MIMEText(html, 'html')
     text_part = MIMEText(html2text(html), 'plain')
@@ -50,4 +76,111 @@ def draft_msg(subject: str,
     msg['Subject'] = subject
     for part in parts:
         msg.attach(part)
-    return msg
\ No newline at end of file
+    return msg
+
+class MailSink(object):
+    """
+    Dry-run destination for a mail merge: each message is written
+    out as it is added, either appended to an mbox file (if `path`
+    ends in ".mbox") or as a numbered .eml file in the directory
+    `path`, so that a whole batch can be reviewed in a mail client.
+
+    An index CSV of the recipients, subjects, sizes and attachment
+    names is written alongside (`<path>.csv` for an mbox, or
+    `index.csv` in the directory).
+    """
+    INDEX_FIELDS = ['number', 'file', 'to', 'subject', 'bytes', 'attachments']
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mbox = path.endswith('.mbox')
+        self.count = 0
+        if self.mbox:
+            self._mbox_f = open(path, 'wb')
+            index_path = path + '.csv'
+        else:
+            os.makedirs(path, exist_ok=True)
+            index_path = os.path.join(path, 'index.csv')
+        self._index_f = open(index_path, 'w', newline='')
+        self._index = csv.writer(self._index_f)
+        self._index.writerow(self.INDEX_FIELDS)
+
+    def add(self, to_addrs: List[str], msg: MIMEMultipart):
+        """
+        Write out the message, addressed to `to_addrs` as `gmail_send` would.
+        """
+        # Setting a header adds another, rather than replacing it
+        del msg['To']
+        msg['To'] = ','.join(to_addrs)
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, mangle_from_=self.mbox).flatten(msg)
+        msg_bytes = buffer.getvalue()
+
+        self.count += 1
+        if self.mbox:
+            filename = os.path.basename(self.path)
+            self._mbox_f.write('From MAILER-DAEMON {}\n'.format(time.asctime()).encode('ascii'))
+            self._mbox_f.write(msg_bytes.rstrip(b'\n') + b'\n\n')
+        else:
+            filename = '{:05d}.eml'.format(self.count)
+            with open(os.path.join(self.path, filename), 'wb') as eml_f:
+                eml_f.write(msg_bytes)
+
+        attachments = [part.get_filename() for part in msg.walk() if part.get_filename()]
+        self._index.writerow([self.count, filename, msg['To'], msg['Subject'],
+                              len(msg_bytes), ';'.join(attachments)])
+
+    def close(self):
+        if self.mbox:
+            self._mbox_f.close()
+        self._index_f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# Headers that differ each time the same message is drafted or sent
+VOLATILE_HEADERS = {'date', 'message-id', 'to', 'content-type'}
+
+def message_digest(to_addrs: List[str], msg: MIMEMultipart) -> str:
+    """
+    A hash of the recipients and contents of a message, which doesn't
+    depend on when it was drafted (its Date and MIME boundaries).
+    """
+    h = hashlib.sha256(json.dumps(list(to_addrs)).encode('utf-8'))
+    for part in msg.walk():
+        headers = [(name.lower(), str(value)) for name, value in part.items()
+                   if name.lower() not in VOLATILE_HEADERS]
+        params = [param for param in part.get_params() or [] if param[0] != 'boundary']
+        h.update(json.dumps([headers, params]).encode('utf-8'))
+        if not part.is_multipart():
+            h.update(part.get_payload(decode=True) or b'')
+    return h.hexdigest()
+
+class SentLog(object):
+    """
+    Record of the messages sent to each set of recipients, so that
+    rerunning a mail merge only sends the messages that are new or
+    have changed since.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.digests = {}
+        if os.path.exists(path):
+            with open(path) as log_f:
+                self.digests = json.load(log_f)
+
+    def is_sent(self, to_addrs: List[str], msg: MIMEMultipart) -> bool:
+        return self.digests.get(','.join(to_addrs)) == message_digest(to_addrs, msg)
+
+    def record(self, to_addrs: List[str], msg: MIMEMultipart):
+        self.digests[','.join(to_addrs)] = message_digest(to_addrs, msg)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as log_f:
+            json.dump(self.digests, log_f, indent=1, sort_keys=True)
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,13 @@
+"""
+Local stand-ins for softconf, LimeSurvey and Google Sheets, so that
+the tests and benchmarks can run offline with predictable timings.
+
+The services replay either a recording of the real services
+(see `data.record`) or synthetic data of a given size, with an
+optional delay added to every request. To run them on their own:
+
+    python -m winlp_scripts.fake_services --rows 1000 --latency 0.05
+"""
+
+from winlp_scripts.fake_services.data import FakeData, record
+from winlp_scripts.fake_services.server import FakeServices
@@ -0,0 +1,46 @@
+"""
+Run the fake services until interrupted, printing the config file
+settings that point the clients at them.
+"""
+import sys
+from argparse import ArgumentParser
+
+import yaml
+
+from winlp_scripts.fake_services import FakeData, FakeServices, record
+from winlp_scripts.utils import load_yml
+
+if __name__ == '__main__':
+    p = ArgumentParser()
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('-p', '--port', type=int, default=8000)
+    p.add_argument('-n', '--rows', type=int, default=100, help='Number of submissions, survey responses and grants to generate.')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--text-size', type=int, default=150, help='Number of words in each generated abstract.')
+    p.add_argument('--file-kb', type=int, default=1, help='Size of each generated survey attachment, in KB.')
+    p.add_argument('-m', '--mapping', type=load_yml, default='data/budget_mapping.yml', help='Budget mapping for the generated budget sheet.')
+    p.add_argument('-l', '--latency', type=float, default=0.0, help='Delay added to every request, in seconds.')
+    p.add_argument('-r', '--replay', help='Directory of a recording to serve instead of generated data.')
+    p.add_argument('--record', help='Record the real services in the config file to this directory, and exit.')
+    p.add_argument('-c', '--config', type=load_yml, help='Configuration file of the services to record.')
+    p.add_argument('--survey', type=int, action='append', default=[], help='LimeSurvey survey to record (may be repeated).')
+    p.add_argument('--sheet', action='append', default=[], help='Google sheet to record (may be repeated).')
+
+    args = p.parse_args()
+
+    if args.record:
+        if args.config is None:
+            p.error('--record requires a --config with the real services')
+        record(args.config, args.record, survey_ids=args.survey, sheet_ids=args.sheet)
+        sys.exit(0)
+
+    if args.replay:
+        data = FakeData.load(args.replay)
+    else:
+        data = FakeData.synthetic(args.rows, seed=args.seed, text_size=args.text_size,
+                                  file_kb=args.file_kb, budget_mapping=args.mapping)
+
+    services = FakeServices(data, latency=args.latency, host=args.host, port=args.port)
+    print(yaml.safe_dump(services.config(), default_flow_style=False))
+    print('Sheets: {}'.format(', '.join(data.sheets)), file=sys.stderr)
+    services.serve_forever()
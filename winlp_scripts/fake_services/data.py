@@ -0,0 +1,174 @@
+"""
+The data served by the fake services, either generated
+(see `synthetic`) or recorded from the real services.
+
+A recording is a directory with:
+
+    submissions.pkl         softconf submissions, by softconf field key
+    reviews.pkl             softconf reviews, by softconf field key
+    submission_page.html    the softconf submission page editor
+    survey_<id>.pkl         LimeSurvey responses to each survey
+    survey_<id>.zip         the files uploaded with those responses
+    sheet_<id>.json         the rows of each tab of each Google sheet
+"""
+
+import glob
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from pandas import DataFrame, read_pickle
+
+from winlp_scripts.fake_services import synthetic
+
+# Every field softconf can export for a submission
+SUBMISSION_FIELDS = ['paperID', 'passcode', 'title', 'authors', 'acceptStatus', 'conditions',
+                     'abstract', 'dateReceived', 'authorInfo', 'contactUsername', 'contactTitle',
+                     'contactFirstname', 'contactLastname', 'contactAffiliation',
+                     'contactAffiliationDpt', 'contactJobFunction', 'contactPhone', 'contactMobile',
+                     'contactFax', 'email', 'contactAddress', 'contactCity', 'contactState',
+                     'contactZip', 'contactCountry', 'contactBiography', 'authorsWithAffiliations',
+                     'allAuthorEmails', 'field_GenderInfo', 'field_RaceInfo', 'field_RegionInfo',
+                     'field_CitizenshipInfo', 'field_race_specification']
+
+# Sheet ids of the synthetic Google sheets
+NOTES_SHEET_ID = 'notes'
+BUDGET_SHEET_ID = 'budget'
+
+class FakeData(object):
+    """
+    The softconf, LimeSurvey and Google Sheets data to serve.
+    """
+    def __init__(self, submissions: DataFrame = None, reviews: DataFrame = None,
+                 submission_page: str = synthetic.SUBMISSION_PAGE,
+                 surveys: Dict[int, DataFrame] = None,
+                 attachments: Dict[int, bytes] = None,
+                 sheets: Dict[str, Dict[str, List[List[str]]]] = None):
+        self.submissions = submissions if submissions is not None else DataFrame()
+        self.reviews = reviews if reviews is not None else DataFrame()
+        self.submission_page = submission_page
+        self.surveys = surveys or {}
+        # Zips of uploaded files by survey; generated from
+        # the responses when not recorded.
+        self.attachments = attachments or {}
+        # Rows of each tab (in order) of each sheet
+        self.sheets = sheets or {}
+
+    @classmethod
+    def synthetic(cls, rows: int = 100, seed: int = 0, text_size: int = 150,
+                  reviews_per_paper: int = 3, file_kb: int = 1, budget_mapping: dict = None):
+        """
+        Generate `rows` submissions (with their reviews and a notes sheet),
+        `rows` responses to survey 1, and if a budget mapping is given,
+        a budget sheet with `rows` grants.
+        """
+        submissions = synthetic.submissions(rows, seed=seed, text_size=text_size)
+        sheets = OrderedDict([(NOTES_SHEET_ID, {'Notes': synthetic.notes_sheet(submissions, seed=seed)})])
+        if budget_mapping is not None:
+            sheets[BUDGET_SHEET_ID] = OrderedDict([
+                ('Summary', [['Total'], ['0']]),
+                ('Travel Grants', synthetic.budget_sheet(budget_mapping, rows, seed=seed))])
+        return cls(submissions=submissions,
+                   reviews=synthetic.reviews(submissions, reviews_per_paper, seed=seed,
+                                             text_size=text_size * 2 // 3),
+                   surveys={1: synthetic.survey_responses(rows, seed=seed, file_kb=file_kb)},
+                   sheets=sheets)
+
+    def attachments_zip(self, survey_id: int, response_ids: List[int]) -> bytes:
+        if survey_id in self.attachments:
+            return self.attachments[survey_id]
+        return synthetic.attachments_zip(self.surveys[survey_id], response_ids)
+
+    @classmethod
+    def load(cls, directory: str):
+        """
+        Load a recording.
+        """
+        def path(name):
+            return os.path.join(directory, name)
+
+        data = cls()
+        if os.path.exists(path('submissions.pkl')):
+            data.submissions = read_pickle(path('submissions.pkl'))
+        if os.path.exists(path('reviews.pkl')):
+            data.reviews = read_pickle(path('reviews.pkl'))
+        if os.path.exists(path('submission_page.html')):
+            with open(path('submission_page.html')) as page_f:
+                data.submission_page = page_f.read()
+        for survey_path in glob.glob(path('survey_*.pkl')):
+            survey_id = int(os.path.basename(survey_path)[7:-4])
+            data.surveys[survey_id] = read_pickle(survey_path)
+            if os.path.exists(survey_path[:-4] + '.zip'):
+                with open(survey_path[:-4] + '.zip', 'rb') as zip_f:
+                    data.attachments[survey_id] = zip_f.read()
+        for sheet_path in glob.glob(path('sheet_*.json')):
+            with open(sheet_path) as sheet_f:
+                data.sheets[os.path.basename(sheet_path)[6:-5]] = json.load(sheet_f,
+                                                                             object_pairs_hook=OrderedDict)
+        return data
+
+    def save(self, directory: str):
+        """
+        Save the data as a recording in `directory`.
+        """
+        def path(name):
+            return os.path.join(directory, name)
+
+        os.makedirs(directory, exist_ok=True)
+        self.submissions.to_pickle(path('submissions.pkl'))
+        self.reviews.to_pickle(path('reviews.pkl'))
+        with open(path('submission_page.html'), 'w') as page_f:
+            page_f.write(self.submission_page)
+        for survey_id, responses in self.surveys.items():
+            responses.to_pickle(path('survey_{}.pkl'.format(survey_id)))
+        for survey_id, zip_bytes in self.attachments.items():
+            with open(path('survey_{}.zip'.format(survey_id)), 'wb') as zip_f:
+                zip_f.write(zip_bytes)
+        for sheet_id, tabs in self.sheets.items():
+            with open(path('sheet_{}.json'.format(sheet_id)), 'w') as sheet_f:
+                json.dump(tabs, sheet_f)
+
+def record(conf: dict, directory: str,
+           survey_ids: Iterable[int] = (), sheet_ids: Iterable[str] = ()) -> FakeData:
+    """
+    Download the data from the real services in the config file,
+    and save it as a recording in `directory`.
+    """
+    from winlp_scripts.softconf import SoftconfConnection
+    from winlp_scripts.limesurvey import LimeSurveyConnection
+    from winlp_scripts.google_sheets import GoogleSheetInterface, get_sheet_by_index
+
+    data = FakeData()
+    if conf.get('softconf'):
+        scc = SoftconfConnection.from_conf(conf)
+        data.submissions = scc.submission_information(keys=SUBMISSION_FIELDS)
+        data.reviews = scc.reviews()
+        data.submission_page = scc.download_submission_page()
+
+    survey_ids = list(survey_ids)
+    if survey_ids:
+        with LimeSurveyConnection.from_conf(conf) as lsc:
+            for survey_id in survey_ids:
+                responses = lsc.export_responses(survey_id)
+                data.surveys[survey_id] = responses
+                data.attachments[survey_id] = lsc.get_download_for_response_list(
+                    survey_id, list(responses['id']), bytes=True)
+
+    sheet_ids = list(sheet_ids)
+    if sheet_ids:
+        gsi = GoogleSheetInterface.from_conf(conf)
+        for sheet_id in sheet_ids:
+            tabs = OrderedDict()
+            index = 0
+            while True:
+                properties = get_sheet_by_index(gsi.service, sheet_id, index)
+                if properties is None:
+                    break
+                rows = gsi.get_sheet(sheet_id, page_index=index, has_headers=False)
+                tabs[properties['title']] = rows.fillna('').values.tolist()
+                index += 1
+            data.sheets[sheet_id] = tabs
+
+    data.save(directory)
+    return data
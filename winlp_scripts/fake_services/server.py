@@ -0,0 +1,367 @@
+"""
+A local HTTP server standing in for softconf, LimeSurvey and the
+Google Sheets API, serving the data in a `FakeData`.
+
+Each service lives under its own prefix, so the clients can be
+pointed at it through their usual "url_base" settings:
+
+    /softconf/      softconf (login, makeSpreadsheet, getPaper, the page editor)
+    /limesurvey/    LimeSurvey (the remotecontrol XML-RPC API, login, file downloads)
+    /sheets/        the Google Sheets v4 API (spreadsheets.get, values.get),
+                    and the Drive v3 files.get used to check for changes
+"""
+
+import base64
+import io
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Union
+from urllib.parse import urlsplit, parse_qs, unquote
+from xmlrpc.server import SimpleXMLRPCDispatcher
+
+import xlwt
+from pandas import DataFrame, isna
+
+from winlp_scripts.fake_services.data import FakeData, BUDGET_SHEET_ID
+from winlp_scripts.utils import col_letter
+
+SERVICES = ('softconf', 'limesurvey', 'sheets')
+
+# Softconf can export at most this many fields at once
+SOFTCONF_MAX_FIELDS = 42
+
+LOGIN_PAGE = '<html><head><title>START Conference Manager Login</title></head><body></body></html>'
+MANAGER_PAGE = '<html><head><title>START Conference Manager</title></head><body></body></html>'
+LIMESURVEY_LOGIN_PAGE = ('<html><body><form method="post">'
+                         '<input type="hidden" name="YII_CSRF_TOKEN" value="{}"/>'
+                         '</form></body></html>')
+
+A1_RANGE = re.compile(r"^(?:'?(?P<title>.*?)'?!)?(?P<c1>[A-Za-z]+)(?P<r1>\d*)(?::(?P<c2>[A-Za-z]+)(?P<r2>\d*))?$")
+
+def xls_bytes(df: DataFrame, columns: List[str]) -> bytes:
+    """
+    Write the given columns of `df` (blank where `df` has no such
+    column) to an xls workbook, as softconf and LimeSurvey export them.
+    """
+    book = xlwt.Workbook(encoding='utf-8')
+    sheet = book.add_sheet('Sheet1')
+    for j, column in enumerate(columns):
+        sheet.write(0, j, column)
+    for j, column in enumerate(columns):
+        if column not in df:
+            continue
+        for i, value in enumerate(df[column].tolist()):
+            if value is None or (not isinstance(value, str) and isna(value)):
+                continue
+            sheet.write(i + 1, j, value.item() if hasattr(value, 'item') else value)
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+def sheet_range(rows: List[List[str]], a1_range: str) -> List[List[str]]:
+    """
+    Return the cells of `rows` in an A1 range like "A1:ZZZ999",
+    with trailing empty cells and rows removed as the Sheets API does.
+    """
+    match = A1_RANGE.match(a1_range)
+    first_col, last_col = col_letter(match.group('c1')), col_letter(match.group('c2') or match.group('c1'))
+    first_row = int(match.group('r1') or 1) - 1
+    last_row = int(match.group('r2')) if match.group('r2') else len(rows)
+
+    values = []
+    for row in rows[first_row:last_row]:
+        row = [str(cell) if cell is not None else '' for cell in row[first_col:last_col + 1]]
+        while row and row[-1] == '':
+            row.pop()
+        values.append(row)
+    while values and not values[-1]:
+        values.pop()
+    return values
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def services(self) -> 'FakeServices':
+        return self.server.services
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        self.form = {k: v[-1] for k, v in parse_qs(self.body.decode('utf-8', 'replace')).items()} \
+            if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded') else {}
+
+        service, _, path = url.path.lstrip('/').partition('/')
+        if service not in SERVICES:
+            return self._send(404, b'Not Found')
+
+        self.services.requests.append((service, method, self.path))
+        self.services.delay(service)
+        getattr(self, '_' + service)(method, path)
+
+    def _send(self, status: int, body: Union[bytes, str], content_type: str = 'text/html',
+              headers: dict = None):
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _logged_in(self, cookie_name: str) -> bool:
+        cookies = dict(c.strip().split('=', 1) for c in self.headers.get('Cookie', '').split(';') if '=' in c)
+        return cookies.get(cookie_name) in self.services.sessions
+
+    def _new_session(self, cookie_name: str) -> dict:
+        token = uuid.uuid4().hex
+        self.services.sessions.add(token)
+        return {'Set-Cookie': '{}={}; Path=/'.format(cookie_name, token)}
+
+    # -------------------------------------------
+    # Softconf
+    # -------------------------------------------
+    def _softconf(self, method: str, path: str):
+        data = self.services.data
+        scmd = self.query.get('scmd')
+        if path == 'login/scmd.cgi' and scmd == 'login':
+            if (self.form.get('username'), self.form.get('password')) == self.services.credentials:
+                return self._send(200, MANAGER_PAGE, headers=self._new_session('softconf'))
+            return self._send(200, LOGIN_PAGE)
+
+        if path == 'pub/scmd.cgi' and scmd == 'getPaper':
+            from winlp_scripts.fake_services.synthetic import pdf
+            return self._send(200, pdf(int(self.query.get('paperID', 0))), 'application/pdf')
+
+        if not self._logged_in('softconf'):
+            return self._send(200, LOGIN_PAGE)
+
+        if path == 'manager/scmd.cgi' and scmd == 'makeSpreadsheet':
+            table = {'submissions': data.submissions,
+                     'customreviews': data.reviews}.get(self.form.get('Type'), DataFrame())
+            fields = [self.form.get('Field{{{}}}'.format(i)) for i in range(SOFTCONF_MAX_FIELDS)]
+            return self._send(200, xls_bytes(table, [f for f in fields if f]), 'application/vnd.ms-excel')
+
+        if path == 'manager/scmd.cgi' and scmd == 'submitPaperCustom_editor':
+            return self._send(200, data.submission_page)
+
+        self._send(404, 'Not Found')
+
+    # -------------------------------------------
+    # LimeSurvey
+    # -------------------------------------------
+    def _limesurvey(self, method: str, path: str):
+        if path.endswith('admin/remotecontrol'):
+            response = self.services.rpc._marshaled_dispatch(self.body)
+            return self._send(200, response, 'text/xml')
+
+        if path.endswith('admin/authentication/sa/login'):
+            if method == 'GET':
+                return self._send(200, LIMESURVEY_LOGIN_PAGE.format(self.services.csrf_token))
+            if ((self.form.get('user'), self.form.get('password')) == self.services.credentials and
+                    self.form.get('YII_CSRF_TOKEN') == self.services.csrf_token):
+                return self._send(200, MANAGER_PAGE, headers=self._new_session('limesurvey'))
+            return self._send(200, LIMESURVEY_LOGIN_PAGE.format(self.services.csrf_token))
+
+        if path.endswith('admin/authentication/sa/logout'):
+            return self._send(200, LIMESURVEY_LOGIN_PAGE.format(self.services.csrf_token))
+
+        match = re.search(r'actionDownloadfiles/(?:surveyid|iSurveyId)/(\d+)/sResponseId/([\d,]+)', path)
+        if match:
+            if not self._logged_in('limesurvey'):
+                return self._send(200, LIMESURVEY_LOGIN_PAGE.format(self.services.csrf_token))
+            survey_id = int(match.group(1))
+            if survey_id not in self.services.data.surveys:
+                return self._send(404, 'Not Found')
+            response_ids = [int(i) for i in match.group(2).split(',')]
+            return self._send(200, self.services.data.attachments_zip(survey_id, response_ids),
+                              'application/zip')
+
+        self._send(404, 'Not Found')
+
+    # -------------------------------------------
+    # Google Sheets
+    # -------------------------------------------
+    def _sheets(self, method: str, path: str):
+        # Drive v3 files.get, for the sheet's version
+        match = re.match(r'files/([^/]+)$', path)
+        if match and unquote(match.group(1)) in self.services.data.sheets:
+            sheet_id = unquote(match.group(1))
+            return self._send(200, json.dumps({'id': sheet_id,
+                                               'version': str(self.services.sheet_versions.get(sheet_id, 1))}),
+                              'application/json')
+
+        match = re.match(r'v4/spreadsheets/([^/]+)(?:/values/(.+))?$', path)
+        if not match or unquote(match.group(1)) not in self.services.data.sheets:
+            return self._send(404, json.dumps({'error': {'code': 404, 'message': 'Requested entity was not found.'}}),
+                              'application/json')
+
+        sheet_id = unquote(match.group(1))
+        tabs = self.services.data.sheets[sheet_id]
+        if match.group(2) is None:
+            sheets = [{'properties': {'sheetId': index, 'title': title, 'index': index}}
+                      for index, title in enumerate(tabs)]
+            return self._send(200, json.dumps({'spreadsheetId': sheet_id, 'sheets': sheets}),
+                              'application/json')
+
+        a1_range = unquote(match.group(2))
+        title = A1_RANGE.match(a1_range).group('title') or next(iter(tabs))
+        rows = sheet_range(tabs.get(title, []), a1_range)
+        self._send(200, json.dumps({'range': a1_range, 'majorDimension': 'ROWS', 'values': rows}),
+                   'application/json')
+
+
+class FakeServices(object):
+    """
+    The fake services, running on a background thread:
+
+        with FakeServices(FakeData.synthetic(rows=1000), latency=0.05) as services:
+            scc = SoftconfConnection.from_conf(services.config())
+
+    `latency` is the delay (in seconds) added to every request, either
+    a number, or a dict of delays by service ("softconf", "limesurvey",
+    "sheets").
+    """
+    def __init__(self, data: FakeData = None, latency: Union[float, dict] = 0.0,
+                 username: str = 'user', password: str = 'pass',
+                 host: str = '127.0.0.1', port: int = 0):
+        self.data = data if data is not None else FakeData.synthetic()
+        self.latency = latency
+        self.credentials = (username, password)
+        self.csrf_token = uuid.uuid4().hex
+        self.sessions = set()
+        self.session_keys = set()
+        # (service, method, path) of every request received
+        self.requests = []
+        # Drive version of each sheet, bumped by `update_sheet`
+        self.sheet_versions = {}
+
+        self.rpc = SimpleXMLRPCDispatcher(allow_none=True)
+        for name in ['get_session_key', 'release_session_key', 'list_surveys',
+                     'list_questions', 'export_responses']:
+            self.rpc.register_function(getattr(self, '_rpc_' + name), name)
+
+        self._server = ThreadingHTTPServer((host, port), FakeServiceHandler)
+        self._server.daemon_threads = True
+        self._server.services = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    @property
+    def softconf_url(self) -> str:
+        return self.url + 'softconf/'
+
+    @property
+    def limesurvey_url(self) -> str:
+        return self.url + 'limesurvey/'
+
+    @property
+    def sheets_url(self) -> str:
+        return self.url + 'sheets/'
+
+    def config(self) -> dict:
+        """
+        Return config file settings that point the clients at the fake services.
+        """
+        user, password = self.credentials
+        google = {'api_key': 'fake', 'url_base': self.sheets_url}
+        if BUDGET_SHEET_ID in self.data.sheets:
+            google['budget_sheet_id'] = BUDGET_SHEET_ID
+        return {'softconf': {'user': user, 'pass': password, 'url_base': self.softconf_url},
+                'limesurvey': {'user': user, 'pass': password, 'url_base': self.limesurvey_url},
+                'google': google,
+                'http': {'retries': 0}}
+
+    def update_sheet(self, sheet_id: str, title: str, rows: List[List[str]]):
+        """
+        Replace the rows of a tab of a sheet, as if edited.
+        """
+        self.data.sheets[sheet_id][title] = rows
+        self.sheet_versions[sheet_id] = self.sheet_versions.get(sheet_id, 1) + 1
+
+    def delay(self, service: str):
+        latency = self.latency.get(service, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serve on the current thread until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # -------------------------------------------
+    # LimeSurvey remotecontrol API
+    # -------------------------------------------
+    def _check_key(self, key: str):
+        if key not in self.session_keys:
+            return {'status': 'Invalid session key'}
+
+    def _rpc_get_session_key(self, username: str, password: str):
+        if (username, password) != self.credentials:
+            return {'status': 'Invalid user name or password'}
+        key = uuid.uuid4().hex
+        self.session_keys.add(key)
+        return key
+
+    def _rpc_release_session_key(self, key: str):
+        self.session_keys.discard(key)
+        return 'OK'
+
+    def _rpc_list_surveys(self, key: str):
+        return self._check_key(key) or [{'sid': str(survey_id), 'surveyls_title': 'Survey {}'.format(survey_id),
+                                         'active': 'Y'} for survey_id in self.data.surveys]
+
+    def _rpc_list_questions(self, key: str, survey_id):
+        if self._check_key(key) or int(survey_id) not in self.data.surveys:
+            return self._check_key(key) or {'status': 'Error: Invalid survey ID'}
+        return [{'qid': str(i), 'title': column, 'question': column}
+                for i, column in enumerate(self.data.surveys[int(survey_id)].columns)]
+
+    def _rpc_export_responses(self, key: str, survey_id, document_type: str = 'xls',
+                              language: str = '', completion: str = 'all'):
+        if self._check_key(key) or int(survey_id) not in self.data.surveys:
+            return self._check_key(key) or {'status': 'Error: Invalid survey ID'}
+        responses = self.data.surveys[int(survey_id)]
+        return base64.b64encode(xls_bytes(responses, list(responses.columns))).decode('ascii')
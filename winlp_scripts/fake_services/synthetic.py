@@ -0,0 +1,230 @@
+"""
+Generators for synthetic softconf, LimeSurvey and Google Sheets data,
+with the same columns as the real exports, for use when there is no
+recording of the real services to replay.
+"""
+
+import io
+import json
+import zipfile
+from typing import List
+
+import numpy as np
+from pandas import DataFrame
+
+from winlp_scripts.utils import col_letter
+from winlp_scripts.softconf import (PAPER_ID, PASSCODE, PAPER_TITLE, ALL_NAMES, PAPER_ACCEPT, PAPER_ABSTRACT,
+                                    PAPER_RECEIVED, MC_USERNAME, MC_FIRST, MC_LAST, MC_AFFILLIATION, MC_EMAIL,
+                                    MC_COUNTRY, ALL_EMAILS, REVIEWER, REVIEWER_FIRST, REVIEWER_LAST,
+                                    REVIEWER_EMAIL, SCORE_CLARITY, SCORE_ORIGINALITY, SCORE_CORRECTNESS,
+                                    SCORE_COMPARISON, SCORE_THOROUGHNESS, SCORE_IMPACT, REVIEWER_CONFIDENCE,
+                                    SCORE_RECOMMENDATION, REVIEW_DETAILED_COMMENTS, REVIEW_AUTHOR_QUESTIONS)
+
+FIRST_NAMES = ['Ana', 'Bo', 'Chidi', 'Dana', 'Emeka', 'Fatima', 'Gita', 'Hana', 'Ines', 'Jun',
+               'Kemal', 'Lena', 'Maya', 'Nia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sara', 'Tariq']
+LAST_NAMES = ['Alvarez', 'Bello', 'Chen', 'Diallo', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito',
+              'Jensen', 'Kim', 'Lopez', 'Mensah', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Singh']
+AFFILIATIONS = ['University of Lagos', 'Stanford University', 'University of Washington',
+                'Universidad de Chile', 'IIT Bombay', 'University of Cambridge', 'Tsinghua University',
+                'Makerere University', 'McGill University', 'Saarland University']
+DOMAINS = ['unilag.edu.ng', 'stanford.edu', 'uw.edu', 'uchile.cl', 'iitb.ac.in',
+           'cam.ac.uk', 'tsinghua.edu.cn', 'mak.ac.ug', 'mcgill.ca', 'uni-saarland.de']
+COUNTRIES = ['Nigeria', 'USA', 'USA', 'Chile', 'India', 'UK', 'China', 'Uganda', 'Canada', 'Germany']
+WORDS = ('language model translation corpus annotation low resource speech parsing '
+         'morphology evaluation dataset bias fairness multilingual dialect embedding '
+         'transfer learning summarization dialogue question answering').split()
+
+# Categories of the reimbursement survey: (files column, amount column)
+REIMBURSEMENT_FIELDS = [('regfile', 'registration'), ('flightdoc', 'flightamt'),
+                        ('bustraindocs', 'bustrain'), ('hoteldoc', 'hotelprice'),
+                        ('visadoc', 'visaamt'), ('addldocs', 'addlcosts')]
+
+def _text(rng: np.random.Generator, num_words: int) -> str:
+    return ' '.join(str(w) for w in rng.choice(WORDS, num_words))
+
+def _person(rng: np.random.Generator, i: int):
+    first = FIRST_NAMES[rng.integers(len(FIRST_NAMES))]
+    last = LAST_NAMES[rng.integers(len(LAST_NAMES))]
+    org = int(rng.integers(len(AFFILIATIONS)))
+    email = '{}.{}{}@{}'.format(first, last, i, DOMAINS[org]).lower()
+    return first, last, email, org
+
+def submissions(n: int = 100, seed: int = 0, text_size: int = 150) -> DataFrame:
+    """
+    Return `n` submissions, with abstracts of `text_size` words
+    and one to four authors each.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for paper_id in range(1, n + 1):
+        authors = [_person(rng, int(rng.integers(n * 3))) for _ in range(rng.integers(1, 5))]
+        first, last, email, org = authors[0]
+        rows.append({PAPER_ID: paper_id,
+                     PASSCODE: 'X{:06d}'.format(rng.integers(1000000)),
+                     PAPER_TITLE: _text(rng, 8).title(),
+                     ALL_NAMES: ', '.join('{} {}'.format(a[0], a[1]) for a in authors),
+                     PAPER_ACCEPT: str(rng.choice(['Accept', 'Reject', ''])),
+                     PAPER_ABSTRACT: _text(rng, text_size),
+                     PAPER_RECEIVED: '2020-0{}-{:02d}'.format(rng.integers(6, 9), rng.integers(1, 29)),
+                     MC_USERNAME: '{}{}'.format(first, last).lower(),
+                     MC_FIRST: first,
+                     MC_LAST: last,
+                     MC_AFFILLIATION: AFFILIATIONS[org],
+                     MC_EMAIL: email,
+                     MC_COUNTRY: COUNTRIES[org],
+                     ALL_EMAILS: '; '.join(a[2] for a in authors)})
+    return DataFrame(rows)
+
+def reviews(submission_data: DataFrame, per_paper: int = 3, seed: int = 0,
+            text_size: int = 100) -> DataFrame:
+    """
+    Return `per_paper` reviews of each submission, drawn from a pool
+    of reviewers a third the size of the number of reviews.
+    """
+    rng = np.random.default_rng(seed)
+    pool = [_person(rng, i) for i in range(max(len(submission_data) * per_paper // 3, per_paper))]
+    score_keys = [SCORE_CLARITY, SCORE_ORIGINALITY, SCORE_CORRECTNESS, SCORE_COMPARISON,
+                  SCORE_THOROUGHNESS, SCORE_IMPACT, REVIEWER_CONFIDENCE, SCORE_RECOMMENDATION]
+    rows = []
+    for paper_id in submission_data[PAPER_ID]:
+        for r in rng.choice(len(pool), per_paper, replace=False):
+            first, last, email, _ = pool[r]
+            row = {PAPER_ID: paper_id, REVIEWER: '{}{}'.format(first, last).lower(),
+                   REVIEWER_FIRST: first, REVIEWER_LAST: last, REVIEWER_EMAIL: email}
+            row.update({key: int(rng.integers(1, 6)) for key in score_keys})
+            row[REVIEW_DETAILED_COMMENTS] = _text(rng, text_size)
+            row[REVIEW_AUTHOR_QUESTIONS] = _text(rng, text_size // 5)
+            rows.append(row)
+    return DataFrame(rows)
+
+def notes_sheet(submission_data: DataFrame, seed: int = 0) -> List[List[str]]:
+    """
+    Return the rows (header first) of an author notes sheet, with the
+    paper ID first, the decision third from last, and the note last.
+    """
+    rng = np.random.default_rng(seed)
+    rows = [['ID', 'Title', 'Decision', 'Reviewer', 'Note']]
+    for paper_id, title in zip(submission_data[PAPER_ID], submission_data[PAPER_TITLE]):
+        rows.append([str(paper_id), title, str(rng.choice(['accept', 'reject'])),
+                     'chair', _text(rng, 20)])
+    return rows
+
+def budget_sheet(mapping: dict, n: int = 50, seed: int = 0) -> List[List[str]]:
+    """
+    Return the rows (header first) of a travel grant budget sheet,
+    with its columns laid out by the given budget mapping
+    (see data/budget_mapping.yml).
+    """
+    rng = np.random.default_rng(seed)
+    columns = {key: col_letter(letter) for key, letter in mapping.items()
+               if isinstance(letter, str) and key != 'last_col'}
+    width = max(columns.values()) + 1
+    header = [''] * width
+    for key, index in columns.items():
+        header[index] = key
+
+    rows = [header]
+    for i in range(n):
+        first, last, email, org = _person(rng, i)
+        estimates = {key: int(rng.integers(0, 1500)) for key in ['e_air', 'e_train', 'e_hotel']}
+        values = {'name': '{} {}'.format(first, last), 'email': email,
+                  'origin': COUNTRIES[org], 'approved': str(rng.choice(['Y', 'N'])),
+                  'r_air': max(estimates['e_air'] + int(rng.integers(-200, 400)), 0),
+                  'r_train': max(estimates['e_train'] + int(rng.integers(-100, 200)), 0),
+                  'r_hotel': max(estimates['e_hotel'] + int(rng.integers(-200, 400)), 0)}
+        values.update(estimates)
+        values['paper'] = 'Submission {}'.format(i + 1)
+        if values['approved'] == 'Y':
+            values['awarded'] = '{:.2f}'.format(sum(estimates.values()))
+        row = [''] * width
+        for key, value in values.items():
+            if key in columns:
+                row[columns[key]] = '${:,.2f}'.format(value) if isinstance(value, int) else value
+        rows.append(row)
+    return rows
+
+def survey_responses(n: int = 50, seed: int = 0, files_per_category: int = 1,
+                     file_kb: int = 1) -> DataFrame:
+    """
+    Return `n` responses to the reimbursement survey. Each uploaded
+    file is listed in the response as LimeSurvey does, with a size
+    of `file_kb` kilobytes (see `attachments_zip`).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for response_id in range(1, n + 1):
+        first, last, email, org = _person(rng, response_id)
+        start = int(rng.integers(1, 20))
+        row = {'id': response_id, 'submitdate': '2020-11-{:02d} 12:00:00'.format(start),
+               'name': '{} {}'.format(first, last), 'email': email,
+               'mailingaddress': '{} Main St, {}'.format(response_id, COUNTRIES[org]),
+               'regonsite': str(rng.choice(['Y', 'N'])),
+               'hotelstart': '2020-11-{:02d} 00:00:00'.format(start),
+               'hotelend': '2020-11-{:02d} 00:00:00'.format(start + int(rng.integers(1, 6))),
+               'aclmembershipamt': '${:.2f}'.format(rng.choice([0, 25, 50]))}
+        for files_key, amount_key in REIMBURSEMENT_FIELDS:
+            files = [{'name': '{}_{}.pdf'.format(files_key, i), 'size': file_kb,
+                      'comment': '' if rng.random() < 0.8 else _text(rng, 5)}
+                     for i in range(files_per_category)]
+            row[files_key] = json.dumps(files)
+            row[amount_key] = '${:.2f}'.format(rng.integers(0, 800))
+        rows.append(row)
+    return DataFrame(rows)
+
+def attachments_zip(responses: DataFrame, response_ids: List[int] = None) -> bytes:
+    """
+    Return a zip of the files uploaded with the given responses, named
+    as LimeSurvey names them ("<zero-padded response id>_...").
+    """
+    response_ids = set(int(i) for i in response_ids) if response_ids is not None else None
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_f:
+        for row in responses.to_dict('records'):
+            if response_ids is not None and int(row['id']) not in response_ids:
+                continue
+            for files_key, _ in REIMBURSEMENT_FIELDS:
+                for i, file_dict in enumerate(json.loads(row.get(files_key) or '[]')):
+                    size = int(float(file_dict['size']) * 1024)
+                    content = '{} {} {}'.format(row['id'], files_key, i).encode().ljust(size, b'.')
+                    zip_f.writestr('{:05d}_{}_{}'.format(int(row['id']), files_key, file_dict['name']),
+                                   content[:size])
+    return buffer.getvalue()
+
+def pdf(paper_id: int, text_size: int = 500) -> bytes:
+    """
+    Return a minimal (single blank page) PDF padded to about
+    `text_size` words, standing in for a submission.
+    """
+    body = '% ' + _text(np.random.default_rng(paper_id), text_size) + '\n'
+    return ('%PDF-1.4\n' + body +
+            '1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n'
+            '2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n'
+            '3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >> endobj\n'
+            'trailer << /Root 1 0 R >>\n%%EOF\n').encode()
+
+SUBMISSION_PAGE = """<html><head><title>Submission Page Editor</title></head><body>
+<input type="text" id="currentpage_newname" value="Submission Information">
+<div id="theitems">
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Text 1</td></tr></table></div>
+    <div class="portlet-content"><textarea>Please read the submission guidelines.</textarea></div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Selector 2</td></tr></table></div>
+    <div class="portlet-content">
+      <input type="text" value="Submission type">
+      <textarea>Pick one</textarea>
+      <textarea>Long paper
+Short paper</textarea>
+    </div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Abstract</td></tr></table></div>
+    <div class="portlet-content"><table>
+      <tr><td>Field Title:</td><td><input type="text" value="Abstract"></td></tr>
+      <tr><td>Field Description:</td><td><textarea>At most 500 words.</textarea></td></tr>
+    </table></div>
+  </div>
+</div>
+</body></html>
+"""
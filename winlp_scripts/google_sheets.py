@@ -3,9 +3,12 @@ The budget spreadsheet gets used for a lot of things,
 so consolidate some of the functionality here
 """
 
+import logging
 import os
 import pickle
-from typing import Tuple, List
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Callable, Iterable, Tuple, List
 import pandas
 
 import googleapiclient.discovery
@@ -13,11 +16,15 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 
+from winlp_scripts.profiling import stage, timed
 from winlp_scripts.utils import col_letter
 
+LOG = logging.getLogger(__name__)
+
 class AuthenticationException(Exception): pass
 class SheetParseException(Exception): pass
 
+@timed('sheets.metadata')
 def get_sheet_by_index(service, spreadsheet_id, index) -> dict:
     """
     Return spreadsheet properties from the index
@@ -46,13 +53,28 @@ def get_col(row, key, mapping):
 class GoogleSheetInterface():
     """
     Interface to handle authenticating to the Google Sheet API
+
+    Either the OAuth token and client files, or an API key
+    (for sheets shared by link) must be given. `url_base` overrides
+    the API endpoint (e.g. to use `winlp_scripts.fake_services`).
     """
-    def __init__(self, cred_path, client_path):
-        self.creds = auth_google(cred_path, client_path)
+    def __init__(self, cred_path=None, client_path=None,
+                 api_key: str = None, url_base: str = None):
+        if not (cred_path or api_key):
+            raise AuthenticationException('Either api_key or creds must be specified')
+        self.api_key = api_key
+        self.url_base = url_base
+        self.creds = auth_google(cred_path, client_path) if cred_path else None
+
+    @classmethod
+    def from_conf(cls, conf: dict):
+        google = conf.get('google', {})
+        return cls(google.get('token_file'), google.get('client_file'),
+                   api_key=google.get('api_key'), url_base=google.get('url_base'))
 
     @property
     def service(self):
-        return googleapiclient.discovery.build('sheets', 'v4', credentials=self.creds)
+        return build_service(self.creds, api_key=self.api_key, url_base=self.url_base)
 
 
     def get_sheet(self, sheet_id: str,
@@ -67,10 +89,12 @@ class GoogleSheetInterface():
             cell_range = 'A1:ZZZ999'
 
         sheet_title = get_sheet_by_index(self.service, sheet_id, page_index).get('title')
-        rows = self.service.spreadsheets().values().get(
-            spreadsheetId=sheet_id,
-            range=f"'{sheet_title}'!{cell_range}"
-        ).execute().get('values')
+        with stage('sheets.values') as record:
+            rows = self.service.spreadsheets().values().get(
+                spreadsheetId=sheet_id,
+                range=f"'{sheet_title}'!{cell_range}"
+            ).execute().get('values')
+            record.add(items=len(rows or []))
 
         if has_headers:
             # Make sure that there are is a value for every cell
@@ -88,9 +112,34 @@ class GoogleSheetInterface():
         else:
             return pandas.DataFrame(data=rows)
 
+    def watch(self, sheet_id: str, key_column, **kwargs) -> 'SheetWatcher':
+        """
+        Return a SheetWatcher for the rows of a sheet, keyed by
+        `key_column` (see `SheetWatcher`).
+        """
+        return SheetWatcher(self, sheet_id, key_column, **kwargs)
+
+
 
+def build_service(creds: Credentials = None, api_key: str = None, url_base: str = None,
+                  api: str = 'sheets', version: str = 'v4'):
+    """
+    Build the Sheets (or another Google) API client, from either
+    credentials or an API key.
+    """
+    client_options = {'api_endpoint': url_base} if url_base else None
+    if creds is not None:
+        return googleapiclient.discovery.build(api, version, credentials=creds,
+                                               client_options=client_options)
+    return googleapiclient.discovery.build(api, version, developerKey=api_key,
+                                           client_options=client_options)
 
+# OAuth scopes requested: reading the sheets, and their Drive
+# metadata (the file version SheetWatcher polls for).
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly',
+          'https://www.googleapis.com/auth/drive.metadata.readonly']
 
+@timed('sheets.auth')
 def auth_google(cred_path: str,
                 client_path: str) -> Credentials:
     """
@@ -100,13 +149,14 @@ def auth_google(cred_path: str,
     if os.path.exists(cred_path):
         with open(cred_path, 'rb') as cred_f:
             creds = pickle.load(cred_f)
+    # Tokens saved before a scope was added are authorized again
+    if creds and creds.scopes and not creds.has_scopes(SCOPES):
+        creds = None
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                client_path,
-                ['https://www.googleapis.com/auth/spreadsheets.readonly'])
+            flow = InstalledAppFlow.from_client_secrets_file(client_path, SCOPES)
             creds = flow.run_local_server(port=0)
             with open(cred_path, 'wb') as token:
                 pickle.dump(creds, token)
@@ -117,9 +167,15 @@ def grab_sheet(spreadsheet_id: str,
                cred_path: Credentials=None,
                num_rows=1000,
                api_key: str=None,
-               last_col='zz') -> Tuple[List, List]:
+               last_col='zz',
+               url_base: str=None,
+               client_path: str=None) -> Tuple[List, List]:
     """
     Grab the budget spreadsheet to process.
+
+    With `cred_path`, the OAuth token saved there is used, going
+    through the OAuth flow with the client secrets at `client_path`
+    if it is missing or expired.
     """
     if not spreadsheet_id:
         raise SheetParseException("Spreadsheet_id must not be None")
@@ -127,16 +183,197 @@ def grab_sheet(spreadsheet_id: str,
         raise AuthenticationException('Either api_key or creds must be specified')
 
     if cred_path:
-        creds = auth_google(cred_path)
-        service = googleapiclient.discovery.build('sheets', 'v4', credentials=creds)
+        creds = auth_google(cred_path, client_path)
+        service = build_service(creds, url_base=url_base)
     elif api_key:
-        service = googleapiclient.discovery.build('sheets', 'v4', developerKey=api_key)
+        service = build_service(api_key=api_key, url_base=url_base)
 
     sheet_title = get_sheet_by_index(service, spreadsheet_id, page_index).get('title')
-    rows = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range="'{}'!A1:{}{}".format(sheet_title, last_col, num_rows)
-    ).execute().get('values')
+    with stage('sheets.values') as record:
+        rows = service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range="'{}'!A1:{}{}".format(sheet_title, last_col, num_rows)
+        ).execute().get('values')
+        record.add(items=len(rows or []))
     headers = rows[0]
     return headers, rows[1:num_rows]
 
+# -------------------------------------------
+# Watching for changes
+# -------------------------------------------
+ROW_ADDED = 'added'
+ROW_CHANGED = 'changed'
+ROW_REMOVED = 'removed'
+
+# A row of a watched sheet that was added, changed or removed,
+# with its key, and its new and previous values (or None)
+RowEvent = namedtuple('RowEvent', ['kind', 'key', 'row', 'old_row'])
+
+def diff_rows(old: OrderedDict, new: OrderedDict) -> List[RowEvent]:
+    """
+    Compare two versions of the rows of a sheet, keyed by a column.
+    """
+    events = []
+    for key, row in new.items():
+        if key not in old:
+            events.append(RowEvent(ROW_ADDED, key, row, None))
+        elif old[key] != row:
+            events.append(RowEvent(ROW_CHANGED, key, row, old[key]))
+    for key, row in old.items():
+        if key not in new:
+            events.append(RowEvent(ROW_REMOVED, key, None, row))
+    return events
+
+# Drive statuses for credentials that can't read the sheet's
+# metadata at all (rather than a failure that may pass)
+DRIVE_DENIED_STATUS = {401, 403}
+
+class SheetWatcher(object):
+    """
+    Poll a sheet for edits, and report the rows that were added,
+    changed or removed to the subscribed handlers:
+
+        watcher = GoogleSheetInterface.from_conf(conf).watch(sheet_id, key_column='Email')
+        watcher.subscribe(lambda event: print(event.kind, event.key), kinds=[ROW_CHANGED])
+        watcher.watch()
+
+    Each poll first asks Drive for the file's version, and only reads
+    the sheet's values when it has changed (which needs the
+    drive.metadata.readonly scope in SCOPES, or an API key for a
+    public sheet). If access to the version is denied, a warning is
+    logged once and the values are read on every poll, and only
+    compared; other errors only affect the poll they happen in.
+
+    `key_column` is a column index or a header name; rows with an
+    empty key are skipped. The rows as of the last poll are kept in
+    `rows`, by key.
+    """
+    def __init__(self, sheets: GoogleSheetInterface, sheet_id: str, key_column,
+                 page_index: int = 0, cell_range: str = 'A1:ZZZ999', header_rows: int = 1,
+                 interval: float = 10.0):
+        self.sheet_id = sheet_id
+        self.page_index = page_index
+        self.cell_range = cell_range
+        self.header_rows = header_rows
+        self.interval = interval
+        self.key_column = key_column
+
+        self.header = []
+        self.rows = OrderedDict()
+        self.version = None
+        self.polls = 0
+
+        self._service = sheets.service
+        self._drive = build_service(sheets.creds, api_key=sheets.api_key, url_base=sheets.url_base,
+                                    api='drive', version='v3')
+        self._use_drive = True
+        self._title = None
+        self._handlers = []
+        self._batch_handlers = []
+
+    def subscribe(self, handler: Callable[[RowEvent], None], kinds: Iterable[str] = None):
+        """
+        Call `handler` with each RowEvent (of the given kinds).
+        """
+        self._handlers.append((set(kinds) if kinds else None, handler))
+        return handler
+
+    def subscribe_batch(self, handler: Callable[[List[RowEvent]], None]):
+        """
+        Call `handler` with all the RowEvents of a poll, when there are any.
+        """
+        self._batch_handlers.append(handler)
+        return handler
+
+    def probe(self):
+        """
+        Return the sheet's current Drive version, or None if unavailable.
+
+        If the credentials can't read the file's Drive metadata, the
+        probe is given up for good; other errors (timeouts, 5xx) are
+        only logged, and it is tried again on the next poll.
+        """
+        from googleapiclient.errors import HttpError
+
+        if not self._use_drive:
+            return None
+        try:
+            with stage('sheets.probe'):
+                return self._drive.files().get(fileId=self.sheet_id, fields='version').execute().get('version')
+        except HttpError as e:
+            if e.resp.status in DRIVE_DENIED_STATUS:
+                LOG.warning('Cannot read the Drive version of the sheet ({}), so it will be read in full '
+                            'on every poll'.format(e))
+                self._use_drive = False
+            else:
+                LOG.warning('Failed to read the Drive version of the sheet, so reading it in full: {}'.format(e))
+        except Exception as e:
+            LOG.warning('Failed to read the Drive version of the sheet, so reading it in full: {}'.format(e))
+        return None
+
+    def _key(self, row: list) -> str:
+        index = self.key_column if isinstance(self.key_column, int) else self.header.index(self.key_column)
+        return row[index].strip() if index < len(row) and isinstance(row[index], str) else ''
+
+    def _fetch(self) -> List[list]:
+        if self._title is None:
+            self._title = get_sheet_by_index(self._service, self.sheet_id, self.page_index).get('title')
+        with stage('sheets.values') as record:
+            rows = self._service.spreadsheets().values().get(
+                spreadsheetId=self.sheet_id,
+                range="'{}'!{}".format(self._title, self.cell_range)
+            ).execute().get('values') or []
+            record.add(items=len(rows))
+        return rows
+
+    def poll(self) -> List[RowEvent]:
+        """
+        Check the sheet once, returning (and sending to the handlers)
+        the changes since the last poll. The first poll reports every
+        row as added.
+        """
+        self.polls += 1
+        version = self.probe()
+        if version is not None and version == self.version:
+            return []
+
+        values = self._fetch()
+        # An empty sheet has no header row either
+        self.header = values[0] if self.header_rows and values else []
+        rows = OrderedDict()
+        for row in values[self.header_rows:]:
+            # The API leaves out empty cells at the end of a row
+            while row and row[-1] == '':
+                row = row[:-1]
+            key = self._key(row)
+            if not key:
+                continue
+            if key in rows:
+                LOG.warning('Skipping a second row with key "{}"'.format(key))
+                continue
+            rows[key] = row
+
+        events = diff_rows(self.rows, rows)
+        self.rows, self.version = rows, version
+        for event in events:
+            for kinds, handler in self._handlers:
+                if kinds is None or event.kind in kinds:
+                    handler(event)
+        if events:
+            for handler in self._batch_handlers:
+                handler(events)
+        return events
+
+    def watch(self, stop: threading.Event = None, max_polls: int = None):
+        """
+        Poll every `interval` seconds, until `stop` is set (or after
+        `max_polls` polls).
+        """
+        stop = stop or threading.Event()
+        polls = 0
+        while not stop.is_set():
+            self.poll()
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            stop.wait(self.interval)
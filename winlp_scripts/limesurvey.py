@@ -5,9 +5,10 @@ Unfortunately, while some of LimeSurvey's features are available
 through an xml-rpc API, some
 """
 
+import asyncio
 import base64
 import os
-from typing import List
+from typing import Dict, List
 
 import requests
 from bs4 import BeautifulSoup as bs
@@ -16,10 +17,17 @@ from io import BytesIO
 from xlrd.book import Book
 from xlrd.sheet import Sheet
 from xlrd import open_workbook
-from pandas import read_excel
+from pandas import read_excel, DataFrame
 
 from xmlrpc.client import ServerProxy
 
+from winlp_scripts.profiling import stage, timed
+from winlp_scripts.sessions import make_session, SessionTransport
+from winlp_scripts.utils import mmap_zip
+
+# Size of the blocks used when streaming attachment archives to disk.
+ZIP_CHUNK_SIZE = 1024*1024
+
 # -------------------------------------------
 # URLS
 # -------------------------------------------
@@ -39,30 +47,52 @@ class LimeSurveyConnection(object):
     Class to log into the LimeSurvey website, and maintain
     a connection.
     """
-    def __init__(self, url_base, username, password):
+    # If set, leaving a `with` block doesn't log out (see `close`)
+    persistent = False
+
+    def __init__(self, url_base, username, password, http_settings: dict = None):
+        # Both the xml-rpc calls and the http downloads share one
+        # pooled session (see winlp_scripts.sessions)
+        self._session = make_session(http_settings)
+
         # the `ServerProxy` is the xml-rpc client.
-        self.sp = ServerProxy(os.path.join(url_base, 'admin/remotecontrol'))
+        rpc_url = os.path.join(url_base, 'admin/remotecontrol')
+        self.sp = ServerProxy(rpc_url, transport=SessionTransport(self._session, rpc_url))
         self.url_base = url_base
         self._username = username
         self._password = password
         self._key = self.get_session_key()
         self._session = self._http_login()
 
+    @classmethod
+    def from_conf(cls, conf: dict):
+        ls = conf.get('limesurvey', {})
+        return cls(ls.get('url_base'), ls.get('user'), ls.get('pass'),
+                   http_settings=conf.get('http'))
+
+    @timed('limesurvey.list_surveys', items=len)
     def list_surveys(self) -> List[dict]:
         return self.sp.list_surveys(self._key)
 
+    @timed('limesurvey.login')
     def get_session_key(self) -> str:
         return self.sp.get_session_key(self._username, self._password)
 
+    @timed('limesurvey.list_questions', items=len)
     def list_questions(self, survey_id):
         return self.sp.list_questions(self._key, survey_id)
 
     def export_responses(self, survey_id):
-        encoded = self.sp.export_responses(self._key, survey_id, 'xls',
-                                           '', 'complete')
-        decoded = base64.b64decode(encoded)
-        book = open_workbook(file_contents=decoded)
-        return read_excel(book)
+        with stage('limesurvey.export') as record:
+            encoded = self.sp.export_responses(self._key, survey_id, 'xls',
+                                               '', 'complete')
+            record.add(bytes=len(encoded))
+        with stage('limesurvey.decode') as record:
+            decoded = base64.b64decode(encoded)
+            book = open_workbook(file_contents=decoded)
+            responses = read_excel(book, engine='xlrd')
+            record.add(items=len(responses))
+        return responses
 
     # -------------------------------------------
     # HTTP Methods
@@ -77,21 +107,22 @@ class LimeSurveyConnection(object):
         Initialize a session over http(s), and store the session and its
         relevant cookies for later access.
         """
-        s = requests.Session()
+        s = self._session
         login_url = os.path.join(self.url_base, 'admin/authentication/sa/login')
-        r = s.get(url=login_url)
-        csrf = _get_csrf(r)
-        r = s.post(login_url,
-                   headers={
-                   },
-                   data={
-                       'user': self._username,
-                       'password': self._password,
-                       'YII_CSRF_TOKEN': csrf,
-                       "loginlang": "default",
-                       "login_submit": "login",
-                       "authMethod": "Authdb",
-                   })
+        with stage('limesurvey.login'):
+            r = s.get(url=login_url)
+            csrf = _get_csrf(r)
+            r = s.post(login_url,
+                       headers={
+                       },
+                       data={
+                           'user': self._username,
+                           'password': self._password,
+                           'YII_CSRF_TOKEN': csrf,
+                           "loginlang": "default",
+                           "login_submit": "login",
+                           "authMethod": "Authdb",
+                       })
         return s
 
     def _http_logout(self):
@@ -99,10 +130,29 @@ class LimeSurveyConnection(object):
         Logout of the session. Used on __exit__.
         """
         url = os.path.join(self.url_base, 'admin/authentication/sa/logout')
-        self._session.get(url)
+        with stage('limesurvey.logout'):
+            self._session.get(url)
+
+    def _get_zip(self, url: str, bytes=False, path: str = None):
+        """
+        Retrieve a zipfile from the given url.
+
+        If `path` is given, the download is streamed to that file
+        and the zip is opened from a memory map of it, rather than
+        being held in memory.
+        """
+        if path is not None:
+            with stage('limesurvey.download') as record:
+                with self._session.get(url, stream=True) as resp:
+                    with open(path, 'wb') as zip_f:
+                        for chunk in resp.iter_content(chunk_size=ZIP_CHUNK_SIZE):
+                            zip_f.write(chunk)
+                            record.add(bytes=len(chunk))
+            return mmap_zip(path)
 
-    def _get_zip(self, url: str, bytes=False):
-        resp = self._session.get(url)
+        with stage('limesurvey.download') as record:
+            resp = self._session.get(url)
+            record.add(bytes=len(resp.content))
         try:
             if bytes:
                 return resp.content
@@ -112,24 +162,96 @@ class LimeSurveyConnection(object):
         except BadZipFile as bze:
             return None
 
-    def get_download_for_response(self, survey_id: int, response_id: int, bytes=False):
+    def get_download_for_response(self, survey_id: int, response_id: int, bytes=False, path: str = None):
         """
         Given survey and response IDs, retrieve the zipfile associated with that
         response.
         """
         url = os.path.join(self.url_base,
                            'admin/responses/sa/actionDownloadfiles/surveyid/{}/sResponseId/{}'.format(survey_id, response_id))
-        return self._get_zip(url, bytes=bytes)
+        return self._get_zip(url, bytes=bytes, path=path)
 
-    def get_download_for_response_list(self, survey_id: int, responses: List[int], bytes=False):
+    def get_download_for_response_list(self, survey_id: int, responses: List[int], bytes=False, path: str = None):
         url = os.path.join(self.url_base, 'admin/responses/sa/actionDownloadfiles/iSurveyId/{}/sResponseId/{}'.format(
             survey_id,
             ','.join([str(i) for i in responses])))
-        return self._get_zip(url, bytes=bytes)
+        return self._get_zip(url, bytes=bytes, path=path)
+
+    def close(self):
+        """
+        Release the session key and log out.
+        """
+        with stage('limesurvey.logout'):
+            self.sp.release_session_key(self._key)
+        self._http_logout()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.sp.release_session_key(self._key)
-        self._http_logout()
+        # Connections held open across scripts (by winlp_scripts.daemon)
+        # are closed by their owner instead.
+        if not self.persistent:
+            self.close()
+
+
+class AsyncLimeSurveyConnection(object):
+    """
+    asyncio interface to LimeSurvey, for running several exports or
+    downloads at once.
+
+    The blocking calls of a single `LimeSurveyConnection` (and so a
+    single session key) are run on worker threads, with at most
+    `max_concurrency` of them in flight at a time:
+
+        async with AsyncLimeSurveyConnection(url_base, user, pw) as ls:
+            frames = await ls.export_many([registration_id, reimbursement_id])
+    """
+    def __init__(self, url_base, username, password, http_settings: dict = None,
+                 max_concurrency: int = 4):
+        # Make sure there are enough pooled connections for every call in flight
+        http_settings = dict(http_settings or {})
+        http_settings['pool_maxsize'] = max(http_settings.get('pool_maxsize', 0), max_concurrency)
+
+        self._args = (url_base, username, password, http_settings)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.connection = None  # type: LimeSurveyConnection
+
+    @classmethod
+    def from_conf(cls, conf: dict, max_concurrency: int = 4):
+        ls = conf.get('limesurvey', {})
+        return cls(ls.get('url_base'), ls.get('user'), ls.get('pass'),
+                   http_settings=conf.get('http'), max_concurrency=max_concurrency)
+
+    async def _run(self, func, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def list_surveys(self) -> List[dict]:
+        return await self._run(self.connection.list_surveys)
+
+    async def list_questions(self, survey_id):
+        return await self._run(self.connection.list_questions, survey_id)
+
+    async def export_responses(self, survey_id):
+        return await self._run(self.connection.export_responses, survey_id)
+
+    async def get_download_for_response_list(self, survey_id: int, responses: List[int],
+                                             bytes=False, path: str = None):
+        return await self._run(self.connection.get_download_for_response_list,
+                               survey_id, responses, bytes=bytes, path=path)
+
+    async def export_many(self, survey_ids: List[int]) -> Dict[int, DataFrame]:
+        """
+        Export the responses of all the given surveys concurrently,
+        returning a dict from survey ID to responses.
+        """
+        frames = await asyncio.gather(*[self.export_responses(s) for s in survey_ids])
+        return dict(zip(survey_ids, frames))
+
+    async def __aenter__(self):
+        self.connection = await asyncio.to_thread(LimeSurveyConnection, *self._args)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.to_thread(self.connection.__exit__, exc_type, exc_val, exc_tb)
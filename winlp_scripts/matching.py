@@ -0,0 +1,82 @@
+"""
+Match mentors with mentees based on the overlap between their
+answers to the mentorship survey (e.g. the topics they are
+interested in, or the times they are available).
+
+Each participant's yes/no answers are packed into bits, so the
+overlap for every mentor/mentee pair is an AND plus a popcount,
+and the capacity-constrained assignment is solved with scipy.
+"""
+
+from typing import List, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+from scipy.optimize import linear_sum_assignment
+
+from winlp_scripts.utils import col_letter
+
+# Number of mentees to compare against all the mentors at a time
+BLOCK_SIZE = 1024
+
+# Number of bits set in every byte value, for numpy versions
+# without `bitwise_count`
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def answer_columns(answers: DataFrame, start_col: str, stop_col: str) -> List[str]:
+    """
+    Return the names of the spreadsheet columns from `start_col`
+    to `stop_col` (inclusive), given as letters.
+    """
+    return list(answers.columns[col_letter(start_col):col_letter(stop_col)+1])
+
+def pack_answers(answers: DataFrame, columns: List[str], yes: str = 'Yes') -> np.ndarray:
+    """
+    Pack the yes/no answers in the given columns into an
+    (n, ceil(len(columns) / 8)) array of bytes.
+    """
+    return np.packbits(answers[columns].to_numpy() == yes, axis=1)
+
+def popcount(a: np.ndarray) -> np.ndarray:
+    """
+    Count the bits set in each byte of `a`.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(a)
+    return _POPCOUNT_TABLE[a]
+
+def overlap_matrix(mentors: np.ndarray, mentees: np.ndarray,
+                   block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    Given packed answers for mentors and mentees, return the
+    (num_mentors, num_mentees) matrix of the number of answers
+    each pair has in common.
+    """
+    overlap = np.zeros((len(mentors), len(mentees)), dtype=np.int32)
+    for start in range(0, len(mentees), block_size):
+        block = mentees[start:start+block_size]
+        common = mentors[:, None, :] & block[None, :, :]
+        overlap[:, start:start+block_size] = popcount(common).sum(axis=2)
+    return overlap
+
+def match_mentors(overlap: np.ndarray,
+                  capacity: Union[int, np.ndarray] = 1) -> List[Tuple[int, int, int]]:
+    """
+    Assign mentees to mentors, maximizing the total overlap, with
+    each mentor taking at most `capacity` mentees (either a single
+    number, or one per mentor), and each mentee at most one mentor.
+
+    Returns a list of (mentor, mentee, overlap) index triples.
+    """
+    num_mentors = overlap.shape[0]
+    capacity = np.broadcast_to(capacity, (num_mentors,))
+
+    # Give each mentor one column per mentee they can take,
+    # then solve the one-to-one assignment.
+    slots = np.repeat(np.arange(num_mentors), capacity)
+    mentees, slot_ids = linear_sum_assignment(overlap[slots].T, maximize=True)
+    mentors = slots[slot_ids]
+
+    order = np.lexsort([mentees, mentors])
+    return [(int(mentors[i]), int(mentees[i]), int(overlap[mentors[i], mentees[i]]))
+            for i in order]
@@ -0,0 +1,157 @@
+"""
+Find near-duplicate texts (e.g. dual submissions, or abstracts
+recycled from a previous year) with MinHash signatures and
+locality-sensitive hashing.
+
+Each text is reduced to a fixed-size signature whose agreement
+with another signature estimates the Jaccard similarity of their
+word shingles. Signatures are split into bands, and only texts
+that share an identical band are compared, so a query only looks
+at a few candidates regardless of the size of the archive.
+"""
+
+import hashlib
+import os
+import re
+from collections import defaultdict
+from typing import List, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Number of words in each shingle
+SHINGLE_SIZE = 5
+
+# Hashes are computed modulo this (Mersenne) prime, small enough
+# that the products of the universal hash fit in 64 bits.
+MERSENNE_PRIME = (1 << 31) - 1
+
+def is_empty(signature: np.ndarray) -> bool:
+    """
+    Whether `signature` is that of a text without any words (e.g. a
+    scanned PDF), which would otherwise match every other such text.
+    """
+    return bool(np.all(signature == MERSENNE_PRIME))
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    Return the hashes of the (lowercased) word shingles of `text`.
+    """
+    words = TOKEN_PATTERN.findall(text.lower()) if text else []
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i+size]) for i in range(len(words)-size+1)]
+    return np.array([int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=8).digest(), 'little')
+                     % MERSENNE_PRIME for g in set(grams)], dtype=np.uint64)
+
+def pdf_text(pdf_bytes: bytes) -> str:
+    """
+    Extract the text of a PDF (requires the `pypdf` package).
+    """
+    from io import BytesIO
+    from pypdf import PdfReader
+    reader = PdfReader(BytesIO(pdf_bytes))
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+class MinHashIndex(object):
+    """
+    LSH index of MinHash signatures, identified by string ids.
+    """
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        self.ids = []
+        self._positions = {}
+        self._signatures = []
+        self._buckets = defaultdict(list)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Return the MinHash signature of `text` (see `is_empty` for
+        texts without any words).
+        """
+        hashes = shingles(text)
+        if not len(hashes):
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(i, band.tobytes()) for i, band in enumerate(signature.reshape(self.bands, -1))]
+
+    def add(self, id: str, text: str = None, signature: np.ndarray = None) -> bool:
+        """
+        Add a text (or its precomputed signature) to the index,
+        returning whether it was added: texts without any words
+        aren't, as they can't be compared.
+        """
+        signature = signature if signature is not None else self.signature(text)
+        if is_empty(signature):
+            return False
+        position = len(self.ids)
+        self.ids.append(str(id))
+        self._positions[str(id)] = position
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets[key].append(position)
+        return True
+
+    def query(self, text: str = None, signature: np.ndarray = None,
+              threshold: float = 0.5) -> List[Tuple[str, float]]:
+        """
+        Return the (id, estimated Jaccard similarity) of the indexed texts
+        that share a band with the query and whose estimated similarity
+        is at least `threshold`, most similar first. A text without any
+        words matches nothing.
+        """
+        signature = signature if signature is not None else self.signature(text)
+        if is_empty(signature):
+            return []
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        matches = []
+        for position in candidates:
+            similarity = float(np.mean(self._signatures[position] == signature))
+            if similarity >= threshold:
+                matches.append((self.ids[position], similarity))
+        return sorted(matches, key=lambda m: (-m[1], m[0]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return str(id) in self._positions
+
+    def save(self, path: str):
+        """
+        Save the signatures (not the buckets, which are rebuilt on load).
+        """
+        signatures = np.array(self._signatures, dtype=np.uint64).reshape(-1, self.num_perm)
+        with open(path, 'wb') as index_f:
+            np.savez_compressed(index_f, ids=np.array(self.ids, dtype=str), signatures=signatures,
+                                params=np.array([self.num_perm, self.bands, self.seed]))
+
+    @classmethod
+    def load(cls, path: str):
+        saved = np.load(path, allow_pickle=False)
+        num_perm, bands, seed = saved['params'].tolist()
+        index = cls(num_perm=num_perm, bands=bands, seed=seed)
+        for id, signature in zip(saved['ids'], saved['signatures']):
+            index.add(id, signature=signature)
+        return index
+
+    @classmethod
+    def load_or_create(cls, path: str, **kwargs):
+        return cls.load(path) if os.path.exists(path) else cls(**kwargs)
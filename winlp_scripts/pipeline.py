@@ -0,0 +1,433 @@
+"""
+Run a chain of steps (fetching submissions and sheets, rendering
+letters, sending emails, parsing reimbursements) declared in a YAML
+file, caching each stage's output so that reruns only execute the
+stages whose inputs have changed.
+
+A pipeline names its stages, the step each one runs (one of the
+built-in STEPS below, or "module:function" / "path/to/script.py:function")
+and its arguments. An argument of "$name" is the output of stage
+`name`, "$config" is the loaded config file, and "$name.key" is one
+key of either (so that a stage only depends on that part of it):
+
+    cache: .pipeline_cache
+    stages:
+      budget:
+        run: budget_sheet
+        always: true
+        args: {config: $config, sheet_id: 1AbC...}
+      letters:
+        run: grant_letters
+        args: {rows: $budget, mapping: data/budget_mapping.yml,
+               template: data/email_templates/WiNLP Travel Grant Letter.docx,
+               output_dir: letters}
+
+    python3 -m winlp_scripts.pipeline data/pipeline.yml -c config.yml [stage ...]
+
+Each stage is cached by a hash of its step, its arguments, the
+contents of any files named in them, and the outputs of the stages it
+uses. Stages that fetch from the services are marked `always`, and
+are rerun every time; if what they fetch hasn't changed, the stages
+after them are still taken from the cache. Stages that don't depend
+on each other run in parallel.
+"""
+
+import datetime
+import hashlib
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import pickle
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+LOG = logging.getLogger(__name__)
+
+class PipelineException(Exception): pass
+
+DEFAULT_CACHE = '.pipeline_cache'
+
+# Arguments naming where a step writes, rather than files it reads
+OUTPUT_ARGS = {'output_dir', 'dry_run', 'sent_log'}
+
+# Built-in steps, by name
+STEPS = OrderedDict()
+
+def step(name: str):
+    def register(func):
+        STEPS[name] = func
+        return func
+    return register
+
+# -------------------------------------------
+# Built-in steps
+# -------------------------------------------
+@step('softconf_submissions')
+def softconf_submissions(config: dict, keys: List[str] = None):
+    from winlp_scripts.softconf import SoftconfConnection
+    return SoftconfConnection.from_conf(config).submission_information(keys=keys)
+
+@step('softconf_reviews')
+def softconf_reviews(config: dict, keys: List[str] = None):
+    from winlp_scripts.softconf import SoftconfConnection
+    return SoftconfConnection.from_conf(config).reviews(keys=keys)
+
+@step('budget_sheet')
+def budget_sheet(config: dict, sheet_id: str = None, page_index: int = 1,
+                 num_rows: int = 1000, last_col: str = 'zz') -> List[list]:
+    """
+    The rows (without the header) of the budget sheet.
+    """
+    from winlp_scripts.google_sheets import grab_sheet
+    google = config.get('google', {})
+    header, rows = grab_sheet(sheet_id or google.get('budget_sheet_id'), page_index,
+                              cred_path=google.get('token_file'), client_path=google.get('client_file'),
+                              api_key=google.get('api_key'),
+                              num_rows=num_rows, last_col=last_col, url_base=google.get('url_base'))
+    return rows
+
+@step('limesurvey_responses')
+def limesurvey_responses(config: dict, survey_id: int):
+    from winlp_scripts.limesurvey import LimeSurveyConnection
+    with LimeSurveyConnection.from_conf(config) as lsc:
+        return lsc.export_responses(survey_id)
+
+@step('grant_letters')
+def grant_letters(rows: List[list], mapping, template: str, output_dir: str,
+                  date: str = None) -> List[dict]:
+    """
+    Render a grant letter for each awarded row of the budget sheet,
+    returning the recipients and the paths of their letters.
+    """
+    from num2words import num2words
+    from winlp_scripts.google_sheets import get_col
+    from winlp_scripts.template import render_docx, RenderManifest
+    from winlp_scripts.utils import load_yml
+
+    mapping = load_yml(mapping) if isinstance(mapping, str) else mapping
+    date = date or datetime.datetime.now().strftime('%B %d, %Y')
+    os.makedirs(output_dir, exist_ok=True)
+    # Only letters whose details changed are rendered again
+    manifest = RenderManifest(output_dir)
+    letters = []
+    for row in rows:
+        keys = {key: get_col(row, key, mapping) for key in ['name', 'email', 'paper', 'awarded']}
+        if not keys['awarded']:
+            continue
+        path = os.path.join(output_dir, 'Travel Grant Letter - {}.docx'.format(keys['name']))
+        render_docx(template, {'date': date, 'name': keys['name'], 'email': keys['email'],
+                               'paper_title': keys['paper'], 'amount': keys['awarded'],
+                               'text_amount': num2words(keys['awarded'])}, path, manifest)
+        letters.append({'name': keys['name'], 'email': keys['email'], 'path': path})
+    manifest.save()
+    return letters
+
+@step('letter_emails')
+def letter_emails(letters: List[dict], subject: str, text: str) -> list:
+    """
+    An email for each letter, with the letter attached. `text` is
+    formatted with the recipient's `name`.
+    """
+    from email.mime.application import MIMEApplication
+    from winlp_scripts.email_tools import craft_text_email
+
+    messages = []
+    for letter in letters:
+        msg = craft_text_email(text.format(name=letter['name']), subject)
+        with open(letter['path'], 'rb') as letter_f:
+            attachment = MIMEApplication(letter_f.read(), Name=os.path.basename(letter['path']))
+        attachment['Content-Disposition'] = 'attachment; filename="{}"'.format(os.path.basename(letter['path']))
+        msg.attach(attachment)
+        messages.append(([letter['email']], msg))
+    return messages
+
+@step('send_mail')
+def send_mail(google: dict, messages: list, dry_run: str = None,
+              sent_log: str = 'sent_mail.json') -> List[str]:
+    """
+    Send the (recipients, message) pairs with `gmail_send`, skipping
+    those already sent according to the SentLog at `sent_log`, and
+    return the recipients sent to. With `dry_run`, the messages that
+    would be sent are written to a MailSink there instead (and aren't
+    recorded as sent).
+    """
+    from winlp_scripts.email_tools import gmail_send, MailSink, SentLog
+
+    log = SentLog(sent_log)
+    sent = []
+    sink = MailSink(dry_run) if dry_run else None
+    try:
+        for to_addrs, msg in messages:
+            if log.is_sent(to_addrs, msg):
+                continue
+            if sink is not None:
+                sink.add(to_addrs, msg)
+            else:
+                # Raises if the message couldn't be sent, so that it
+                # is only recorded once it has been
+                gmail_send(google['user'], google['pass'], to_addrs, msg)
+                log.record(to_addrs, msg)
+            sent.append(','.join(to_addrs))
+    finally:
+        if sink is not None:
+            sink.close()
+        else:
+            log.save()
+    LOG.info('Sent {} of {} messages'.format(len(sent), len(messages)))
+    return sent
+
+@step('reimbursements')
+def reimbursements(config: dict, survey_id: int, responses, output_dir: str,
+                   daily_rate: float = 66.4, script: str = 'scripts/parse_reimbursements.py'):
+    """
+    Download the files attached to the reimbursement survey, and
+    return the ledger from the script's `parse_sheet`.
+    """
+    from winlp_scripts.limesurvey import LimeSurveyConnection
+
+    parse_sheet = load_step('{}:parse_sheet'.format(script))
+    os.makedirs(output_dir, exist_ok=True)
+    zip_path = os.path.join(output_dir, 'attachments.zip')
+    with LimeSurveyConnection.from_conf(config) as lsc:
+        zip = lsc.get_download_for_response_list(survey_id, list(responses['id']), path=zip_path)
+    if zip is None:
+        raise PipelineException('The attachments downloaded from survey {} (in "{}") are empty or not a valid zip'
+                                .format(survey_id, zip_path))
+    with zip:
+        return parse_sheet(responses, output_dir, zip, daily_rate,
+                           ledger_path=os.path.join(output_dir, 'ledger.sqlite'))
+
+def load_step(name: str) -> Callable:
+    """
+    Return the built-in step `name`, or the function given as
+    "module:function" or "path/to/script.py:function".
+    """
+    if name in STEPS:
+        return STEPS[name]
+    if ':' not in name:
+        raise PipelineException('Unknown step "{}"'.format(name))
+    module_name, func_name = name.rsplit(':', 1)
+    if module_name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0],
+                                                      module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+# -------------------------------------------
+# Running
+# -------------------------------------------
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class Stage(object):
+    def __init__(self, name: str, run: str, args: dict = None, always: bool = False):
+        self.name = name
+        self.run = run
+        self.args = args or {}
+        self.always = always
+
+    def inputs(self) -> List[str]:
+        """
+        The names of the stages (and "config") this stage uses.
+        """
+        return sorted(set(ref.split('.')[0] for ref in _references(self.args)))
+
+def _references(value):
+    if isinstance(value, str) and value.startswith('$'):
+        yield value[1:]
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _references(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _references(v)
+
+def _lookup(ref: str, outputs: dict):
+    """
+    The output of stage `ref`, or for "name.key...", that key of it.
+    """
+    name, *keys = ref.split('.')
+    value = outputs[name]
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            raise PipelineException('"${}" has no key "{}"'.format(ref, key))
+        value = value[key]
+    return value
+
+def _substitute(value, outputs: dict):
+    if isinstance(value, str) and value.startswith('$'):
+        return _lookup(value[1:], outputs)
+    elif isinstance(value, dict):
+        return {k: _substitute(v, outputs) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_substitute(v, outputs) for v in value]
+    return value
+
+def _files(value):
+    """
+    The paths of the existing files named in the arguments
+    (other than the OUTPUT_ARGS).
+    """
+    if isinstance(value, str) and not value.startswith('$') and os.path.isfile(value):
+        yield value
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            if k not in OUTPUT_ARGS:
+                yield from _files(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _files(v)
+
+class Pipeline(object):
+    """
+    The stages of a pipeline, and the cache of their outputs.
+    """
+    def __init__(self, stages: List[Stage], cache_dir: str = DEFAULT_CACHE, max_workers: int = None):
+        self.stages = OrderedDict((s.name, s) for s in stages)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        # How each stage was last resolved ("ran" or "cached"), and how long it took
+        self.status = OrderedDict()
+        self.timings = OrderedDict()
+
+        for s in stages:
+            unknown = [name for name in s.inputs() if name != 'config' and name not in self.stages]
+            if unknown:
+                raise PipelineException('Stage "{}" uses unknown stages: {}'.format(s.name, ', '.join(unknown)))
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        from winlp_scripts.utils import load_yml
+        definition = load_yml(path)
+        stages = [Stage(name, s['run'], s.get('args'), s.get('always', False))
+                  for name, s in definition.get('stages', {}).items()]
+        kwargs.setdefault('cache_dir', definition.get('cache', DEFAULT_CACHE))
+        return cls(stages, **kwargs)
+
+    def levels(self, targets: List[str] = None) -> List[List[str]]:
+        """
+        Group the stages needed for `targets` (by default all of them)
+        into levels, each depending only on stages in earlier levels.
+        """
+        needed = OrderedDict()
+        def visit(name, path=()):
+            if name in path:
+                raise PipelineException('Stages depend on each other: {}'.format(' -> '.join(path + (name,))))
+            if name not in self.stages:
+                raise PipelineException('Unknown stage "{}"'.format(name))
+            for input_name in self.stages[name].inputs():
+                if input_name != 'config':
+                    visit(input_name, path + (name,))
+            needed[name] = True
+        for name in targets or self.stages:
+            visit(name)
+
+        levels, done = [], set()
+        while len(done) < len(needed):
+            level = [name for name in needed if name not in done and
+                     all(i in done or i == 'config' for i in self.stages[name].inputs())]
+            levels.append(level)
+            done.update(level)
+        return levels
+
+    def _key(self, stage: Stage, outputs: dict, digests: dict) -> str:
+        inputs = {ref: digests[ref] if '.' not in ref else digest(pickle.dumps(_lookup(ref, outputs)))
+                  for ref in _references(stage.args)}
+        return digest(json.dumps({'run': stage.run, 'args': stage.args, 'inputs': inputs,
+                                  'files': {path: file_digest(path) for path in _files(stage.args)}},
+                                 sort_keys=True, default=str).encode('utf-8'))
+
+    def _run_stage(self, stage: Stage, outputs: dict, digests: dict, force: bool):
+        start = time.perf_counter()
+        key = self._key(stage, outputs, digests)
+        path = os.path.join(self.cache_dir, '{}-{}.pkl'.format(stage.name, key[:32]))
+
+        if os.path.exists(path) and not (force or stage.always):
+            with open(path, 'rb') as cache_f:
+                data = cache_f.read()
+            status = 'cached'
+        else:
+            func = load_step(stage.run)
+            output = func(**_substitute(stage.args, outputs))
+            data = pickle.dumps(output)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + '.tmp', 'wb') as cache_f:
+                cache_f.write(data)
+            os.replace(path + '.tmp', path)
+            status = 'ran'
+
+        self.status[stage.name] = status
+        self.timings[stage.name] = time.perf_counter() - start
+        LOG.info('{} "{}" in {:.2f}s'.format(status.capitalize(), stage.name, self.timings[stage.name]))
+        return pickle.loads(data), digest(data)
+
+    def run(self, config: dict = None, targets: List[str] = None, force: List[str] = ()) -> Dict[str, object]:
+        """
+        Run (or take from the cache) the stages needed for `targets`,
+        returning the outputs of every stage by name.
+        """
+        outputs = {'config': config}
+        digests = {'config': digest(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))}
+        self.status.clear()
+        self.timings.clear()
+
+        for level in self.levels(targets):
+            max_workers = self.max_workers or len(level)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = OrderedDict((name, executor.submit(self._run_stage, self.stages[name], outputs,
+                                                             digests, name in force))
+                                      for name in level)
+            for name, future in futures.items():
+                exc = future.exception()
+                if exc is not None:
+                    raise PipelineException('Stage "{}" failed: {}'.format(name, exc)) from exc
+                outputs[name], digests[name] = future.result()
+
+        del outputs['config']
+        return outputs
+
+    def report(self) -> str:
+        return '\n'.join('{:<24s} {:<7s} {:.2f}s'.format(name, self.status[name], self.timings[name])
+                         for name in self.status)
+
+if __name__ == '__main__':
+    import sys
+    from winlp_scripts.profiling import add_profile_arguments, start_profiling
+    from winlp_scripts.utils import load_yml
+
+    p = ArgumentParser()
+    p.add_argument('pipeline', help='Path to the YAML pipeline definition.')
+    p.add_argument('targets', nargs='*', help='Stages to run, along with those they use (default: all of them).')
+    p.add_argument('-c', '--config', default='config.yml', type=load_yml)
+    p.add_argument('-f', '--force', nargs='+', default=[], metavar='STAGE', help='Rerun these stages even if cached.')
+    p.add_argument('-j', '--jobs', type=int, help='Maximum number of stages to run at once.')
+    p.add_argument('-v', '--verbose', action='count', default=0)
+
+    add_profile_arguments(p)
+    args = p.parse_intermixed_args()
+    start_profiling(args)
+
+    logging.basicConfig(level=logging.WARNING - 10*args.verbose)
+
+    pipeline = Pipeline.load(args.pipeline, max_workers=args.jobs)
+    try:
+        pipeline.run(args.config, targets=args.targets, force=args.force)
+    except PipelineException as e:
+        print(pipeline.report(), file=sys.stderr)
+        sys.exit(str(e))
+    print(pipeline.report(), file=sys.stderr)
@@ -0,0 +1,121 @@
+"""
+Fetch the datasets a script needs from several services at once.
+
+Most scripts start by logging into softconf, Google Sheets and/or
+LimeSurvey and downloading a spreadsheet from each, which are all
+independent. Declaring them up front and fetching them on a thread
+pool means startup takes only as long as the slowest source:
+
+    prefetch = Prefetcher()
+    prefetch.softconf_submissions('submissions', conf, keys=[PAPER_ID, MC_EMAIL])
+    prefetch.sheet('notes', conf, sheet_id)
+    data = prefetch.fetch()
+    submissions, notes = data['submissions'], data['notes']
+"""
+
+import logging
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+LOG = logging.getLogger(__name__)
+
+class PrefetchException(Exception): pass
+
+Fetch = namedtuple('Fetch', ['func', 'args', 'kwargs'])
+
+class Prefetcher(object):
+    """
+    A set of named fetches to run concurrently.
+    """
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+        self.fetches = OrderedDict()
+        # Seconds taken by each fetch, filled in by `fetch()`
+        self.timings = OrderedDict()
+
+    def add(self, name: str, func: Callable, *args, **kwargs):
+        """
+        Add a fetch whose result will be returned under `name`.
+        """
+        if name in self.fetches:
+            raise PrefetchException('Duplicate fetch name "{}"'.format(name))
+        self.fetches[name] = Fetch(func, args, kwargs)
+        return self
+
+    def softconf_submissions(self, name: str, conf: dict, keys: List[str] = None):
+        """
+        Add a fetch of the softconf submission information.
+        """
+        return self.add(name, _softconf_submissions, conf, keys)
+
+    def softconf_reviews(self, name: str, conf: dict, keys: List[str] = None):
+        """
+        Add a fetch of the softconf reviews.
+        """
+        return self.add(name, _softconf_reviews, conf, keys)
+
+    def sheet(self, name: str, conf: dict, sheet_id: str, **kwargs):
+        """
+        Add a fetch of a Google sheet (see `GoogleSheetInterface.get_sheet`).
+        """
+        return self.add(name, _google_sheet, conf, sheet_id, **kwargs)
+
+    def limesurvey_export(self, name: str, conf: dict, survey_id: int):
+        """
+        Add a fetch of the responses to a LimeSurvey survey.
+        """
+        return self.add(name, _limesurvey_export, conf, survey_id)
+
+    def _timed(self, name: str, fetch: Fetch):
+        start = time.perf_counter()
+        try:
+            return fetch.func(*fetch.args, **fetch.kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            LOG.info('Fetched "{}" in {:.2f}s'.format(name, self.timings[name]))
+
+    def fetch(self) -> Dict[str, object]:
+        """
+        Run all the fetches, and return their results by name.
+
+        If any fetch fails, the others are still allowed to finish,
+        and a PrefetchException naming the failed fetch is raised.
+        """
+        max_workers = self.max_workers or max(len(self.fetches), 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = OrderedDict((name, executor.submit(self._timed, name, fetch))
+                                  for name, fetch in self.fetches.items())
+
+        results = OrderedDict()
+        for name, future in futures.items():
+            exc = future.exception()
+            if exc is not None:
+                raise PrefetchException('Fetching "{}" failed: {}'.format(name, exc)) from exc
+            results[name] = future.result()
+        return results
+
+    def report(self) -> str:
+        """
+        Return a summary of the time taken by each fetch.
+        """
+        return '\n'.join('{:<24s} {:.2f}s'.format(name, seconds)
+                         for name, seconds in self.timings.items())
+
+def _softconf_submissions(conf: dict, keys: List[str] = None):
+    from winlp_scripts.softconf import SoftconfConnection
+    return SoftconfConnection.from_conf(conf).submission_information(keys=keys)
+
+def _softconf_reviews(conf: dict, keys: List[str] = None):
+    from winlp_scripts.softconf import SoftconfConnection
+    return SoftconfConnection.from_conf(conf).reviews(keys=keys)
+
+def _google_sheet(conf: dict, sheet_id: str, **kwargs):
+    from winlp_scripts.google_sheets import GoogleSheetInterface
+    return GoogleSheetInterface.from_conf(conf).get_sheet(sheet_id, **kwargs)
+
+def _limesurvey_export(conf: dict, survey_id: int):
+    from winlp_scripts.limesurvey import LimeSurveyConnection
+    with LimeSurveyConnection.from_conf(conf) as lsc:
+        return lsc.export_responses(survey_id)
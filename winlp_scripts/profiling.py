@@ -0,0 +1,169 @@
+"""
+Lightweight instrumentation of the time spent in each stage of
+a script: network calls to softconf, LimeSurvey, Google Sheets
+and Gmail, and rendering templates and emails.
+
+Stages are recorded with the `stage` context manager or the
+`timed` decorator, along with the bytes transferred and the
+number of items (rows, files, messages) handled:
+
+    with stage('softconf.spreadsheet') as s:
+        response = session.post(...)
+        s.add(bytes=len(response.content))
+
+Recording is always on, since it only costs a clock read per call.
+Scripts take a `--profile` option (see `add_profile_arguments`) to
+print the per-stage breakdown when they finish, and `--profile-stats`
+to also dump a cProfile of the whole run for `pstats`/snakeviz.
+"""
+
+import atexit
+import cProfile
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+
+class StageStats(object):
+    """
+    Totals for one stage.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.items = 0
+
+class StageRecord(object):
+    """
+    The bytes and items handled by one run of a stage.
+    """
+    def __init__(self):
+        self.bytes = 0
+        self.items = 0
+
+    def add(self, bytes: int = 0, items: int = 0):
+        self.bytes += bytes
+        self.items += items
+
+_lock = threading.Lock()
+_stages = OrderedDict()
+_start = time.perf_counter()
+# Reports to print when the profiled script finishes
+_finishers = []
+
+@contextmanager
+def stage(name: str):
+    """
+    Record the time spent in the block under `name`. The block
+    can add bytes and item counts to the yielded record.
+    """
+    record = StageRecord()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            stats = _stages.setdefault(name, StageStats())
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.bytes += record.bytes
+            stats.items += record.items
+
+def timed(name: str, bytes: Callable = None, items: Callable = None):
+    """
+    Decorator recording each call of the function as a stage.
+    `bytes` and `items` are either functions of the return value
+    giving the bytes and items to record (e.g. `len`), or a number
+    to record for every call.
+    """
+    def count(counter, result):
+        if callable(counter):
+            return counter(result) if result is not None else 0
+        return counter or 0
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                record.add(bytes=count(bytes, result), items=count(items, result))
+                return result
+        return wrapper
+    return decorator
+
+def stages() -> OrderedDict:
+    """
+    Return a copy of the totals for each stage recorded so far.
+    """
+    with _lock:
+        return OrderedDict(_stages)
+
+def reset():
+    global _start
+    with _lock:
+        _stages.clear()
+        _start = time.perf_counter()
+
+def report() -> str:
+    """
+    Return a table of the time, calls, bytes and items of each stage,
+    slowest first.
+    """
+    total = time.perf_counter() - _start
+    lines = ['{:<32s} {:>6s} {:>10s} {:>6s} {:>12s} {:>8s}'.format(
+        'stage', 'calls', 'seconds', '%', 'bytes', 'items')]
+    for name, stats in sorted(stages().items(), key=lambda s: -s[1].seconds):
+        lines.append('{:<32s} {:>6d} {:>10.3f} {:>6.1f} {:>12,d} {:>8,d}'.format(
+            name, stats.calls, stats.seconds, 100 * stats.seconds / total if total else 0,
+            stats.bytes, stats.items))
+    lines.append('{:<32s} {:>6s} {:>10.3f}'.format('total (wall)', '', total))
+    return '\n'.join(lines)
+
+# -------------------------------------------
+# Script options
+# -------------------------------------------
+def add_profile_arguments(parser):
+    """
+    Add the shared `--profile` and `--profile-stats` options to a script.
+    """
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time spent in each stage (network calls, rendering) when finished.')
+    parser.add_argument('--profile-stats', metavar='PATH',
+                        help='Also write a cProfile of the run to PATH, for use with pstats.')
+
+def start_profiling(args):
+    """
+    Start profiling the script according to its parsed `--profile`
+    options; the report is printed (to stderr) when the script exits.
+    """
+    if not (args.profile or args.profile_stats):
+        return
+
+    reset()
+    profiler = None
+    if args.profile_stats:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_stats)
+        print(report(), file=sys.stderr)
+    _finishers.append(finish)
+    atexit.register(finish)
+
+def finish_profiling():
+    """
+    Print the report of any profiling started by `start_profiling` now,
+    rather than at exit (for scripts run by `winlp_scripts.daemon`).
+    """
+    while _finishers:
+        finish = _finishers.pop()
+        atexit.unregister(finish)
+        finish()
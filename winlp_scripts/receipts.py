@@ -0,0 +1,103 @@
+"""
+Detect receipts that have been submitted more than once, whether
+by the same respondent under multiple categories, or by several
+respondents (e.g. a shared hotel invoice).
+
+Every receipt is hashed as it is added, and the hashes are kept
+in a dictionary, so duplicates are found in a single pass over
+the files rather than by comparing every pair.
+"""
+
+import hashlib
+import os
+from collections import defaultdict, namedtuple
+from typing import List, Optional
+
+# Files are hashed in blocks of this size, so that large
+# scans never need to be loaded into memory at once.
+HASH_CHUNK_SIZE = 1024*1024
+
+# Extensions of files that also get a perceptual hash,
+# to catch the same receipt re-scanned or re-encoded.
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp'}
+
+Receipt = namedtuple('Receipt', ['owner', 'category', 'path'])
+
+def content_hash(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of the file at `path`.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def image_hash(path: str, hash_size: int = 8) -> Optional[int]:
+    """
+    Return the difference hash ("dHash") of the image at `path`,
+    which stays the same when an image is resized or recompressed.
+
+    Returns None if the file can't be read as an image, or if
+    Pillow is not installed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(path) as img:
+            img = img.convert('L').resize((hash_size + 1, hash_size))
+            pixels = img.tobytes()
+    except (OSError, ValueError):
+        return None
+
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row*(hash_size+1) + col]
+            right = pixels[row*(hash_size+1) + col + 1]
+            bits = (bits << 1) | int(left > right)
+    return bits
+
+class ReceiptIndex(object):
+    """
+    Index of receipt hashes, keyed by both content and
+    (for images) perceptual hash.
+    """
+    def __init__(self, perceptual: bool = True):
+        self.perceptual = perceptual
+        self._by_content = defaultdict(list)
+        self._by_image = defaultdict(list)
+
+    def add(self, path: str, owner, category: str) -> List[Receipt]:
+        """
+        Add the receipt at `path` to the index, and return
+        any previously-added receipts that it duplicates.
+        """
+        receipt = Receipt(owner, category, path)
+        chash = content_hash(path)
+        matches = list(self._by_content[chash])
+        self._by_content[chash].append(receipt)
+
+        if self.perceptual and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+            ihash = image_hash(path)
+            if ihash is not None:
+                matches += [r for r in self._by_image[ihash] if r not in matches]
+                self._by_image[ihash].append(receipt)
+        return matches
+
+    def duplicates(self) -> List[List[Receipt]]:
+        """
+        Return the groups of receipts that share a content or perceptual hash.
+        """
+        groups = []
+        seen = set()
+        for index in [self._by_content, self._by_image]:
+            for receipts in index.values():
+                key = frozenset(receipts)
+                if len(receipts) > 1 and key not in seen:
+                    seen.add(key)
+                    groups.append(receipts)
+        return groups
@@ -0,0 +1,105 @@
+"""
+Aggregate the review scores downloaded from softconf into a
+per-paper decision table.
+
+Scores are converted to numbers once, and everything else is done
+with vectorized groupby operations over the whole reviews sheet.
+Reviewer calibration converts each reviewer's scores to z-scores
+against their own mean and spread, so that harsh and generous
+reviewers can be compared.
+"""
+
+from typing import List
+
+import numpy as np
+from pandas import DataFrame, to_numeric
+from pandas.api.types import is_numeric_dtype
+
+from winlp_scripts.softconf import (PAPER_ID, REVIEWER_EMAIL, REVIEWER_CONFIDENCE, SCORE_RECOMMENDATION,
+                                    SCORE_CLARITY, SCORE_ORIGINALITY, SCORE_CORRECTNESS,
+                                    SCORE_COMPARISON, SCORE_THOROUGHNESS, SCORE_IMPACT)
+
+SCORE_KEYS = [SCORE_CLARITY, SCORE_ORIGINALITY, SCORE_CORRECTNESS, SCORE_COMPARISON,
+              SCORE_THOROUGHNESS, SCORE_IMPACT, REVIEWER_CONFIDENCE, SCORE_RECOMMENDATION]
+
+def numeric_scores(reviews: DataFrame, score_keys: List[str] = None) -> DataFrame:
+    """
+    Return a copy of `reviews` with the score columns as floats.
+
+    Softconf may export scores as text like "4: Good", so the leading
+    number of each value is used; blank or missing scores become NaN.
+    """
+    score_keys = score_keys if score_keys is not None else [k for k in SCORE_KEYS if k in reviews]
+    reviews = reviews.copy()
+    for key in score_keys:
+        column = reviews[key]
+        if not is_numeric_dtype(column):
+            column = column.astype(str).str.extract(r'(-?\d+(?:\.\d+)?)', expand=False)
+        reviews[key] = to_numeric(column, errors='coerce').astype(float)
+    return reviews
+
+def calibrate(reviews: DataFrame,
+              score_key: str = SCORE_RECOMMENDATION,
+              reviewer_key: str = REVIEWER_EMAIL) -> DataFrame:
+    """
+    Add a "<score_key>_z" column with each score as a z-score relative
+    to that reviewer's other scores, and a "<score_key>_calibrated"
+    column mapping those back onto the overall score scale.
+
+    Reviewers with only one review (or identical scores) get a z-score of 0.
+    """
+    by_reviewer = reviews.groupby(reviewer_key)[score_key]
+    mean = by_reviewer.transform('mean')
+    std = by_reviewer.transform('std')
+
+    z = ((reviews[score_key] - mean) / std).where(std > 0, 0.0)
+    z = z.where(reviews[score_key].notna())
+
+    overall_mean = reviews[score_key].mean()
+    overall_std = reviews[score_key].std()
+    overall_std = overall_std if overall_std > 0 else 1.0
+    return reviews.assign(**{score_key + '_z': z,
+                             score_key + '_calibrated': overall_mean + z*overall_std})
+
+def paper_summary(reviews: DataFrame,
+                  score_key: str = SCORE_RECOMMENDATION,
+                  paper_key: str = PAPER_ID) -> DataFrame:
+    """
+    Return the number of reviews, mean, variance and disagreement
+    (max minus min) of the given score for each paper.
+    """
+    summary = reviews.groupby(paper_key)[score_key].agg(['count', 'mean', 'var', 'min', 'max'])
+    summary['disagreement'] = summary['max'] - summary['min']
+    return summary.drop(columns=['min', 'max'])
+
+def decision_table(reviews: DataFrame,
+                   score_key: str = SCORE_RECOMMENDATION,
+                   paper_key: str = PAPER_ID,
+                   reviewer_key: str = REVIEWER_EMAIL,
+                   confidence_key: str = REVIEWER_CONFIDENCE) -> DataFrame:
+    """
+    Return a table with one row per paper, ranked by calibrated score,
+    with the raw and calibrated means, the confidence-weighted mean,
+    the per-paper variance and disagreement, and the mean of every
+    other score column.
+    """
+    reviews = numeric_scores(reviews)
+    score_keys = [k for k in SCORE_KEYS if k in reviews and k != score_key]
+    rank_keys = ['mean']
+    if reviewer_key in reviews:
+        reviews = calibrate(reviews, score_key, reviewer_key)
+        score_keys.append(score_key + '_calibrated')
+        rank_keys.insert(0, score_key + '_calibrated')
+
+    table = paper_summary(reviews, score_key, paper_key)
+    table = table.join(reviews.groupby(paper_key)[score_keys].mean())
+
+    if confidence_key in reviews:
+        weights = reviews[confidence_key].fillna(1.0)
+        weighted = (reviews[score_key] * weights).groupby(reviews[paper_key]).sum()
+        total_weight = weights.where(reviews[score_key].notna(), 0).groupby(reviews[paper_key]).sum()
+        table['weighted_mean'] = weighted / total_weight.replace(0, np.nan)
+
+    table = table.sort_values(rank_keys, ascending=False)
+    table['rank'] = np.arange(1, len(table) + 1)
+    return table
@@ -0,0 +1,134 @@
+"""
+Assign accepted papers to poster or oral sessions, so that no
+author has papers in two sessions at the same time.
+
+This is a graph coloring problem on the author-conflict graph
+(see `winlp_scripts.conflicts`), with a limit on the number of
+papers per session. Papers are first placed greedily, most
+constrained first, and any remaining conflicts are then
+repaired by moving or swapping papers between sessions.
+"""
+
+import math
+from collections import namedtuple
+from typing import List, Set
+
+import numpy as np
+
+from winlp_scripts.conflicts import conflict_pairs, author_index
+
+# Maximum number of passes of the local search
+MAX_PASSES = 50
+
+Schedule = namedtuple('Schedule', ['sessions', 'conflicts'])
+
+def _neighbors(n: int, pairs: np.ndarray) -> List[np.ndarray]:
+    """
+    Return the array of conflicting papers for each paper.
+    """
+    neighbors = [[] for _ in range(n)]
+    for i, j in pairs.tolist():
+        neighbors[i].append(j)
+        neighbors[j].append(i)
+    return [np.array(adj, dtype=int) for adj in neighbors]
+
+def _session_conflicts(paper: int, sessions: np.ndarray, neighbors: List[np.ndarray],
+                       num_sessions: int) -> np.ndarray:
+    """
+    Count how many of `paper`'s conflicting papers are in each session.
+    """
+    placed = sessions[neighbors[paper]]
+    return np.bincount(placed[placed >= 0], minlength=num_sessions)
+
+def _greedy(n: int, neighbors: List[np.ndarray], num_sessions: int, capacity: int) -> np.ndarray:
+    """
+    Place papers one by one, most conflicts first, in the session
+    with the fewest conflicts (then the fewest papers) that has room.
+    """
+    sessions = np.full(n, -1, dtype=int)
+    load = np.zeros(num_sessions, dtype=int)
+    for paper in sorted(range(n), key=lambda i: -len(neighbors[i])):
+        counts = _session_conflicts(paper, sessions, neighbors, num_sessions)
+        counts[load >= capacity] = n + 1
+        session = int(np.lexsort([load, counts])[0])
+        sessions[paper] = session
+        load[session] += 1
+    return sessions
+
+def _local_search(sessions: np.ndarray, neighbors: List[np.ndarray],
+                  num_sessions: int, capacity: int) -> np.ndarray:
+    """
+    Repeatedly move (or, when the target session is full, swap)
+    conflicting papers into sessions where they have fewer conflicts.
+    """
+    load = np.bincount(sessions, minlength=num_sessions)
+    for _ in range(MAX_PASSES):
+        improved = False
+        for paper in range(len(sessions)):
+            counts = _session_conflicts(paper, sessions, neighbors, num_sessions)
+            current = sessions[paper]
+            if counts[current] == 0:
+                continue
+
+            for target in np.argsort(counts, kind='stable'):
+                if counts[target] >= counts[current]:
+                    break
+                if load[target] < capacity:
+                    sessions[paper] = target
+                    load[current] -= 1
+                    load[target] += 1
+                    improved = True
+                    break
+
+                # Otherwise, look for a paper in the target session
+                # to swap with that reduces the total conflicts.
+                swapped = False
+                for other in np.flatnonzero(sessions == target):
+                    other_counts = _session_conflicts(other, sessions, neighbors, num_sessions)
+                    # If the two papers conflict with each other, they're
+                    # counted in each other's new sessions, but stay apart.
+                    shared = int(paper in neighbors[other])
+                    gain = (counts[current] + other_counts[target] -
+                            (counts[target] - shared) - (other_counts[current] - shared))
+                    if gain > 0:
+                        sessions[paper], sessions[other] = target, current
+                        swapped = improved = True
+                        break
+                if swapped:
+                    break
+        if not improved:
+            break
+    return sessions
+
+def schedule_sessions(email_sets: List[Set[str]], num_sessions: int,
+                      capacity: int = None) -> Schedule:
+    """
+    Given the set of author emails for each paper, assign each paper
+    a session number in [0, num_sessions), with at most `capacity`
+    papers per session (by default, as even a split as possible).
+
+    Returns the array of sessions, along with the list of (paper, paper)
+    index pairs that share an author but could not be separated.
+    """
+    n = len(email_sets)
+    if capacity is None:
+        capacity = math.ceil(n / num_sessions)
+    if capacity * num_sessions < n:
+        raise ValueError('{} sessions of {} papers cannot fit {} papers'.format(num_sessions, capacity, n))
+
+    pairs = conflict_pairs(email_sets)
+    neighbors = _neighbors(n, pairs)
+
+    sessions = _greedy(n, neighbors, num_sessions, capacity)
+    sessions = _local_search(sessions, neighbors, num_sessions, capacity)
+
+    remaining = [(int(i), int(j)) for i, j in pairs if sessions[i] == sessions[j]]
+    return Schedule(sessions, remaining)
+
+def overbooked_authors(email_sets: List[Set[str]], num_sessions: int) -> List[str]:
+    """
+    Return the authors with more papers than there are sessions,
+    whose conflicts are unavoidable.
+    """
+    return sorted(email for email, papers in author_index(email_sets).items()
+                  if len(papers) > num_sessions)
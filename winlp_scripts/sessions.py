@@ -0,0 +1,95 @@
+"""
+Shared HTTP setup for the softconf and LimeSurvey clients.
+
+Every session gets a connection pool of a configurable size,
+default connect/read timeouts (so a hung request fails rather than
+blocking a script forever), and retries with exponential backoff
+for idempotent requests that fail to connect or hit a server error.
+
+The settings can be given in the "http" section of the config file:
+
+    http:
+      pool_maxsize: 10
+      retries: 3
+      backoff: 0.5
+      connect_timeout: 10
+      read_timeout: 300
+"""
+
+import xmlrpc.client
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_SETTINGS = {
+    'pool_connections': 4,
+    'pool_maxsize': 10,
+    'retries': 3,
+    'backoff': 0.5,
+    'connect_timeout': 10,
+    # Softconf can take a few minutes to generate large spreadsheets
+    'read_timeout': 300,
+}
+
+# Responses that are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter that applies a default timeout to every request.
+    """
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+def make_session(settings: dict = None) -> requests.Session:
+    """
+    Create a `requests.Session` with the pooling, timeout and retry
+    settings given (any missing settings use DEFAULT_SETTINGS).
+    """
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+
+    # Only idempotent methods (not POST) are retried on
+    # read errors and error statuses.
+    retry = Retry(total=settings['retries'],
+                  backoff_factor=settings['backoff'],
+                  status_forcelist=RETRY_STATUSES,
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                  raise_on_status=False)
+    adapter = TimeoutHTTPAdapter(timeout=(settings['connect_timeout'], settings['read_timeout']),
+                                 max_retries=retry,
+                                 pool_connections=settings['pool_connections'],
+                                 pool_maxsize=settings['pool_maxsize'])
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+class SessionTransport(xmlrpc.client.Transport):
+    """
+    XML-RPC transport that sends requests through a `requests.Session`,
+    so that XML-RPC calls share its connection pool and timeouts.
+    """
+    def __init__(self, session: requests.Session, url: str):
+        super().__init__()
+        self.session = session
+        self.url = url
+
+    def request(self, host, handler, request_body, verbose=False):
+        response = self.session.post(self.url, data=request_body,
+                                     headers={'Content-Type': 'text/xml'})
+        if response.status_code != 200:
+            raise xmlrpc.client.ProtocolError(self.url, response.status_code,
+                                              response.reason, dict(response.headers))
+        parser, unmarshaller = self.getparser()
+        parser.feed(response.content)
+        parser.close()
+        return unmarshaller.close()
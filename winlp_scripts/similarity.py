@@ -0,0 +1,187 @@
+"""
+Content similarity between submissions, based on a sparse
+TF-IDF matrix built from their titles and abstracts.
+
+Similarities are computed as blocked sparse matrix products,
+and the matrix can be cached on disk so that it is only
+rebuilt when the submissions change.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from pandas import DataFrame, isna
+from scipy.sparse import csr_matrix
+
+from winlp_scripts.softconf import PAPER_ID, PAPER_TITLE, PAPER_ABSTRACT
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = {'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from',
+              'has', 'have', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that',
+              'the', 'this', 'to', 'we', 'with', 'our', 'which', 'these', 'can'}
+
+# Number of rows to multiply at a time when finding neighbors
+BLOCK_SIZE = 1024
+
+def tokenize(text: str, ngrams: int = 2) -> List[str]:
+    """
+    Lowercase and split `text` into words (minus stop words),
+    and return all the word n-grams up to length `ngrams`.
+    """
+    if text is None or (not isinstance(text, str) and isna(text)):
+        return []
+    words = [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOP_WORDS]
+    terms = []
+    for n in range(1, ngrams+1):
+        terms += [' '.join(words[i:i+n]) for i in range(len(words)-n+1)]
+    return terms
+
+def tfidf_matrix(texts: Iterable[str], ngrams: int = 2) -> csr_matrix:
+    """
+    Return the L2-normalized TF-IDF matrix (documents x terms)
+    for the given texts, using sublinear term frequencies.
+    """
+    vocab = {}
+    indptr, indices, counts = [0], [], []
+    for text in texts:
+        for term, count in Counter(tokenize(text, ngrams)).items():
+            indices.append(vocab.setdefault(term, len(vocab)))
+            counts.append(count)
+        indptr.append(len(indices))
+
+    tf = csr_matrix((np.log(np.array(counts, dtype=float)) + 1, indices, indptr),
+                    shape=(len(indptr)-1, len(vocab)))
+
+    num_docs = tf.shape[0]
+    df = np.bincount(tf.indices, minlength=tf.shape[1])
+    idf = np.log((1 + num_docs) / (1 + df)) + 1
+    tfidf = tf.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return csr_matrix(tfidf.multiply(1 / norms[:, None]))
+
+def texts_key(ids: List, texts: List[str]) -> str:
+    """
+    Hash the ids and texts, to tell whether a cached matrix is stale.
+    """
+    h = hashlib.sha256()
+    for id, text in zip(ids, texts):
+        h.update('{}\0{}\0'.format(id, text).encode('utf-8'))
+    return h.hexdigest()
+
+class SimilarityIndex(object):
+    """
+    Cosine similarities between documents, each identified by
+    an id (e.g. the paper ID).
+    """
+    def __init__(self, ids: List, matrix: csr_matrix):
+        self.ids = list(ids)
+        self.matrix = matrix
+        self._positions = {id: i for i, id in enumerate(self.ids)}
+
+    @classmethod
+    def from_texts(cls, ids: List, texts: List[str], cache_path: str = None):
+        """
+        Build the index from the given texts, or load it from
+        `cache_path` if it was saved there for the same texts.
+        """
+        ids, texts = list(ids), list(texts)
+        key = texts_key(ids, texts)
+        if cache_path is not None and os.path.exists(cache_path):
+            cached = np.load(cache_path, allow_pickle=False)
+            if str(cached['key']) == key:
+                matrix = csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                    shape=tuple(cached['shape']))
+                return cls(ids, matrix)
+
+        index = cls(ids, tfidf_matrix(texts))
+        if cache_path is not None:
+            index.save(cache_path, key)
+        return index
+
+    @classmethod
+    def from_submissions(cls, submissions: DataFrame, cache_path: str = None,
+                         id_key: str = PAPER_ID,
+                         text_keys: Tuple[str, ...] = (PAPER_TITLE, PAPER_ABSTRACT)):
+        """
+        Build the index from the titles and abstracts of the
+        Softconf submissions spreadsheet.
+        """
+        texts = [' '.join(str(f) for f in fields if isinstance(f, str))
+                 for fields in zip(*[submissions[key] for key in text_keys])]
+        return cls.from_texts(submissions[id_key], texts, cache_path=cache_path)
+
+    def save(self, cache_path: str, key: str = ''):
+        """
+        Save the matrix to `cache_path`, along with the key
+        of the texts it was built from.
+        """
+        with open(cache_path, 'wb') as cache_f:
+            np.savez_compressed(cache_f,
+                                data=self.matrix.data,
+                                indices=self.matrix.indices,
+                                indptr=self.matrix.indptr,
+                                shape=np.array(self.matrix.shape),
+                                key=np.array(key))
+
+    def score(self, id_a, id_b) -> float:
+        """
+        Return the similarity between the documents with the given ids.
+        """
+        return float(self.pair_scores([self._positions[id_a]], [self._positions[id_b]])[0])
+
+    def pair_scores(self, rows: Iterable[int], cols: Iterable[int]) -> np.ndarray:
+        """
+        Return the similarities for each pair of (positional) indices,
+        e.g. to use as edge weights.
+        """
+        a = self.matrix[np.asarray(rows)]
+        b = self.matrix[np.asarray(cols)]
+        return np.asarray(a.multiply(b).sum(axis=1)).ravel()
+
+    def similarity_matrix(self) -> np.ndarray:
+        """
+        Return the dense (n x n) matrix of similarities.
+        """
+        return (self.matrix @ self.matrix.T).toarray()
+
+    def top_k(self, k: int = 10, block_size: int = BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the (positional) indices and similarities of the `k`
+        most similar other documents for every document, each as an
+        (n x k) array sorted from most to least similar.
+        """
+        n = self.matrix.shape[0]
+        k = max(min(k, n-1), 0)
+        if k == 0:
+            return np.zeros((n, 0), dtype=int), np.zeros((n, 0))
+        neighbors = np.zeros((n, k), dtype=int)
+        scores = np.zeros((n, k))
+        matrix_t = self.matrix.T.tocsr()
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            block = (self.matrix[start:stop] @ matrix_t).toarray()
+            block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+            top = np.argpartition(-block, k-1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+            scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+        return neighbors, scores
+
+    def top_k_matrix(self, k: int = 10, block_size: int = BLOCK_SIZE) -> csr_matrix:
+        """
+        Return a sparse (n x n) matrix holding only the similarities
+        of each document to its `k` most similar other documents.
+        """
+        neighbors, scores = self.top_k(k, block_size=block_size)
+        n = self.matrix.shape[0]
+        rows = np.repeat(np.arange(n), neighbors.shape[1])
+        return csr_matrix((scores.ravel(), (rows, neighbors.ravel())), shape=(n, n))
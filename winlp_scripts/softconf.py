@@ -3,13 +3,16 @@ This module provides an interface for programmatically
 interfacing with softconf
 """
 
-import re
 import requests
 import xlrd
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from typing import Union, List
 import pandas
 
+from winlp_scripts.profiling import stage, timed
+from winlp_scripts.sessions import make_session
 
 
 class ConfigException(Exception): pass
@@ -18,8 +21,10 @@ class HTTP404(Exception): pass
 
 class SoftconfConnection(object):
 
-    def __init__(self, username: str, password: str, base_url: str):
+    def __init__(self, username: str, password: str, base_url: str,
+                 http_settings: dict = None):
         self.base_url = base_url
+        self.http_settings = http_settings
         self.session = self._login(username, password)
 
     @classmethod
@@ -34,7 +39,7 @@ class SoftconfConnection(object):
             in the config file.')
 
 
-        return cls(user, pw, url_base)
+        return cls(user, pw, url_base, http_settings=conf.get('http'))
 
     def _login(self, username: str, password: str) -> requests.Session:
         """
@@ -43,11 +48,13 @@ class SoftconfConnection(object):
         use the saved login cookies.
         """
         login_url = self.base_url + 'login/scmd.cgi'
-        s = requests.Session()
-        response = s.post(url=login_url,
-                          params={"scmd": "login"},
-                          data={"username": username,
-                                "password": password})
+        s = make_session(self.http_settings)
+        with stage('softconf.login') as record:
+            response = s.post(url=login_url,
+                              params={"scmd": "login"},
+                              data={"username": username,
+                                    "password": password})
+            record.add(bytes=len(response.content))
 
         # Check for 404 errors
         if response.status_code == 404:
@@ -69,59 +76,60 @@ class SoftconfConnection(object):
         :param session:
         :return:
         """
-        response = self.session.post(url=self.base_url + "manager/scmd.cgi",
-                                     params={"scmd": "makeSpreadsheet"},
-                                     data={"Type": "submissions",
-                                           "Field{0}": "paperID",
-                                           "Field{1}": "passcode",
-                                           "Field{2}": "title",
-                                           "Field{3}": "authors",
-                                           "Field{4}": "acceptStatus",
-                                           "Field{5}": "conditions",
-                                           "Field{6}": "abstract",
-                                           "Field{7}": "dateReceived",
-                                           "Field{8}": "authorInfo",
-                                           "Field{9}": "contactUsername",
-                                           "Field{10}": "contactTitle",
-                                           "Field{11}": "contactFirstname",
-                                           "Field{12}": "contactLastname",
-                                           "Field{13}": "contactAffiliation",
-                                           "Field{14}": "contactAffiliationDpt",
-                                           "Field{15}": "contactJobFunction",
-                                           "Field{16}": "contactPhone",
-                                           "Field{17}": "contactMobile",
-                                           "Field{18}": "contactFax",
-                                           "Field{19}": "email",
-                                           "Field{20}": "contactAddress",
-                                           "Field{21}": "contactCity",
-                                           "Field{22}": "contactState",
-                                           "Field{23}": "contactZip",
-                                           "Field{24}": "contactCountry",
-                                           "Field{25}": "contactBiography",
-                                           "Field{26}": "authorsWithAffiliations",
-                                           "Field{27}": "allAuthorEmails",
-                                           "Field{28}": "field_GenderInfo",
-                                           "Field{29}": "field_RaceInfo",
-                                           "Field{30}": "field_RegionInfo",
-                                           "Field{31}": "field_CitizenshipInfo",
-                                           "Field{32}": "field_race_specification",
-                                           "Field{33}": "field_copyrightSig",
-                                           "Field{34}": "field_jobTitle",
-                                           "Field{35}": "field_orgNameAddress",
-                                           "Field{36}": "field_ACL_Length",
-                                           "Field{37}": "field_ACL_Format",
-                                           "Field{38}": "field_ACL_Author_Guidelines",
-                                           "Field{39}": "final_attachments_ok",
-                                           "Field{40}": "final_tags",
-                                           "Field{41}": "final_notes",
-                                           "SubmitButton": "Spreadsheet",
-                                           "spreadsheet_type": "xlsx"})
+        with stage('softconf.spreadsheet') as record:
+            response = self.session.post(url=self.base_url + "manager/scmd.cgi",
+                                         params={"scmd": "makeSpreadsheet"},
+                                         data={"Type": "submissions",
+                                               "Field{0}": "paperID",
+                                               "Field{1}": "passcode",
+                                               "Field{2}": "title",
+                                               "Field{3}": "authors",
+                                               "Field{4}": "acceptStatus",
+                                               "Field{5}": "conditions",
+                                               "Field{6}": "abstract",
+                                               "Field{7}": "dateReceived",
+                                               "Field{8}": "authorInfo",
+                                               "Field{9}": "contactUsername",
+                                               "Field{10}": "contactTitle",
+                                               "Field{11}": "contactFirstname",
+                                               "Field{12}": "contactLastname",
+                                               "Field{13}": "contactAffiliation",
+                                               "Field{14}": "contactAffiliationDpt",
+                                               "Field{15}": "contactJobFunction",
+                                               "Field{16}": "contactPhone",
+                                               "Field{17}": "contactMobile",
+                                               "Field{18}": "contactFax",
+                                               "Field{19}": "email",
+                                               "Field{20}": "contactAddress",
+                                               "Field{21}": "contactCity",
+                                               "Field{22}": "contactState",
+                                               "Field{23}": "contactZip",
+                                               "Field{24}": "contactCountry",
+                                               "Field{25}": "contactBiography",
+                                               "Field{26}": "authorsWithAffiliations",
+                                               "Field{27}": "allAuthorEmails",
+                                               "Field{28}": "field_GenderInfo",
+                                               "Field{29}": "field_RaceInfo",
+                                               "Field{30}": "field_RegionInfo",
+                                               "Field{31}": "field_CitizenshipInfo",
+                                               "Field{32}": "field_race_specification",
+                                               "Field{33}": "field_copyrightSig",
+                                               "Field{34}": "field_jobTitle",
+                                               "Field{35}": "field_orgNameAddress",
+                                               "Field{36}": "field_ACL_Length",
+                                               "Field{37}": "field_ACL_Format",
+                                               "Field{38}": "field_ACL_Author_Guidelines",
+                                               "Field{39}": "final_attachments_ok",
+                                               "Field{40}": "final_tags",
+                                               "Field{41}": "final_notes",
+                                               "SubmitButton": "Spreadsheet",
+                                               "spreadsheet_type": "xlsx"})
+            record.add(bytes=len(response.content))
         xlsx_data = response.content
         if bytes:
             return xlsx_data
         else:
-            book = xlrd.open_workbook(file_contents=xlsx_data)
-            return pandas.read_excel(book)
+            return read_spreadsheet(xlsx_data)
 
     def check_plagiarism(self):
         return self._get_spreadsheet(type="dude", keys=[])
@@ -143,21 +151,19 @@ class SoftconfConnection(object):
             val = keys[i] if i < len(keys) else ''
             data['Field{{{}}}'.format(i)] = val
 
-        response = self.session.post(
-            url=self.base_url+'manager/scmd.cgi',
-            params={'scmd': 'makeSpreadsheet'},
-            data=data)
+        with stage('softconf.spreadsheet') as record:
+            response = self.session.post(
+                url=self.base_url+'manager/scmd.cgi',
+                params={'scmd': 'makeSpreadsheet'},
+                data=data)
+            record.add(bytes=len(response.content))
 
         # Either return as raw bytes (if we want to download the spreadsheet)
         # or as a pandas dataframe.
         if bytes:
             return response.content
         else:
-            book = xlrd.open_workbook(file_contents=response.content)
-            df = pandas.read_excel(book) # type: pandas.DataFrame
-            # Rename the columns to be the same as the provided keys
-            df.rename(columns={old_key:new_key for old_key, new_key in zip(df.keys(), keys)}, inplace=True)
-            return df
+            return read_spreadsheet(response.content, keys)
 
     def submission_information(self, bytes = False, keys: List[str] = None) -> Union[pandas.DataFrame, bytes]:
         """
@@ -189,68 +195,106 @@ class SoftconfConnection(object):
 
         :param submission_id: The int of the submission ID
         """
-        response = self.session.get(url=self.base_url+'pub/scmd.cgi',
-                               params={'scmd':'getPaper',
-                                       'paperID':submission_id,
-                                       'filename':'{}.pdf'.format(submission_id)})
+        with stage('softconf.pdf') as record:
+            response = self.session.get(url=self.base_url+'pub/scmd.cgi',
+                                   params={'scmd':'getPaper',
+                                           'paperID':submission_id,
+                                           'filename':'{}.pdf'.format(submission_id)})
+            record.add(bytes=len(response.content), items=1)
         return response.content
 
     def download_submission_page(self):
-        response = self.session.get(self.base_url + 'manager/scmd.cgi?scmd=submitPaperCustom_editor&page_theid=1')
+        with stage('softconf.page') as record:
+            response = self.session.get(self.base_url + 'manager/scmd.cgi?scmd=submitPaperCustom_editor&page_theid=1')
+            record.add(bytes=len(response.content))
         return response.text
 
+@timed('softconf.decode', items=len)
+def read_spreadsheet(content: bytes, keys: List[str] = None) -> pandas.DataFrame:
+    """
+    Decode a spreadsheet downloaded from softconf into a dataframe.
+
+    If `keys` are given, the columns are renamed to them in order,
+    since softconf uses display names for the column headers.
+    """
+    book = xlrd.open_workbook(file_contents=content)
+    df = pandas.read_excel(book, engine='xlrd') # type: pandas.DataFrame
+    if keys is not None:
+        df.rename(columns={old_key:new_key for old_key, new_key in zip(df.keys(), keys)}, inplace=True)
+    return df
+
 # -------------------------------------------
 # Page Parsing Methods
 # -------------------------------------------
 
-def textarea_text(textarea_tag: Tag):
-    return ''.join([str(s) for s in textarea_tag.contents])
-
-def field_if_exists(tag: Tag, search_text: str, type='textarea'):
-    field_td = tag.find(text=re.compile(search_text, flags=re.I))  # type: Tag
-    if field_td is not None:
-        if type == 'textarea':
-            field_value = textarea_text(field_td.find_next('textarea'))
-            return field_value
+# XPath expressions for the submission page editor,
+# compiled once up front.
+_REGEX_NS = {'re': 'http://exslt.org/regular-expressions'}
+_PAGE_TITLE = etree.XPath('string(//input[@id="currentpage_newname"]/@value)')
+_PORTLETS = etree.XPath('//div[@id="theitems"]//*[contains(concat(" ", normalize-space(@class), " "), " portlet ")]')
+_ITEM_NAME = etree.XPath('normalize-space((.//*[contains(concat(" ", normalize-space(@class), " "), " portlet-header ")]//td)[1])')
+_TEXTAREAS = etree.XPath('.//textarea')
+_FIRST_TEXT_INPUT = etree.XPath('string((.//input[@type="text"])[1]/@value)')
+_LABELLED_INPUT = etree.XPath('string((.//text()[re:test(., $label, "i")])[1]/following::input[@type="text"][1]/@value)',
+                              namespaces=_REGEX_NS)
+_LABELLED_TEXTAREA = etree.XPath('(.//text()[re:test(., $label, "i")])[1]/following::textarea[1]',
+                                 namespaces=_REGEX_NS)
+
+def _textarea_value(textareas: list) -> str:
+    return (textareas[0].text or '') if textareas else ''
+
+def parse_submission_page(sub_page_html: str) -> dict:
+    """
+    Parse the softconf submission page editor into a dict with the page
+    "title" and a list of "items", each a dict with the item "type"
+    (TextBox, Text, Line, Selector or Field), its "name" in the editor,
+    and its "title", "description" and selector "options".
+    """
+    root = lxml.html.fromstring(sub_page_html)
+    items = []
+    for portlet in _PORTLETS(root):
+        name = _ITEM_NAME(portlet)
+        item = {'type': 'Field', 'name': name, 'title': '', 'description': '', 'options': []}
+
+        if name.startswith('TextBox'):
+            item['type'] = 'TextBox'
+        elif name.startswith('Text'):
+            item['type'] = 'Text'
+            item['description'] = _textarea_value(_TEXTAREAS(portlet))
+        elif name.startswith('Line'):
+            item['type'] = 'Line'
+        elif name.startswith('Selector'):
+            item['type'] = 'Selector'
+            item['title'] = _FIRST_TEXT_INPUT(portlet)
+            textareas = _TEXTAREAS(portlet)
+            options = (textareas[1].text or '') if len(textareas) > 1 else ''
+            item['options'] = options.split('\n')
         else:
-            field_value = field_td.find_next('input', attrs={'type':'text'})['value']
-            return field_value
-    return ''
-
-def convert_submission_page_to_text(sub_page_html: str):
-    sub_page_data = BeautifulSoup(sub_page_html, features='lxml')
-    title = sub_page_data.find('input', id='currentpage_newname')['value']
-    items = sub_page_data.find('div', id='theitems').find_all(class_='portlet')
-
-    for item in items:
-        item_name = item.find(class_='portlet-header').find('td').text.strip()
+            item['title'] = _LABELLED_INPUT(portlet, label='.*title.*')
+            item['description'] = _textarea_value(_LABELLED_TEXTAREA(portlet, label='.*description.*'))
+        items.append(item)
 
-        # Text handling
-        if item_name.startswith('TextBox'):
-            print(item_name)
+    return {'title': _PAGE_TITLE(root), 'items': items}
 
-        elif item_name.startswith('Text'):
-            print(textarea_text(item.find('textarea')))
-
-        # Dividing Lines
-        elif item_name.startswith('Line'):
+def convert_submission_page_to_text(sub_page_html: str):
+    """
+    Print a plain-text rendering of the submission page editor.
+    """
+    for item in parse_submission_page(sub_page_html)['items']:
+        if item['type'] == 'TextBox':
+            print(item['name'])
+        elif item['type'] == 'Text':
+            print(item['description'])
+        elif item['type'] == 'Line':
             print('-'*80)
-
-        # Selectors
-        elif item_name.startswith('Selector'):
-            print(item.find(attrs={'type':'text'})['value'])
-            options = item.find_all('textarea')[1].text
-            for option in options.split('\n'):
+        elif item['type'] == 'Selector':
+            print(item['title'])
+            for option in item['options']:
                 print(' - {}'.format(option))
-
-
-        # Other fields
         else:
-            print(item_name)
-            print(field_if_exists(item, '.*title.*', type='text'), end=' ')
-            print(field_if_exists(item, '.*description.*'), end='\n')
-
-    # print(items)
+            print(item['name'])
+            print(item['title'], end=' ')
+            print(item['description'], end='\n')
 
 
 
@@ -0,0 +1,247 @@
+"""
+A local SQLite store of the data the scripts join together: the
+softconf submissions and reviews, LimeSurvey responses and the
+budget sheet.
+
+Each source is ingested into its own table, with the fields used
+for joining (paper ID, email, response ID) pulled out into indexed
+columns and the full row kept as JSON. The store can be kept on
+disk between runs, or built in memory:
+
+    store = Store('winlp.db')
+    store.ingest_submissions(scc.submission_information())
+    store.ingest_responses(survey_id, lsc.export_responses(survey_id))
+    store.papers_for_email('a.author@example.org')
+    store.query('SELECT s.paper_id, r.response_id FROM submissions s '
+                'JOIN responses r ON r.email = s.email')
+
+Ingesting a source replaces what was stored for it, since the
+exports are always complete.
+"""
+
+import json
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+import pandas
+from pandas import DataFrame, isna
+
+from winlp_scripts.conflicts import split_emails
+from winlp_scripts.google_sheets import get_col
+from winlp_scripts.softconf import PAPER_ID, PAPER_TITLE, MC_EMAIL, ALL_EMAILS, REVIEWER_EMAIL
+
+class StoreException(Exception): pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    ingested REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    paper_id INTEGER PRIMARY KEY,
+    title TEXT,
+    email TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_email ON submissions (email);
+CREATE TABLE IF NOT EXISTS authors (
+    email TEXT NOT NULL,
+    paper_id INTEGER NOT NULL,
+    PRIMARY KEY (email, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS authors_paper ON authors (paper_id);
+CREATE TABLE IF NOT EXISTS reviews (
+    paper_id INTEGER NOT NULL,
+    reviewer_email TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_paper ON reviews (paper_id);
+CREATE INDEX IF NOT EXISTS reviews_reviewer ON reviews (reviewer_email);
+CREATE TABLE IF NOT EXISTS responses (
+    survey_id INTEGER NOT NULL,
+    response_id INTEGER NOT NULL,
+    email TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (survey_id, response_id)
+);
+CREATE INDEX IF NOT EXISTS responses_email ON responses (email);
+CREATE TABLE IF NOT EXISTS budget (
+    row INTEGER PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    paper TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS budget_email ON budget (email);
+CREATE INDEX IF NOT EXISTS budget_paper ON budget (paper);
+"""
+
+# Column of the LimeSurvey responses holding the response ID and email
+RESPONSE_ID = 'id'
+RESPONSE_EMAIL = 'email'
+
+def _email(value) -> Optional[str]:
+    if value is None or (not isinstance(value, str) and isna(value)):
+        return None
+    return value.strip().lower() or None
+
+def _records(df: DataFrame) -> List[str]:
+    """
+    Return each row of `df` as a JSON object (NaN as null).
+    """
+    if df.empty:
+        return []
+    return df.to_json(orient='records', lines=True, date_format='iso').splitlines()
+
+class Store(object):
+    """
+    The SQLite store, at `path` (by default in memory).
+    """
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # -------------------------------------------
+    # Ingesting
+    # -------------------------------------------
+    def _replace(self, source: str, delete: List[tuple], inserts: List[tuple]):
+        """
+        Atomically clear and refill the tables of one source,
+        given (sql, params) deletes and (sql, rows) inserts.
+        """
+        with self.db:
+            for sql, params in delete:
+                self.db.execute(sql, params)
+            for sql, values in inserts:
+                self.db.executemany(sql, values)
+            rows = len(inserts[0][1]) if inserts else 0
+            self.db.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?)', (source, rows, time.time()))
+        return rows
+
+    def ingest_submissions(self, submissions: DataFrame) -> int:
+        """
+        Store the softconf submission information, returning the number
+        of submissions. The paper IDs must be unique.
+        """
+        if submissions[PAPER_ID].duplicated().any():
+            raise StoreException('Duplicate paper IDs in the submissions')
+        paper_ids = [int(i) for i in submissions[PAPER_ID]]
+        titles = submissions[PAPER_TITLE] if PAPER_TITLE in submissions else [None]*len(submissions)
+        emails = submissions[MC_EMAIL] if MC_EMAIL in submissions else [None]*len(submissions)
+        rows = list(zip(paper_ids, titles, (_email(e) for e in emails), _records(submissions)))
+
+        email_keys = [key for key in (MC_EMAIL, ALL_EMAILS) if key in submissions]
+        authors = [(email, paper_id)
+                   for paper_id, fields in zip(paper_ids, zip(*[submissions[k] for k in email_keys]))
+                   for email in split_emails(*fields)] if email_keys else []
+
+        return self._replace('submissions',
+                             [('DELETE FROM submissions', ()), ('DELETE FROM authors', ())],
+                             [('INSERT INTO submissions VALUES (?, ?, ?, ?)', rows),
+                              ('INSERT INTO authors VALUES (?, ?)', authors)])
+
+    def ingest_reviews(self, reviews: DataFrame) -> int:
+        """
+        Store the softconf reviews, returning the number of reviews.
+        """
+        emails = reviews[REVIEWER_EMAIL] if REVIEWER_EMAIL in reviews else [None]*len(reviews)
+        rows = [(int(paper_id), _email(email), data)
+                for paper_id, email, data in zip(reviews[PAPER_ID], emails, _records(reviews))]
+        return self._replace('reviews', [('DELETE FROM reviews', ())],
+                             [('INSERT INTO reviews VALUES (?, ?, ?)', rows)])
+
+    def ingest_responses(self, survey_id: int, responses: DataFrame) -> int:
+        """
+        Store the responses to a LimeSurvey survey, returning the
+        number of responses.
+        """
+        emails = responses[RESPONSE_EMAIL] if RESPONSE_EMAIL in responses else [None]*len(responses)
+        rows = [(int(survey_id), int(response_id), _email(email), data)
+                for response_id, email, data in zip(responses[RESPONSE_ID], emails, _records(responses))]
+        return self._replace('responses:{}'.format(survey_id),
+                             [('DELETE FROM responses WHERE survey_id = ?', (int(survey_id),))],
+                             [('INSERT INTO responses VALUES (?, ?, ?, ?)', rows)])
+
+    def ingest_budget(self, rows: List[list], mapping: dict) -> int:
+        """
+        Store the rows of the budget sheet (without the header row),
+        keeping the columns named in the budget mapping
+        (see data/budget_mapping.yml).
+        """
+        keys = [key for key in mapping if key not in ('num_rows', 'last_col')]
+        values = []
+        for i, row in enumerate(rows):
+            fields = {key: get_col(row, key, mapping) for key in keys}
+            values.append((i, fields.get('name'), _email(fields.get('email')),
+                           fields.get('paper'), json.dumps(fields)))
+        return self._replace('budget', [('DELETE FROM budget', ())],
+                             [('INSERT INTO budget VALUES (?, ?, ?, ?, ?)', values)])
+
+    def sources(self) -> Dict[str, dict]:
+        """
+        Return the number of rows and time of ingestion of each source.
+        """
+        return {name: {'rows': rows, 'ingested': ingested}
+                for name, rows, ingested in self.db.execute('SELECT * FROM sources')}
+
+    def has(self, source: str) -> bool:
+        return source in self.sources()
+
+    # -------------------------------------------
+    # Queries
+    # -------------------------------------------
+    def query(self, sql: str, params=()) -> DataFrame:
+        """
+        Run an SQL query, returning the results as a DataFrame.
+        """
+        return pandas.read_sql_query(sql, self.db, params=params)
+
+    def _rows(self, sql: str, params=()) -> DataFrame:
+        """
+        Run a query selecting a `data` column, and return the
+        stored rows as a DataFrame.
+        """
+        return DataFrame([json.loads(data) for data, in self.db.execute(sql, params)])
+
+    def submission(self, paper_id: int) -> Optional[dict]:
+        row = self.db.execute('SELECT data FROM submissions WHERE paper_id = ?', (int(paper_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def submissions(self) -> DataFrame:
+        return self._rows('SELECT data FROM submissions ORDER BY paper_id')
+
+    def papers_for_email(self, email: str) -> List[int]:
+        """
+        Return the IDs of the papers with `email` as one of the authors.
+        """
+        return [paper_id for paper_id, in self.db.execute(
+            'SELECT paper_id FROM authors WHERE email = ? ORDER BY paper_id', (_email(email),))]
+
+    def reviews_for_paper(self, paper_id: int) -> DataFrame:
+        return self._rows('SELECT data FROM reviews WHERE paper_id = ? ORDER BY rowid', (int(paper_id),))
+
+    def responses(self, survey_id: int) -> DataFrame:
+        return self._rows('SELECT data FROM responses WHERE survey_id = ? ORDER BY response_id', (int(survey_id),))
+
+    def responses_for_email(self, email: str, survey_id: int = None) -> DataFrame:
+        if survey_id is None:
+            return self._rows('SELECT data FROM responses WHERE email = ? ORDER BY survey_id, response_id',
+                              (_email(email),))
+        return self._rows('SELECT data FROM responses WHERE email = ? AND survey_id = ? ORDER BY response_id',
+                          (_email(email), int(survey_id)))
+
+    def budget_for_email(self, email: str) -> List[dict]:
+        return [json.loads(data) for data, in self.db.execute(
+            'SELECT data FROM budget WHERE email = ? ORDER BY row', (_email(email),))]
@@ -1,5 +1,10 @@
 from collections import Counter
+from io import BytesIO
+from typing import Iterable, Tuple
 from xml.etree.ElementTree import Element
+import hashlib
+import json
+import os
 import re
 from docx import Document as LoadDoc
 from docx.document import Document
@@ -10,8 +15,45 @@ from docx.oxml.text.paragraph import CT_P
 from docx.oxml.table import CT_Tbl
 from docx.text.run import Run
 
+from winlp_scripts.profiling import timed
+
 KEY_PATTERN = '{([^}]+)}'
 
+# Modification times and sizes, contents and hashes of the
+# docx templates read so far, by path.
+_TEMPLATE_CACHE = {}
+
+def _cached_template(docx_path: str) -> Tuple[tuple, bytes, str]:
+    """
+    Return the ((modification time, size), contents, SHA-256) of
+    the template, reading it only if it has changed since last time.
+    The size catches edits that keep the modification time (or are
+    made within its resolution).
+    """
+    path = os.path.abspath(docx_path)
+    st = os.stat(path)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _TEMPLATE_CACHE.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, 'rb') as docx_f:
+            contents = docx_f.read()
+        cached = (version, contents, hashlib.sha256(contents).hexdigest())
+        _TEMPLATE_CACHE[path] = cached
+    return cached
+
+def load_template(docx_path: str) -> Document:
+    """
+    Load a docx template, reading the file only the first time
+    (or when it has changed since).
+    """
+    return LoadDoc(BytesIO(_cached_template(docx_path)[1]))
+
+def template_hash(docx_path: str) -> str:
+    """
+    Return the SHA-256 of the template's contents.
+    """
+    return _cached_template(docx_path)[2]
+
 def get_key(s):
     key_m = re.match('^{(.*)}$', s)
     return key_m.group(1) if key_m else None
@@ -74,12 +116,13 @@ def replace_paragraph_text(element, keys: dict):
                     cur_run_text = ''
 
 
+@timed('render.docx', items=1)
 def docx_template(docx_path: str, keys: dict) -> Document:
     """
     Given a docx with {key}s, return a document with those
     keys filled with the variables from `keys`
     """
-    doc = LoadDoc(docx_path) # type: Document
+    doc = load_template(docx_path) # type: Document
 
     body = doc.element.body
     parts = body.iterchildren()
@@ -95,3 +138,58 @@ def docx_template(docx_path: str, keys: dict) -> Document:
 
 
     return doc
+
+# Name of the manifest kept alongside rendered documents
+MANIFEST_NAME = '.render_manifest.json'
+
+class RenderManifest(object):
+    """
+    Record of the template and keys each document in a directory was
+    rendered from, so that documents whose inputs haven't changed can
+    be skipped on the next run.
+
+    Keys in `ignore_keys` (by default the date, which changes every
+    day) don't count as changes.
+    """
+    def __init__(self, output_dir: str, ignore_keys: Iterable[str] = ('date',)):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.ignore_keys = set(ignore_keys)
+        self.hashes = {}
+        if os.path.exists(self.path):
+            with open(self.path) as manifest_f:
+                self.hashes = json.load(manifest_f)
+
+    def input_hash(self, template_path: str, keys: dict) -> str:
+        keys = {k: str(v) for k, v in keys.items() if k not in self.ignore_keys}
+        return hashlib.sha256(json.dumps([template_hash(template_path), keys],
+                                         sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_current(self, output_path: str, template_path: str, keys: dict) -> bool:
+        """
+        Whether `output_path` exists and was rendered from this
+        template and these keys.
+        """
+        return (os.path.exists(output_path) and
+                self.hashes.get(os.path.basename(output_path)) == self.input_hash(template_path, keys))
+
+    def record(self, output_path: str, template_path: str, keys: dict):
+        self.hashes[os.path.basename(output_path)] = self.input_hash(template_path, keys)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as manifest_f:
+            json.dump(self.hashes, manifest_f, indent=1, sort_keys=True)
+        os.replace(self.path + '.tmp', self.path)
+
+def render_docx(docx_path: str, keys: dict, output_path: str,
+                manifest: RenderManifest = None) -> bool:
+    """
+    Render the template to `output_path`, unless the manifest shows
+    it is already up to date. Returns whether it was rendered.
+    """
+    if manifest is not None and manifest.is_current(output_path, docx_path, keys):
+        return False
+    docx_template(docx_path, keys).save(output_path)
+    if manifest is not None:
+        manifest.record(output_path, docx_path, keys)
+    return True
@@ -0,0 +1,25 @@
+"""
+Fixtures that run the clients against the local fake services
+(see winlp_scripts.fake_services) rather than the real ones.
+"""
+import os
+
+import pytest
+
+from winlp_scripts.fake_services import FakeData, FakeServices
+from winlp_scripts.utils import load_yml
+
+BUDGET_MAPPING = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'budget_mapping.yml')
+
+@pytest.fixture(scope='session')
+def fake_data():
+    return FakeData.synthetic(rows=20, text_size=30, budget_mapping=load_yml(BUDGET_MAPPING))
+
+@pytest.fixture(scope='session')
+def fake_services(fake_data):
+    with FakeServices(fake_data) as services:
+        yield services
+
+@pytest.fixture
+def fake_config(fake_services):
+    return fake_services.config()
@@ -0,0 +1,55 @@
+"""
+Unit tests for assigning peer readers to submissions.
+"""
+from collections import Counter
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from winlp_scripts.assignment import assign_readers, AssignmentException
+
+
+def random_conflicts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    conflicts = rng.random((n, n)) < 0.05
+    conflicts |= conflicts.T
+    np.fill_diagonal(conflicts, True)
+    return conflicts
+
+def test_k_readers():
+    conflicts = random_conflicts(60)
+    assignments = assign_readers(conflicts, k=3, seed=1)
+
+    assert not any(conflicts[reader, paper] for reader, paper in assignments)
+    assert set(Counter(paper for reader, paper in assignments).values()) == {3}
+    assert max(Counter(reader for reader, paper in assignments).values()) <= 3
+    assert assignments == assign_readers(conflicts, k=3, seed=1)
+
+def test_costs():
+    conflicts = np.eye(4, dtype=bool)
+    # Everyone prefers reading the "next" paper
+    costs = np.ones((4, 4))
+    for i in range(4):
+        costs[i, (i+1) % 4] = 0
+    assert assign_readers(conflicts, k=1, costs=costs) == [(3, 0), (0, 1), (1, 2), (2, 3)]
+
+    # Or as a sparse matrix of just the preferred pairs
+    sparse_costs = csr_matrix(costs - 1)
+    assert sparse_costs.nnz == 4
+    assert assign_readers(conflicts, k=1, costs=sparse_costs) == [(3, 0), (0, 1), (1, 2), (2, 3)]
+
+def test_infeasible():
+    conflicts = np.ones((3, 3), dtype=bool)
+    conflicts[0, 1] = conflicts[1, 0] = False
+    with pytest.raises(AssignmentException):
+        assign_readers(conflicts, k=1)
+
+def test_solver_failure(monkeypatch):
+    from scipy.optimize import OptimizeResult
+    from winlp_scripts import assignment
+    monkeypatch.setattr(assignment, 'linprog',
+                        lambda *args, **kwargs: OptimizeResult(x=None, status=1, success=False,
+                                                               message='Iteration limit reached.'))
+    with pytest.raises(AssignmentException, match='Iteration limit'):
+        assign_readers(np.eye(4, dtype=bool), k=1)
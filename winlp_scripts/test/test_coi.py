@@ -0,0 +1,47 @@
+"""
+Unit tests for reviewer conflict-of-interest checks.
+"""
+from pandas import DataFrame
+
+from winlp_scripts.coi import COIIndex, email_domain, affiliation_tokens
+from winlp_scripts.softconf import PAPER_ID, MC_EMAIL, ALL_EMAILS, MC_AFFILLIATION, REVIEWER_EMAIL
+
+SUBMISSIONS = DataFrame({
+    PAPER_ID: [1, 2, 3],
+    MC_EMAIL: ['ann@cs.washington.edu', 'bo@gmail.com', 'cy@cam.ac.uk'],
+    ALL_EMAILS: ['ann@cs.washington.edu; dee@gmail.com', 'bo@gmail.com', 'cy@cam.ac.uk'],
+    MC_AFFILLIATION: ['University of Washington', 'Acme Labs', 'University of Cambridge']})
+
+
+def test_email_domain():
+    assert email_domain('a@cs.washington.edu') == 'washington.edu'
+    assert email_domain('b@cl.cam.ac.uk') == 'cam.ac.uk'
+    assert email_domain('c@nlp.ibm.de') == 'ibm.de'
+    assert email_domain('d@cs.cmu.ca') == 'cmu.ca'
+    assert email_domain('e@is.naist.ac.jp') == 'naist.ac.jp'
+    assert email_domain('f@sydney.edu.au') == 'sydney.edu.au'
+    assert email_domain('g@ibm.co.jp') == 'ibm.co.jp'
+
+def test_affiliation_tokens():
+    assert affiliation_tokens('University of Washington') == {'washington'}
+    assert affiliation_tokens(None) == set()
+
+def test_check_reviews():
+    index = COIIndex(SUBMISSIONS)
+    reviews = DataFrame({PAPER_ID: [1, 1, 2, 2, 3, 3],
+                         REVIEWER_EMAIL: ['Dee@gmail.com', 'eve@washington.edu', 'fay@gmail.com',
+                                          'ann@cs.washington.edu', 'gus@cl.cam.ac.uk', 'hal@mit.edu']})
+    conflicts = index.check_reviews(reviews)
+    assert [tuple(r) for r in conflicts[['paper_id', 'reviewer_email', 'reason']].values] == [
+        (1, 'dee@gmail.com', 'author'),
+        (1, 'eve@washington.edu', 'domain'),
+        (3, 'gus@cl.cam.ac.uk', 'domain')]
+
+def test_affiliation_conflict():
+    submissions = DataFrame({PAPER_ID: [1, 2],
+                             MC_EMAIL: ['ann@gmail.com', 'bo@yahoo.com'],
+                             ALL_EMAILS: ['ann@gmail.com', 'bo@yahoo.com'],
+                             MC_AFFILLIATION: ['Acme Research', 'Acme Research Labs']})
+    index = COIIndex(submissions)
+    assert [c.reason for c in index.check(2, 'ann@gmail.com')] == ['affiliation']
+    assert index.check(1, 'bo@yahoo.com')[0].match == 'acme'
@@ -0,0 +1,23 @@
+"""
+Unit tests for finding submissions that share authors.
+"""
+from pandas import DataFrame
+
+from winlp_scripts.conflicts import split_emails, submission_emails, conflict_pairs, conflict_matrix
+from winlp_scripts.softconf import PAPER_ID, MC_EMAIL, ALL_EMAILS
+
+
+def test_split_emails():
+    assert split_emails('A@x.org; b@y.org', None, float('nan'), 'c@z.org,a@x.org') == {'a@x.org', 'b@y.org', 'c@z.org'}
+
+def test_conflicts():
+    submissions = DataFrame({PAPER_ID: [1, 2, 3, 4],
+                             MC_EMAIL: ['a@x.org', 'b@x.org', 'c@x.org', 'd@x.org'],
+                             ALL_EMAILS: ['a@x.org;e@x.org', 'b@x.org', 'E@x.org c@x.org', 'b@x.org']})
+    email_sets = submission_emails(submissions)
+    assert conflict_pairs(email_sets).tolist() == [[0, 2], [1, 3]]
+
+    conflicts = conflict_matrix(email_sets)
+    assert conflicts.diagonal().all()
+    assert conflicts[2, 0] and conflicts[3, 1]
+    assert conflicts.sum() == 8
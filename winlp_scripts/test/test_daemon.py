@@ -0,0 +1,137 @@
+"""
+Tests for running scripts in the daemon, against the fake services.
+"""
+import io
+import logging
+import os
+import threading
+
+import pytest
+import yaml
+
+from winlp_scripts.daemon import Daemon, DaemonException, default_socket_path, request, run
+
+SCRIPT = '''
+import sys
+from argparse import ArgumentParser
+from winlp_scripts.limesurvey import LimeSurveyConnection
+from winlp_scripts.softconf import SoftconfConnection
+from winlp_scripts.utils import load_yml
+
+p = ArgumentParser()
+p.add_argument('-c', '--config', type=load_yml)
+p.add_argument('--fail', action='store_true')
+args = p.parse_args()
+
+print(len(SoftconfConnection.from_conf(args.config).submission_information()))
+with LimeSurveyConnection.from_conf(args.config) as lsc:
+    print(len(lsc.list_surveys()))
+if args.fail:
+    sys.exit('failed on purpose')
+'''
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = Daemon(str(tmp_path / 'daemon.sock'))
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+    daemon.server_close()
+
+@pytest.fixture
+def script(tmp_path, fake_config, monkeypatch):
+    with open(tmp_path / 'config.yml', 'w') as config_f:
+        yaml.safe_dump(fake_config, config_f)
+    with open(tmp_path / 'script.py', 'w') as script_f:
+        script_f.write(SCRIPT)
+    monkeypatch.chdir(tmp_path)
+    return 'script.py'
+
+def logins(services, service):
+    return [r for r in services.requests if r[0] == service and r[1] == 'POST' and 'login' in r[2]]
+
+def test_run_reuses_connections(daemon, script, fake_services, fake_data):
+    del fake_services.requests[:]
+    for _ in range(2):
+        stdout = io.StringIO()
+        assert run(script, ['-c', 'config.yml'], daemon.socket_path, stdout=stdout) == 0
+        assert stdout.getvalue().split() == [str(len(fake_data.submissions)), str(len(fake_data.surveys))]
+
+    # Logged in once for both jobs, and still logged in
+    assert len(logins(fake_services, 'softconf')) == 1
+    assert len(logins(fake_services, 'limesurvey')) == 1
+    assert request({'command': 'status'}, daemon.socket_path)['connections'] == 2
+    assert os.stat(daemon.socket_path).st_mode & 0o777 == 0o600
+
+def test_failed_job_drops_connections(daemon, script, fake_services):
+    stderr = io.StringIO()
+    assert run(script, ['-c', 'config.yml', '--fail'], daemon.socket_path,
+               stdout=io.StringIO(), stderr=stderr) == 1
+    assert 'failed on purpose' in stderr.getvalue()
+    assert request({'command': 'status'}, daemon.socket_path)['connections'] == 0
+
+def test_not_running(tmp_path):
+    with pytest.raises(DaemonException, match='not running'):
+        run('script.py', [], str(tmp_path / 'missing.sock'))
+
+def test_socket_path_checks(tmp_path, monkeypatch):
+    # Not removing something that isn't a socket
+    path = tmp_path / 'daemon.sock'
+    path.write_text('not a socket')
+    with pytest.raises(DaemonException, match='not a socket'):
+        Daemon(str(path))
+    assert path.read_text() == 'not a socket'
+
+    # Nor using a shared directory for the default socket
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    os.makedirs(str(tmp_path / 'winlp-scripts-{}'.format(os.getuid())), mode=0o777)
+    os.chmod(str(tmp_path / 'winlp-scripts-{}'.format(os.getuid())), 0o777)
+    with pytest.raises(DaemonException, match='only accessible'):
+        Daemon(default_socket_path())
+
+def test_already_running(daemon):
+    # Not removing the socket of a running daemon
+    with pytest.raises(DaemonException, match='already running'):
+        Daemon(daemon.socket_path)
+    assert request({'command': 'status'}, daemon.socket_path)['exit'] == 0
+
+def test_close_keeps_other_socket(tmp_path):
+    path = str(tmp_path / 'daemon.sock')
+    first = Daemon(path)
+    # A later daemon replaces the socket of one that stopped serving
+    first.socket.close()
+    second = Daemon(path)
+    first.server_close()
+    assert os.path.exists(path)
+    second.server_close()
+    assert not os.path.exists(path)
+
+LOGGING_SCRIPT = '''
+import logging
+import sys
+
+logging.basicConfig(level=logging.INFO if '-v' in sys.argv else logging.WARNING)
+logging.getLogger('job').info('verbose')
+logging.getLogger('job').warning('warned')
+'''
+
+def test_job_logging(daemon, tmp_path, monkeypatch):
+    with open(tmp_path / 'logs.py', 'w') as script_f:
+        script_f.write(LOGGING_SCRIPT)
+    monkeypatch.chdir(tmp_path)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+
+    # The script's logging goes to the job's stderr, at its level
+    stderr = io.StringIO()
+    assert run('logs.py', [], daemon.socket_path, stdout=io.StringIO(), stderr=stderr) == 0
+    assert 'warned' in stderr.getvalue() and 'verbose' not in stderr.getvalue()
+    stderr = io.StringIO()
+    assert run('logs.py', ['-v'], daemon.socket_path, stdout=io.StringIO(), stderr=stderr) == 0
+    assert 'warned' in stderr.getvalue() and 'verbose' in stderr.getvalue()
+
+    # and the daemon's own logging is as before
+    assert root.handlers == handlers and root.level == level
@@ -0,0 +1,76 @@
+"""
+Unit tests for sending emails and the dry-run mail sink.
+"""
+import csv
+import mailbox
+import os
+from email import message_from_binary_file
+from email.mime.application import MIMEApplication
+
+import pytest
+
+from winlp_scripts import email_tools
+from winlp_scripts.email_tools import MailSink, EmailException, craft_text_email, create_html_email, gmail_send
+
+def messages():
+    yield ['a@example.org'], craft_text_email('From the chairs:\nhello', 'Note 1')
+    msg = create_html_email('<p>Your grant</p>', 'Note 2')
+    attachment = MIMEApplication(b'%PDF-1.4', Name='letter.pdf')
+    attachment['Content-Disposition'] = 'attachment; filename="letter.pdf"'
+    msg.attach(attachment)
+    yield ['b@example.org', 'chairs@example.org'], msg
+
+def read_index(path):
+    with open(path, newline='') as index_f:
+        return list(csv.DictReader(index_f))
+
+def test_mbox(tmp_path):
+    path = str(tmp_path / 'batch.mbox')
+    with MailSink(path) as sink:
+        for to_addrs, msg in messages():
+            sink.add(to_addrs, msg)
+    assert sink.count == 2
+
+    mbox = mailbox.mbox(path)
+    assert [m['Subject'] for m in mbox] == ['Note 1', 'Note 2']
+    assert mbox[1]['To'] == 'b@example.org,chairs@example.org'
+    # Lines starting with "From " in the body are escaped
+    assert 'From the chairs' in mbox[0].get_payload()[0].get_payload()
+
+    index = read_index(path + '.csv')
+    assert [row['to'] for row in index] == ['a@example.org', 'b@example.org,chairs@example.org']
+    assert index[1]['attachments'] == 'letter.pdf'
+    assert int(index[0]['bytes']) > 0
+
+def test_eml_directory(tmp_path):
+    path = str(tmp_path / 'batch')
+    with MailSink(path) as sink:
+        for to_addrs, msg in messages():
+            sink.add(to_addrs, msg)
+
+    index = read_index(os.path.join(path, 'index.csv'))
+    assert [row['file'] for row in index] == ['00001.eml', '00002.eml']
+    with open(os.path.join(path, '00002.eml'), 'rb') as eml_f:
+        msg = message_from_binary_file(eml_f)
+    assert msg['Subject'] == 'Note 2'
+    assert int(index[1]['bytes']) == os.path.getsize(os.path.join(path, '00002.eml'))
+
+def test_readdressed(tmp_path):
+    # A message that already has a To header is readdressed, not sent to both
+    msg = craft_text_email('hello', 'Note')
+    msg['To'] = 'old@example.org'
+    path = str(tmp_path / 'batch.mbox')
+    with MailSink(path) as sink:
+        sink.add(['new@example.org'], msg)
+    assert mailbox.mbox(path)[0].get_all('To') == ['new@example.org']
+
+def test_send_timeout(monkeypatch):
+    attempts = []
+    def timeout(*args):
+        attempts.append(args)
+        raise TimeoutError()
+    monkeypatch.setattr(email_tools.smtplib, 'SMTP_SSL', timeout)
+    monkeypatch.setattr(email_tools, 'SEND_RETRY_DELAY', 0)
+    with pytest.raises(EmailException, match='timed out 3 times'):
+        gmail_send('chairs@example.org', 'secret', ['a@example.org'], craft_text_email('hello', 'Note'))
+    assert len(attempts) == 3
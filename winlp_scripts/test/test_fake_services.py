@@ -0,0 +1,24 @@
+"""
+Unit tests for the fake services' data and recordings.
+"""
+from winlp_scripts.fake_services import FakeData
+from winlp_scripts.fake_services.server import sheet_range
+
+def test_save_load(tmp_path, fake_data):
+    fake_data.attachments[1] = fake_data.attachments_zip(1, [1])
+    fake_data.save(str(tmp_path))
+    loaded = FakeData.load(str(tmp_path))
+
+    assert loaded.submissions.equals(fake_data.submissions)
+    assert loaded.reviews.equals(fake_data.reviews)
+    assert loaded.surveys[1].equals(fake_data.surveys[1])
+    assert loaded.attachments_zip(1, [2]) == fake_data.attachments[1]
+    assert loaded.sheets == fake_data.sheets
+    assert list(loaded.sheets['budget']) == ['Summary', 'Travel Grants']
+    del fake_data.attachments[1]
+
+def test_sheet_range():
+    rows = [['a', 'b', 'c'], ['1', '', ''], ['', '', ''], ['x', 'y', 'z']]
+    assert sheet_range(rows, "'Sheet 1'!A1:ZZ999") == [['a', 'b', 'c'], ['1'], [], ['x', 'y', 'z']]
+    assert sheet_range(rows, 'B2:C3') == []
+    assert sheet_range(rows, 'B1:C2') == [['b', 'c']]
@@ -1,9 +1,136 @@
 """
-Test the functionality for Google spreadsheets
+Test the functionality for Google spreadsheets,
+against the fake services.
 """
-from pytest_testconfig import config
+import pickle
 
-from winlp_scripts.google_sheets import auth_google
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from google.oauth2.credentials import Credentials
 
-def test_authentication():
-    auth_google()
\ No newline at end of file
+from winlp_scripts.fake_services.data import NOTES_SHEET_ID, BUDGET_SHEET_ID
+from winlp_scripts.google_sheets import (auth_google, grab_sheet, build_service, GoogleSheetInterface,
+                                        AuthenticationException, SCOPES, ROW_ADDED, ROW_CHANGED, ROW_REMOVED)
+
+def test_authentication(tmp_path):
+    # A saved, valid token is used without going through the OAuth flow
+    token_path = tmp_path / 'token.pkl'
+    with open(token_path, 'wb') as token_f:
+        pickle.dump(Credentials(token='token'), token_f)
+    creds = auth_google(str(token_path), str(tmp_path / 'client.json'))
+    assert creds.token == 'token'
+
+    # But one missing a scope goes through the flow again
+    with open(token_path, 'wb') as token_f:
+        pickle.dump(Credentials(token='token', scopes=SCOPES[:1]), token_f)
+    with pytest.raises(FileNotFoundError, match='client.json'):
+        auth_google(str(token_path), str(tmp_path / 'client.json'))
+
+def test_no_credentials():
+    with pytest.raises(AuthenticationException):
+        GoogleSheetInterface()
+
+def test_get_sheet(fake_config, fake_data):
+    gsi = GoogleSheetInterface.from_conf(fake_config)
+    notes = gsi.get_sheet(NOTES_SHEET_ID)
+    rows = fake_data.sheets[NOTES_SHEET_ID]['Notes']
+    assert list(notes.columns) == rows[0]
+    assert notes.values.tolist() == rows[1:]
+
+def test_grab_sheet(fake_config, fake_data):
+    headers, rows = grab_sheet(BUDGET_SHEET_ID, 1, api_key='fake', num_rows=6,
+                               last_col='ah', url_base=fake_config['google']['url_base'])
+    expected = fake_data.sheets[BUDGET_SHEET_ID]['Travel Grants']
+    assert headers == expected[0][:len(headers)]
+    assert len(rows) == 5
+    assert rows[0][0] == expected[1][0]
+
+@pytest.fixture
+def watched_sheet(fake_services):
+    fake_services.data.sheets['watched'] = {'Grants': [['Email', 'Name', 'Amount'],
+                                                      ['a@x.org', 'A', '100'],
+                                                      ['b@x.org', 'B', '200'],
+                                                      ['', '', 'total']]}
+    yield 'watched'
+    del fake_services.data.sheets['watched']
+
+def values_requests(services):
+    return [r for r in services.requests if '/values/' in r[2]]
+
+def test_watch(fake_config, fake_services, watched_sheet):
+    watcher = GoogleSheetInterface.from_conf(fake_config).watch(watched_sheet, key_column='Email')
+    changed = []
+    watcher.subscribe(changed.append, kinds=[ROW_CHANGED])
+    batches = []
+    watcher.subscribe_batch(batches.append)
+
+    # Every row is new at first, except those without a key
+    assert [(e.kind, e.key) for e in watcher.poll()] == [(ROW_ADDED, 'a@x.org'), (ROW_ADDED, 'b@x.org')]
+
+    # Nothing is read while the sheet is unchanged
+    del fake_services.requests[:]
+    assert watcher.poll() == []
+    assert values_requests(fake_services) == []
+
+    fake_services.update_sheet(watched_sheet, 'Grants', [['Email', 'Name', 'Amount'],
+                                                         ['b@x.org', 'B', '250'],
+                                                         ['c@x.org', 'C', '300']])
+    events = watcher.poll()
+    assert sorted((e.kind, e.key) for e in events) == [(ROW_ADDED, 'c@x.org'), (ROW_CHANGED, 'b@x.org'),
+                                                       (ROW_REMOVED, 'a@x.org')]
+    assert [(e.row, e.old_row) for e in changed] == [(['b@x.org', 'B', '250'], ['b@x.org', 'B', '200'])]
+    assert len(batches) == 2
+    assert list(watcher.rows) == ['b@x.org', 'c@x.org']
+
+def test_watch_empty_sheet(fake_config, fake_services, watched_sheet):
+    watcher = GoogleSheetInterface.from_conf(fake_config).watch(watched_sheet, key_column='Email')
+    assert len(watcher.poll()) == 2
+    fake_services.update_sheet(watched_sheet, 'Grants', [])
+    assert sorted(e.kind for e in watcher.poll()) == [ROW_REMOVED, ROW_REMOVED]
+    assert watcher.header == [] and not watcher.rows
+
+class FailingDrive(object):
+    """
+    Stands in for the Drive service, raising the given errors
+    before passing requests on to `drive`.
+    """
+    def __init__(self, drive, errors):
+        self.drive = drive
+        self.errors = list(errors)
+
+    def files(self):
+        return self
+
+    def get(self, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.drive.files().get(**kwargs)
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'')
+
+def test_watch_without_drive(fake_config, fake_services, watched_sheet):
+    watcher = GoogleSheetInterface.from_conf(fake_config).watch(watched_sheet, key_column=0, interval=0)
+    # Drive access is denied, so the values are compared on each poll
+    watcher._drive = FailingDrive(watcher._drive, [http_error(403), http_error(403)])
+    watcher.watch(max_polls=2)
+    assert watcher.polls == 2
+    assert list(watcher.rows) == ['a@x.org', 'b@x.org']
+    # without asking Drive again
+    assert len(watcher._drive.errors) == 1
+
+    fake_services.data.sheets[watched_sheet]['Grants'][1][2] = '150'
+    assert [(e.kind, e.key) for e in watcher.poll()] == [(ROW_CHANGED, 'a@x.org')]
+
+def test_watch_drive_error(fake_config, fake_services, watched_sheet):
+    watcher = GoogleSheetInterface.from_conf(fake_config).watch(watched_sheet, key_column=0, interval=0)
+    watcher._drive = FailingDrive(watcher._drive, [http_error(503)])
+    assert len(watcher.poll()) == 2
+
+    # The probe is tried again, and once it has the version, the
+    # unchanged sheet isn't read
+    watcher.poll()
+    del fake_services.requests[:]
+    assert watcher.poll() == []
+    assert values_requests(fake_services) == []
@@ -1,23 +1,49 @@
 """
-Unit tests for working with the LimeSurvey software.
+Unit tests for working with the LimeSurvey software,
+against the fake services.
 """
-import os
-import yaml
+import asyncio
+import time
 
-from pytest_testconfig import config
+from winlp_scripts.fake_services import FakeData, FakeServices
+from winlp_scripts.limesurvey import LimeSurveyConnection, AsyncLimeSurveyConnection
 
-user = config['limesurvey']['user']
-pw = config['limesurvey']['pass']
-url_base = config['limesurvey']['url_base']
+def test_init(fake_config):
+    with LimeSurveyConnection.from_conf(fake_config) as ls:
+        assert ls.get_session_key() is not None
 
-def test_init():
-    from winlp_scripts.limesurvey import LimeSurveyConnection
-    ls = LimeSurveyConnection(url_base, user, pw)
-    assert ls is not None
-    assert ls.get_session_key() is not None
-    return ls
+def test_list_surveys(fake_config):
+    with LimeSurveyConnection.from_conf(fake_config) as ls:
+        assert [s['sid'] for s in ls.list_surveys()] == ['1']
 
-ls = test_init()
+def test_export_responses(fake_config, fake_data):
+    with LimeSurveyConnection.from_conf(fake_config) as ls:
+        responses = ls.export_responses(1)
+    assert list(responses['id']) == list(fake_data.surveys[1]['id'])
+    assert list(responses['email']) == list(fake_data.surveys[1]['email'])
 
-def test_list_surveys():
-    ls.list_surveys()
\ No newline at end of file
+def test_download_files(fake_config, tmp_path):
+    with LimeSurveyConnection.from_conf(fake_config) as ls:
+        zip = ls.get_download_for_response_list(1, [1, 2])
+        assert zip.namelist()
+        assert all(name[:5] in ('00001', '00002') for name in zip.namelist())
+
+        with ls.get_download_for_response_list(1, [3], path=str(tmp_path / 'files.zip')) as mapped:
+            assert all(name.startswith('00003') for name in mapped.namelist())
+
+def test_export_many():
+    data = FakeData.synthetic(rows=5)
+    data.surveys.update({2: data.surveys[1].head(2), 3: data.surveys[1].head(3)})
+
+    with FakeServices(data, latency={'limesurvey': 0.2}) as services:
+        async def export():
+            async with AsyncLimeSurveyConnection.from_conf(services.config()) as als:
+                start = time.perf_counter()
+                exported = await als.export_many([1, 2, 3])
+                return exported, time.perf_counter() - start
+
+        exported, elapsed = asyncio.run(export())
+
+    assert {k: len(v) for k, v in exported.items()} == {1: 5, 2: 2, 3: 3}
+    # The three exports run at the same time
+    assert elapsed < 0.5
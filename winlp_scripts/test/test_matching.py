@@ -0,0 +1,30 @@
+"""
+Unit tests for mentor/mentee matching.
+"""
+import numpy as np
+from pandas import DataFrame
+
+from winlp_scripts.matching import answer_columns, pack_answers, overlap_matrix, match_mentors
+from winlp_scripts.utils import overlap_bitstring
+
+
+def test_overlap_matrix():
+    rng = np.random.default_rng(0)
+    mentors = rng.random((5, 19)) < 0.5
+    mentees = rng.random((7, 19)) < 0.5
+    overlap = overlap_matrix(np.packbits(mentors, axis=1), np.packbits(mentees, axis=1), block_size=3)
+    for i in range(5):
+        for j in range(7):
+            assert overlap[i, j] == overlap_bitstring(mentors[i], mentees[j])
+
+def test_pack_answers():
+    answers = DataFrame({'name': ['a', 'b'], 'nlp': ['Yes', 'No'], 'ml': ['Yes', 'Yes']})
+    columns = answer_columns(answers, 'b', 'c')
+    assert columns == ['nlp', 'ml']
+    assert pack_answers(answers, columns).tolist() == [[0b11000000], [0b01000000]]
+
+def test_match_mentors():
+    overlap = np.array([[3, 2, 0, 1],
+                        [0, 1, 3, 1]])
+    assert match_mentors(overlap, capacity=2) == [(0, 0, 3), (0, 1, 2), (1, 2, 3), (1, 3, 1)]
+    assert match_mentors(overlap, capacity=[1, 1]) == [(0, 0, 3), (1, 2, 3)]
@@ -0,0 +1,37 @@
+"""
+Unit tests for near-duplicate detection.
+"""
+from winlp_scripts.minhash import MinHashIndex
+
+ABSTRACT = ('We present a new dataset of annotated dialogues for low-resource languages, '
+            'and show that multilingual pretraining improves dialogue act classification '
+            'across all of the languages we consider, especially those with little data.')
+
+def test_near_duplicates(tmp_path):
+    index = MinHashIndex()
+    index.add('2019/12', ABSTRACT)
+    index.add('2019/13', 'Gender bias in coreference resolution systems is measured with a new benchmark.')
+
+    recycled = ABSTRACT.replace('especially those with little data', 'especially the smallest ones')
+    matches = index.query(recycled)
+    assert [id for id, sim in matches] == ['2019/12']
+    assert 0.5 <= matches[0][1] < 1
+
+    assert index.query('An unrelated paper about parsing morphologically rich languages.') == []
+
+    # Saving and reloading keeps the index, and new items can be added
+    path = str(tmp_path / 'minhash.npz')
+    index.save(path)
+    loaded = MinHashIndex.load_or_create(path)
+    assert len(loaded) == 2 and '2019/13' in loaded
+    loaded.add('2020/1', ABSTRACT)
+    assert [id for id, sim in loaded.query(ABSTRACT)] == ['2019/12', '2020/1']
+
+def test_empty_texts():
+    # Texts without any words (e.g. scanned PDFs) don't match each other
+    index = MinHashIndex()
+    assert not index.add('2019/1/pdf', '')
+    assert not index.add('2019/2/pdf', '  \n ')
+    assert index.add('2019/3/abstract', ABSTRACT)
+    assert len(index) == 1 and '2019/1/pdf' not in index
+    assert index.query('') == []
@@ -0,0 +1,34 @@
+"""
+Unit tests for the reimbursement ledger.
+"""
+import importlib.util
+import os
+
+from pandas import DataFrame
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'parse_reimbursements.py')
+
+spec = importlib.util.spec_from_file_location('parse_reimbursements', SCRIPT)
+parse_reimbursements = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(parse_reimbursements)
+
+def test_over_cap(tmp_path):
+    rate = 50.0
+    ledger = DataFrame([(1, 'A', 'a@x.org', 'hotel', 120.0, 2, 2*rate, 120.0),
+                        (1, 'A', 'a@x.org', 'travel', 900.0, 2, 2*rate, 900.0),
+                        (2, 'B', 'b@x.org', 'hotel', 150.0, 3, 3*rate, 150.0),
+                        (3, 'C', 'c@x.org', 'hotel', 300.0, 1, 1*rate, 300.0),
+                        (4, 'D', 'd@x.org', 'hotel', 80.0, 2, 2*rate, 80.0)],
+                       columns=parse_reimbursements.LEDGER_COLUMNS)
+    ledger_path = str(tmp_path / 'ledger.sqlite')
+    parse_reimbursements.write_ledger(ledger, ledger_path)
+
+    # Hotel claims over the cap (not at or under it, nor other
+    # categories), largest overage first
+    over = parse_reimbursements.over_cap(ledger_path)
+    assert over['response_id'].tolist() == [3, 1]
+    assert over['overage'].tolist() == [250.0, 20.0]
+
+    # Rewriting the ledger replaces it
+    parse_reimbursements.write_ledger(ledger[ledger['response_id'] != 3], ledger_path)
+    assert parse_reimbursements.over_cap(ledger_path)['response_id'].tolist() == [1]
@@ -0,0 +1,169 @@
+"""
+Unit tests for the pipeline runner.
+"""
+import mailbox
+import os
+import time
+
+import pytest
+
+from winlp_scripts.pipeline import Pipeline, Stage, PipelineException, step
+
+CALLS = []
+SOURCE = {'value': 1}
+
+@step('test_source')
+def source():
+    CALLS.append('source')
+    return SOURCE['value']
+
+@step('test_slow')
+def slow(value, delay=0.3):
+    CALLS.append('slow')
+    time.sleep(delay)
+    return value
+
+@step('test_add')
+def add(a, b, path=None):
+    CALLS.append('add')
+    extra = 0
+    if path:
+        with open(path) as f:
+            extra = int(f.read())
+    return a + b + extra
+
+def pipeline(tmp_path, path=None):
+    return Pipeline([Stage('source', 'test_source', always=True),
+                     Stage('a', 'test_slow', {'value': '$source'}),
+                     Stage('b', 'test_slow', {'value': 10}),
+                     Stage('total', 'test_add', {'a': '$a', 'b': '$b', 'path': path})],
+                    cache_dir=str(tmp_path / 'cache'))
+
+def test_levels(tmp_path):
+    p = pipeline(tmp_path)
+    assert p.levels() == [['source', 'b'], ['a'], ['total']]
+    assert p.levels(['a']) == [['source'], ['a']]
+
+def test_run_and_cache(tmp_path):
+    path = str(tmp_path / 'extra.txt')
+    with open(path, 'w') as f:
+        f.write('100')
+    del CALLS[:]
+    SOURCE['value'] = 1
+
+    start = time.perf_counter()
+    outputs = pipeline(tmp_path, path).run()
+    # "source" and "b" ran at the same time
+    assert time.perf_counter() - start < 0.9
+    assert outputs == {'source': 1, 'a': 1, 'b': 10, 'total': 111}
+
+    # Only the source is rerun, and its output hasn't changed
+    del CALLS[:]
+    p = pipeline(tmp_path, path)
+    assert p.run()['total'] == 111
+    assert CALLS == ['source']
+    assert p.status == {'source': 'ran', 'b': 'cached', 'a': 'cached', 'total': 'cached'}
+
+    # A changed source reruns the stages using it
+    del CALLS[:]
+    SOURCE['value'] = 2
+    assert pipeline(tmp_path, path).run()['total'] == 112
+    assert sorted(CALLS) == ['add', 'slow', 'source']
+
+    # As does a changed file
+    del CALLS[:]
+    with open(path, 'w') as f:
+        f.write('200')
+    assert pipeline(tmp_path, path).run()['total'] == 212
+    assert sorted(CALLS) == ['add', 'source']
+
+    # Or forcing a stage
+    del CALLS[:]
+    pipeline(tmp_path, path).run(targets=['b'], force=['b'])
+    assert CALLS == ['slow']
+
+def test_errors(tmp_path):
+    with pytest.raises(PipelineException, match='unknown'):
+        Pipeline([Stage('a', 'test_add', {'a': '$missing', 'b': 1})])
+    with pytest.raises(PipelineException, match='depend on each other'):
+        Pipeline([Stage('a', 'test_slow', {'value': '$b'}),
+                  Stage('b', 'test_slow', {'value': '$a'})]).levels()
+    with pytest.raises(PipelineException, match='Stage "a" failed'):
+        Pipeline([Stage('a', 'test_add', {'a': 1, 'b': 'x'})], cache_dir=str(tmp_path)).run()
+
+def test_builtin_steps(tmp_path, fake_config, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    template = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'email_templates',
+                            'WiNLP Travel Grant Letter.docx')
+    mapping = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'budget_mapping.yml')
+    p = Pipeline([Stage('budget', 'budget_sheet', {'config': '$config', 'num_rows': 20, 'last_col': 'ah'}, always=True),
+                  Stage('letters', 'grant_letters', {'rows': '$budget', 'mapping': mapping,
+                                                     'template': template, 'output_dir': 'letters'}),
+                  Stage('emails', 'letter_emails', {'letters': '$letters', 'subject': 'Letter',
+                                                    'text': 'Dear {name}'}),
+                  Stage('send', 'send_mail', {'google': '$config.google', 'messages': '$emails',
+                                              'dry_run': 'emails.mbox'})],
+                 cache_dir='cache')
+    outputs = p.run(fake_config)
+    assert outputs['letters']
+    assert all(os.path.exists(letter['path']) for letter in outputs['letters'])
+    assert len(mailbox.mbox('emails.mbox')) == len(outputs['letters']) == len(outputs['send'])
+
+    p.run(fake_config)
+    assert p.status['send'] == 'cached'
+
+    # Only the part of the config the stage uses counts
+    fake_config = dict(fake_config, softconf=dict(fake_config['softconf'], password='changed'))
+    p.run(fake_config)
+    assert p.status['send'] == 'cached'
+
+def test_send_mail_once(tmp_path, monkeypatch):
+    from winlp_scripts import email_tools
+    from winlp_scripts.email_tools import craft_text_email
+    from winlp_scripts.pipeline import send_mail
+
+    sent = []
+    monkeypatch.setattr(email_tools, 'gmail_send', lambda user, password, to_addrs, msg: sent.append(to_addrs))
+    google = {'user': 'chairs@example.org', 'pass': 'secret'}
+    sent_log = str(tmp_path / 'sent.json')
+
+    def messages(amount):
+        # Drafted anew (with a new Date) each time
+        return [(['a@example.org'], craft_text_email('Your grant: 100', 'Grant')),
+                (['b@example.org'], craft_text_email('Your grant: {}'.format(amount), 'Grant'))]
+
+    assert send_mail(google, messages(200), sent_log=sent_log) == ['a@example.org', 'b@example.org']
+    time.sleep(1)
+    assert send_mail(google, messages(200), sent_log=sent_log) == []
+    assert send_mail(google, messages(250), sent_log=sent_log) == ['b@example.org']
+
+    # A dry run shows what would be sent, without recording it
+    assert send_mail(google, messages(300), str(tmp_path / 'dry.mbox'), sent_log) == ['b@example.org']
+    assert len(mailbox.mbox(str(tmp_path / 'dry.mbox'))) == 1
+    assert sent == [['a@example.org'], ['b@example.org'], ['b@example.org']]
+    assert send_mail(google, messages(250), sent_log=sent_log) == []
+
+    # A message that fails to send isn't recorded, and is sent next time
+    def fail(user, password, to_addrs, msg):
+        raise email_tools.EmailException('timed out')
+    monkeypatch.setattr(email_tools, 'gmail_send', fail)
+    with pytest.raises(email_tools.EmailException):
+        send_mail(google, messages(400), sent_log=sent_log)
+    monkeypatch.setattr(email_tools, 'gmail_send', lambda user, password, to_addrs, msg: sent.append(to_addrs))
+    assert send_mail(google, messages(400), sent_log=sent_log) == ['b@example.org']
+
+def test_budget_sheet_with_token(tmp_path, fake_config, fake_data):
+    import pickle
+    from google.oauth2.credentials import Credentials
+    from winlp_scripts.fake_services.data import BUDGET_SHEET_ID
+    from winlp_scripts.google_sheets import SCOPES
+    from winlp_scripts.pipeline import budget_sheet
+
+    token_path = str(tmp_path / 'token.pkl')
+    with open(token_path, 'wb') as token_f:
+        pickle.dump(Credentials(token='token', scopes=SCOPES), token_f)
+    google = {'token_file': token_path, 'client_file': str(tmp_path / 'client.json'),
+              'url_base': fake_config['google']['url_base'], 'budget_sheet_id': BUDGET_SHEET_ID}
+
+    rows = budget_sheet({'google': google}, num_rows=6, last_col='ah')
+    assert rows[0][0] == fake_data.sheets[BUDGET_SHEET_ID]['Travel Grants'][1][0]
@@ -0,0 +1,43 @@
+"""
+Unit tests for the concurrent prefetch of script inputs.
+"""
+import time
+
+import pytest
+
+from winlp_scripts.prefetch import Prefetcher, PrefetchException
+
+def slow(value, delay=0.2):
+    time.sleep(delay)
+    return value
+
+def fail():
+    raise ValueError('no such sheet')
+
+def test_fetch_concurrently():
+    prefetch = Prefetcher()
+    prefetch.add('a', slow, 1).add('b', slow, 2).add('c', slow, 3, delay=0.3)
+
+    start = time.perf_counter()
+    data = prefetch.fetch()
+    elapsed = time.perf_counter() - start
+
+    assert data == {'a': 1, 'b': 2, 'c': 3}
+    assert list(data) == ['a', 'b', 'c']
+    # Only as slow as the slowest source
+    assert elapsed < 0.6
+    assert set(prefetch.timings) == {'a', 'b', 'c'}
+    assert prefetch.timings['c'] >= 0.3
+    assert 'c' in prefetch.report()
+
+def test_fetch_failure():
+    prefetch = Prefetcher().add('ok', slow, 1).add('sheet', fail)
+    with pytest.raises(PrefetchException, match='sheet'):
+        prefetch.fetch()
+    # The other fetches still ran to completion
+    assert 'ok' in prefetch.timings
+
+def test_duplicate_name():
+    prefetch = Prefetcher().add('a', slow, 1)
+    with pytest.raises(PrefetchException):
+        prefetch.add('a', slow, 2)
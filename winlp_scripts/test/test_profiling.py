@@ -0,0 +1,57 @@
+"""
+Unit tests for the per-stage instrumentation.
+"""
+import time
+from argparse import ArgumentParser
+
+from winlp_scripts.profiling import stage, timed, stages, reset, report, add_profile_arguments
+from winlp_scripts.softconf import SoftconfConnection
+
+@timed('test.render', items=1)
+def render(text):
+    return text.upper()
+
+@timed('test.fetch', bytes=len, items=lambda rows: rows.count('\n'))
+def fetch():
+    time.sleep(0.01)
+    return 'a\nb\nc\n'
+
+def test_stage():
+    reset()
+    with stage('test.stage') as record:
+        record.add(bytes=10, items=2)
+    with stage('test.stage') as record:
+        record.add(bytes=5)
+
+    stats = stages()['test.stage']
+    assert (stats.calls, stats.bytes, stats.items) == (2, 15, 2)
+
+def test_timed():
+    reset()
+    render('a')
+    render('b')
+    fetch()
+    assert stages()['test.render'].items == 2
+    assert stages()['test.fetch'].bytes == 6
+    assert stages()['test.fetch'].items == 3
+    assert stages()['test.fetch'].seconds >= 0.01
+
+    lines = report().splitlines()
+    # Slowest first
+    assert lines[1].startswith('test.fetch')
+    assert lines[-1].startswith('total')
+
+def test_client_stages(fake_config):
+    reset()
+    SoftconfConnection.from_conf(fake_config).submission_information()
+    recorded = stages()
+    assert recorded['softconf.login'].calls == 1
+    assert recorded['softconf.spreadsheet'].bytes > 0
+    assert recorded['softconf.decode'].items == 20
+
+def test_profile_arguments():
+    p = ArgumentParser()
+    add_profile_arguments(p)
+    args = p.parse_args(['--profile-stats', 'out.pstats'])
+    assert not args.profile
+    assert args.profile_stats == 'out.pstats'
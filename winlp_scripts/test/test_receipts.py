@@ -0,0 +1,36 @@
+"""
+Unit tests for duplicate receipt detection.
+"""
+import pytest
+
+from winlp_scripts.receipts import ReceiptIndex
+
+
+def test_duplicate_content(tmp_path):
+    first = tmp_path / 'hotel_a.pdf'
+    second = tmp_path / 'hotel_b.pdf'
+    other = tmp_path / 'flight.pdf'
+    first.write_bytes(b'shared invoice')
+    second.write_bytes(b'shared invoice')
+    other.write_bytes(b'flight receipt')
+
+    index = ReceiptIndex()
+    assert index.add(str(first), 1, 'hotel') == []
+    assert index.add(str(other), 1, 'air') == []
+    matches = index.add(str(second), 2, 'hotel')
+    assert [(m.owner, m.category) for m in matches] == [(1, 'hotel')]
+
+    groups = index.duplicates()
+    assert len(groups) == 1
+    assert {r.owner for r in groups[0]} == {1, 2}
+
+def test_duplicate_image(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    img = Image.linear_gradient('L').resize((64, 64))
+    img.save(tmp_path / 'receipt.png')
+    img.resize((128, 128)).save(tmp_path / 'receipt_rescan.jpg', quality=80)
+
+    index = ReceiptIndex()
+    index.add(str(tmp_path / 'receipt.png'), 1, 'visa')
+    matches = index.add(str(tmp_path / 'receipt_rescan.jpg'), 1, 'other')
+    assert [m.category for m in matches] == ['visa']
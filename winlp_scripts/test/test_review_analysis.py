@@ -0,0 +1,38 @@
+"""
+Unit tests for review score aggregation.
+"""
+import numpy as np
+from pandas import DataFrame
+
+from winlp_scripts.review_analysis import numeric_scores, calibrate, decision_table
+from winlp_scripts.softconf import PAPER_ID, REVIEWER_EMAIL, REVIEWER_CONFIDENCE, SCORE_RECOMMENDATION
+
+REVIEWS = DataFrame({
+    PAPER_ID: [1, 1, 2, 2, 3, 3],
+    REVIEWER_EMAIL: ['harsh', 'kind', 'harsh', 'kind', 'harsh', 'kind'],
+    SCORE_RECOMMENDATION: ['3: Borderline', '5: Accept', '1', '4', '2', None],
+    REVIEWER_CONFIDENCE: [5, 1, 3, 3, 4, 4]})
+
+
+def test_numeric_scores():
+    scores = numeric_scores(REVIEWS)
+    assert scores[SCORE_RECOMMENDATION].tolist()[:5] == [3.0, 5.0, 1.0, 4.0, 2.0]
+    assert np.isnan(scores[SCORE_RECOMMENDATION].iloc[5])
+
+def test_calibrate():
+    calibrated = calibrate(numeric_scores(REVIEWS))
+    z = calibrated[SCORE_RECOMMENDATION + '_z']
+    assert np.allclose(z[:5], [1, 0.70710678, -1, -0.70710678, 0])
+    assert np.isnan(z.iloc[5])
+
+def test_decision_table():
+    table = decision_table(REVIEWS)
+    assert table.index.tolist() == [1, 3, 2]
+    assert table['rank'].tolist() == [1, 2, 3]
+    assert table.loc[1, 'disagreement'] == 2
+    assert table.loc[3, 'count'] == 1
+    assert np.isclose(table.loc[1, 'weighted_mean'], (3*5 + 5*1) / 6)
+
+def test_decision_table_without_reviewers():
+    table = decision_table(REVIEWS.drop(columns=[REVIEWER_EMAIL]))
+    assert table.index.tolist() == [1, 2, 3]
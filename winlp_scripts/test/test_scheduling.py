@@ -0,0 +1,22 @@
+"""
+Unit tests for scheduling papers into sessions.
+"""
+import numpy as np
+
+from winlp_scripts.scheduling import schedule_sessions, overbooked_authors
+
+
+def test_schedule_without_conflicts():
+    # A chain of papers that each share an author with the next
+    email_sets = [{'a{}'.format(i), 'a{}'.format(i+1)} for i in range(10)] + [{'x'}, {'y'}]
+    schedule = schedule_sessions(email_sets, num_sessions=3)
+    assert schedule.conflicts == []
+    assert np.bincount(schedule.sessions).tolist() == [4, 4, 4]
+    for i in range(9):
+        assert schedule.sessions[i] != schedule.sessions[i+1]
+
+def test_unavoidable_conflicts():
+    email_sets = [{'busy'}, {'busy'}, {'busy'}, {'other'}]
+    schedule = schedule_sessions(email_sets, num_sessions=2)
+    assert len(schedule.conflicts) == 1
+    assert overbooked_authors(email_sets, 2) == ['busy']
@@ -0,0 +1,45 @@
+"""
+Unit tests for joining the author notes sheet to the submissions.
+"""
+import importlib.util
+import os
+
+import pytest
+from pandas import DataFrame
+
+from winlp_scripts.softconf import PAPER_ID, PAPER_TITLE, MC_EMAIL, MC_FIRST, MC_LAST
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'send_author_notes.py')
+
+spec = importlib.util.spec_from_file_location('send_author_notes', SCRIPT)
+send_author_notes = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(send_author_notes)
+merge_notes, NotesException = send_author_notes.merge_notes, send_author_notes.NotesException
+
+SUBMISSIONS = DataFrame({PAPER_ID: ['1', '2', '3'],
+                         PAPER_TITLE: ['Paper 1', 'Paper 2', 'Paper 3'],
+                         MC_EMAIL: ['a@x.org', 'b@x.org', 'c@x.org'],
+                         MC_FIRST: ['A', 'B', 'C'],
+                         MC_LAST: ['Aa', 'Bb', 'Cc']})
+
+def notes(*rows):
+    return DataFrame(list(rows), columns=['ID', 'Title', 'Decision', 'Reviewer', 'Note'])
+
+def test_merge_notes():
+    merged = merge_notes(SUBMISSIONS, notes(['1', 'Paper 1', 'reject', 'R1', 'Sorry'],
+                                            ['2', 'Paper 2', 'accept', 'R2', 'Congratulations'],
+                                            ['3', 'Paper 3', 'accept', 'R3', ''],
+                                            ['', '', '', '', '']))
+    # The blank trailing row and the paper without a note are skipped
+    assert merged['paper_id'].tolist() == [1, 2]
+    assert merged[MC_EMAIL].tolist() == ['a@x.org', 'b@x.org']
+    assert merged['decision_text'].str.contains('not selected').tolist() == [True, False]
+    assert merged['decision_text'].str.contains('accepted').tolist() == [False, True]
+
+def test_merge_notes_problems():
+    with pytest.raises(NotesException, match='not in the submissions: 4'):
+        merge_notes(SUBMISSIONS, notes(['1', 'Paper 1', 'accept', 'R1', 'Note'],
+                                       ['4', 'Paper 4', 'accept', 'R4', 'Note']))
+    with pytest.raises(NotesException, match='more than once: 2'):
+        merge_notes(SUBMISSIONS, notes(['2', 'Paper 2', 'accept', 'R2', 'Note'],
+                                       ['2', 'Paper 2', 'reject', 'R2', 'Other note']))
@@ -0,0 +1,60 @@
+"""
+Unit tests for the shared HTTP session setup, against a local server.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xmlrpc.client import ServerProxy
+from xmlrpc.server import SimpleXMLRPCServer
+
+import pytest
+import requests
+
+from winlp_scripts.sessions import make_session, SessionTransport
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    failures = 2
+
+    def do_GET(self):
+        if self.path == '/slow':
+            threading.Event().wait(1)
+        if self.path == '/flaky' and FlakyHandler.failures:
+            FlakyHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(self.headers.get('Accept-Encoding', '').encode())
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:{}'.format(httpd.server_port)
+    httpd.shutdown()
+
+def test_retries(server):
+    session = make_session({'backoff': 0})
+    response = session.get(server + '/flaky')
+    assert response.status_code == 200
+    assert 'gzip' in response.text
+
+def test_timeout(server):
+    session = make_session({'read_timeout': 0.1, 'retries': 0})
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(server + '/slow')
+
+def test_xmlrpc_transport():
+    rpc = SimpleXMLRPCServer(('127.0.0.1', 0), logRequests=False)
+    rpc.register_function(lambda a, b: a + b, 'add')
+    threading.Thread(target=rpc.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/RPC2'.format(rpc.server_address[1])
+    try:
+        sp = ServerProxy(url, transport=SessionTransport(make_session(), url))
+        assert sp.add(2, 3) == 5
+    finally:
+        rpc.shutdown()
@@ -0,0 +1,41 @@
+"""
+Unit tests for submission similarity.
+"""
+import numpy as np
+from pandas import DataFrame
+
+from winlp_scripts.similarity import SimilarityIndex, tokenize
+from winlp_scripts.softconf import PAPER_ID, PAPER_TITLE, PAPER_ABSTRACT
+
+SUBMISSIONS = DataFrame({
+    PAPER_ID: [11, 12, 13, 14],
+    PAPER_TITLE: ['Neural machine translation', 'Low-resource machine translation',
+                  'Gender bias in word embeddings', 'Debiasing word embeddings'],
+    PAPER_ABSTRACT: ['We translate text with neural networks.',
+                     'Translation for low-resource languages with neural networks.',
+                     'We measure gender bias in embeddings.',
+                     None]})
+
+def test_tokenize():
+    assert tokenize('The Machine translation', ngrams=2) == ['machine', 'translation', 'machine translation']
+
+def test_top_k(tmp_path):
+    index = SimilarityIndex.from_submissions(SUBMISSIONS)
+    neighbors, scores = index.top_k(k=1, block_size=3)
+    assert neighbors[:, 0].tolist() == [1, 0, 3, 2]
+    assert np.all(scores > 0)
+
+    assert np.isclose(index.score(11, 11), 1)
+    assert index.score(11, 12) > index.score(11, 13)
+    assert np.allclose(index.pair_scores([0, 2], [1, 3]),
+                       index.similarity_matrix()[[0, 2], [1, 3]])
+
+    top = index.top_k_matrix(k=1)
+    assert top.nnz == 4
+    assert np.allclose(top[[0, 1, 2, 3], [1, 0, 3, 2]], scores[:, 0])
+
+def test_cache(tmp_path):
+    cache_path = str(tmp_path / 'tfidf.npz')
+    index = SimilarityIndex.from_submissions(SUBMISSIONS, cache_path=cache_path)
+    cached = SimilarityIndex.from_submissions(SUBMISSIONS, cache_path=cache_path)
+    assert (index.matrix != cached.matrix).nnz == 0
@@ -1,33 +1,43 @@
 """
-Unit tests for the softconf interface.
+Unit tests for the softconf interface, against the fake services.
 """
-
-
-# -------------------------------------------
-# Load the config file and softconf setup
-# info.
-# -------------------------------------------
-from pytest_testconfig import config
 import pytest
-from winlp_scripts.softconf import SoftconfConnection, FailedLogin
 from pandas import DataFrame
 
-def test_login_succeeds():
-    user = config['softconf']['user']
-    pw = config['softconf']['pass']
-    url_base = config['softconf']['url_base']
-    scc = SoftconfConnection(user, pw, url_base)
-    assert scc is not None
-    return scc
+from winlp_scripts.softconf import SoftconfConnection, FailedLogin, PAPER_ID, MC_EMAIL, PAPER_TITLE, \
+    parse_submission_page
 
-scc = test_login_succeeds()
+@pytest.fixture
+def scc(fake_config):
+    return SoftconfConnection.from_conf(fake_config)
+
+def test_login_succeeds(scc):
+    assert scc is not None
 
-def test_submissions():
+def test_submissions(scc, fake_data):
     submission_info = scc.submission_information()
-    print(submission_info.keys())
-    # assert isinstance(submission_info, DataFrame)
+    assert isinstance(submission_info, DataFrame)
+    assert len(submission_info) == len(fake_data.submissions)
+    assert list(submission_info[PAPER_ID]) == list(fake_data.submissions[PAPER_ID])
+    assert list(submission_info[MC_EMAIL]) == list(fake_data.submissions[MC_EMAIL])
+
+def test_submissions_keys(scc, fake_data):
+    submission_info = scc.submission_information(keys=[PAPER_ID, PAPER_TITLE])
+    assert list(submission_info.columns) == [PAPER_ID, PAPER_TITLE]
+    assert submission_info[PAPER_TITLE][0] == fake_data.submissions[PAPER_TITLE][0]
+
+def test_reviews(scc, fake_data):
+    reviews = scc.reviews()
+    assert len(reviews) == len(fake_data.reviews)
+
+def test_retrieve_pdf(scc):
+    assert scc.retrieve_pdf(3).startswith(b'%PDF')
+
+def test_submission_page(scc):
+    page = parse_submission_page(scc.download_submission_page())
+    assert page['title'] == 'Submission Information'
+    assert page['items']
 
-def test_failed_login():
-    url_base = config['softconf']['url_base']
+def test_failed_login(fake_config):
     with pytest.raises(FailedLogin):
-        scc = SoftconfConnection('none', 'none', url_base)
+        SoftconfConnection('none', 'none', fake_config['softconf']['url_base'])
@@ -0,0 +1,57 @@
+"""
+Unit tests for parsing softconf pages (these don't need a login).
+"""
+from winlp_scripts.softconf import parse_submission_page, convert_submission_page_to_text
+
+SUBMISSION_PAGE = '''
+<html><head><title>Submission Page Editor</title></head><body>
+<input type="text" id="currentpage_newname" value="Submission Information">
+<div id="theitems">
+  <div class="portlet ui-widget">
+    <div class="portlet-header"><table><tr><td> TextBox 1 </td><td>x</td></tr></table></div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Text 2</td></tr></table></div>
+    <div class="portlet-content"><textarea>Please read the &lt;b&gt;guidelines&lt;/b&gt;.</textarea></div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Line 3</td></tr></table></div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Selector 4</td></tr></table></div>
+    <div class="portlet-content">
+      <input type="text" value="Submission type">
+      <textarea>Pick one</textarea>
+      <textarea>Long paper
+Short paper</textarea>
+    </div>
+  </div>
+  <div class="portlet">
+    <div class="portlet-header"><table><tr><td>Abstract</td></tr></table></div>
+    <div class="portlet-content"><table>
+      <tr><td>Field Title:</td><td><input type="text" value="Your abstract"></td></tr>
+      <tr><td>Field Description:</td><td><textarea>At most 200 words.</textarea></td></tr>
+    </table></div>
+  </div>
+</div>
+</body></html>
+'''
+
+def test_parse_submission_page():
+    page = parse_submission_page(SUBMISSION_PAGE)
+    assert page['title'] == 'Submission Information'
+    assert [(item['type'], item['name']) for item in page['items']] == [
+        ('TextBox', 'TextBox 1'), ('Text', 'Text 2'), ('Line', 'Line 3'),
+        ('Selector', 'Selector 4'), ('Field', 'Abstract')]
+    assert page['items'][1]['description'] == 'Please read the <b>guidelines</b>.'
+    assert page['items'][3]['title'] == 'Submission type'
+    assert page['items'][3]['options'] == ['Long paper', 'Short paper']
+    assert page['items'][4]['title'] == 'Your abstract'
+    assert page['items'][4]['description'] == 'At most 200 words.'
+
+def test_convert_submission_page_to_text(capsys):
+    convert_submission_page_to_text(SUBMISSION_PAGE)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == ['TextBox 1', 'Please read the <b>guidelines</b>.', '-'*80,
+                     'Submission type', ' - Long paper', ' - Short paper',
+                     'Abstract', 'Your abstract At most 200 words.']
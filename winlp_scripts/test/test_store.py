@@ -0,0 +1,78 @@
+"""
+Unit tests for the local SQLite store.
+"""
+import os
+
+import pytest
+from pandas import DataFrame
+
+from winlp_scripts.fake_services import synthetic
+from winlp_scripts.softconf import PAPER_ID, MC_EMAIL, ALL_EMAILS, PAPER_TITLE, REVIEWER_EMAIL
+from winlp_scripts.store import Store, StoreException
+from winlp_scripts.utils import load_yml, col_letter
+
+BUDGET_MAPPING = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'budget_mapping.yml')
+
+def test_submissions(tmp_path):
+    submissions = synthetic.submissions(30, text_size=5)
+    path = str(tmp_path / 'store.db')
+    with Store(path) as store:
+        assert not store.has('submissions')
+        assert store.ingest_submissions(submissions) == 30
+        assert store.sources()['submissions']['rows'] == 30
+
+    # Kept on disk between runs
+    with Store(path) as store:
+        stored = store.submissions()
+        assert list(stored[PAPER_ID]) == sorted(submissions[PAPER_ID])
+        assert list(stored.columns) == list(submissions.columns)
+
+        first = submissions.iloc[0]
+        assert store.submission(first[PAPER_ID])[PAPER_TITLE] == first[PAPER_TITLE]
+        assert store.submission(-1) is None
+        assert first[PAPER_ID] in store.papers_for_email(first[MC_EMAIL].upper())
+
+def test_authors():
+    submissions = DataFrame({PAPER_ID: [1, 2, 3],
+                             MC_EMAIL: ['a@x.org', 'b@x.org', 'c@x.org'],
+                             ALL_EMAILS: ['a@x.org; shared@x.org', None, 'Shared@x.org']})
+    store = Store()
+    store.ingest_submissions(submissions)
+    assert store.papers_for_email('shared@x.org') == [1, 3]
+    assert store.papers_for_email('b@x.org') == [2]
+    assert list(store.query('SELECT paper_id FROM submissions WHERE email = ?', ('c@x.org',))['paper_id']) == [3]
+
+    # Ingesting again replaces the submissions
+    store.ingest_submissions(submissions.iloc[:1])
+    assert store.papers_for_email('shared@x.org') == [1]
+
+def test_duplicate_ids():
+    with pytest.raises(StoreException):
+        Store().ingest_submissions(DataFrame({PAPER_ID: [1, 1], MC_EMAIL: ['a@x.org', 'b@x.org']}))
+
+def test_reviews():
+    reviews = synthetic.reviews(synthetic.submissions(10, text_size=5), per_paper=3, text_size=5)
+    store = Store()
+    assert store.ingest_reviews(reviews) == len(reviews)
+    paper_id = reviews[PAPER_ID].iloc[0]
+    assert list(store.reviews_for_paper(paper_id)[REVIEWER_EMAIL]) == \
+        list(reviews[reviews[PAPER_ID] == paper_id][REVIEWER_EMAIL])
+
+def test_responses_and_budget():
+    responses = synthetic.survey_responses(10)
+    mapping = load_yml(BUDGET_MAPPING)
+    budget = synthetic.budget_sheet(mapping, 10)[1:]
+
+    store = Store()
+    store.ingest_responses(1, responses)
+    store.ingest_responses(2, responses.iloc[:2])
+    store.ingest_budget(budget, mapping)
+
+    email = responses['email'].iloc[0]
+    assert list(store.responses_for_email(email)['id']) == [1, 1]
+    assert list(store.responses_for_email(email, survey_id=2)['id']) == [1]
+    assert len(store.responses(1)) == 10
+
+    row = store.budget_for_email(budget[0][col_letter(mapping['email'])])[0]
+    assert row['name'] == budget[0][0]
+    assert set(store.sources()) == {'responses:1', 'responses:2', 'budget'}
@@ -0,0 +1,59 @@
+"""
+Unit tests for skipping letters that are already up to date.
+"""
+import os
+import shutil
+
+from docx import Document
+
+from winlp_scripts.template import RenderManifest, render_docx
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'email_templates',
+                        'WiNLP Travel Grant Letter.docx')
+
+def letter_keys(amounts, date='01 Jul 2020'):
+    return {'Recipient {}'.format(i): {'name': 'Recipient {}'.format(i), 'paper_title': 'Paper {}'.format(i),
+                                       'date': date, 'amount': amount, 'text_amount': 'some dollars'}
+            for i, amount in enumerate(amounts)}
+
+def render_all(template, output_dir, letters) -> int:
+    manifest = RenderManifest(output_dir)
+    rendered = sum(render_docx(template, keys, os.path.join(output_dir, '{}.docx'.format(name)), manifest)
+                   for name, keys in letters.items())
+    manifest.save()
+    return rendered
+
+def test_render_changed_only(tmp_path):
+    template = str(tmp_path / 'template.docx')
+    shutil.copy(TEMPLATE, template)
+    output_dir = str(tmp_path / 'letters')
+    os.makedirs(output_dir)
+
+    assert render_all(template, output_dir, letter_keys(['100.00', '200.00', '300.00'])) == 3
+    assert render_all(template, output_dir, letter_keys(['100.00', '200.00', '300.00'])) == 0
+
+    # One changed amount
+    assert render_all(template, output_dir, letter_keys(['100.00', '250.00', '300.00'])) == 1
+    assert 'Recipient 1' in '\n'.join(p.text for p in Document(os.path.join(output_dir, 'Recipient 1.docx')).paragraphs)
+
+    # The date alone doesn't count
+    assert render_all(template, output_dir, letter_keys(['100.00', '250.00', '300.00'], date='02 Jul 2020')) == 0
+
+    # A deleted letter is rendered again
+    os.remove(os.path.join(output_dir, 'Recipient 0.docx'))
+    assert render_all(template, output_dir, letter_keys(['100.00', '250.00', '300.00'])) == 1
+
+    # As is every letter when the template changes, even if
+    # its modification time is kept (as by "cp -p")
+    st = os.stat(template)
+    doc = Document(template)
+    doc.add_paragraph('P.S.')
+    doc.save(template)
+    os.utime(template, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert render_all(template, output_dir, letter_keys(['100.00', '250.00', '300.00'])) == 3
+
+def test_no_manifest(tmp_path):
+    path = str(tmp_path / 'letter.docx')
+    keys = letter_keys(['100.00'])['Recipient 0']
+    assert render_docx(TEMPLATE, keys, path)
+    assert render_docx(TEMPLATE, keys, path)
@@ -0,0 +1,28 @@
+"""
+Unit tests for the general-purpose utilities.
+"""
+import zipfile
+
+from winlp_scripts.utils import mmap_zip
+
+
+def test_mmap_zip(tmp_path):
+    zip_path = tmp_path / 'attachments.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zip_f:
+        zip_f.writestr('00001_receipt.pdf', b'%PDF receipt')
+
+    with mmap_zip(str(zip_path)) as zip:
+        assert zip.namelist() == ['00001_receipt.pdf']
+        zip.extract('00001_receipt.pdf', str(tmp_path / 'out'))
+        assert (tmp_path / 'out' / '00001_receipt.pdf').read_bytes() == b'%PDF receipt'
+    # Closing the zip unmaps the file
+    assert zip._mm_file.closed
+
+def test_mmap_zip_invalid(tmp_path):
+    empty_path = tmp_path / 'empty.zip'
+    empty_path.write_bytes(b'')
+    assert mmap_zip(str(empty_path)) is None
+
+    bad_path = tmp_path / 'bad.zip'
+    bad_path.write_bytes(b'not a zip')
+    assert mmap_zip(str(bad_path)) is None
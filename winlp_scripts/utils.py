@@ -1,6 +1,9 @@
+import io
 import math
+import mmap
 import re
 from string import ascii_lowercase
+from zipfile import ZipFile, BadZipFile
 from xlrd.sheet import Cell, Sheet
 from typing import Tuple, List, Generator, Union
 
@@ -62,4 +65,79 @@ def load_yml(yml_path) -> dict:
     """
     import yaml
     with open(yml_path) as yml_f:
-        return yaml.load(yml_f, Loader=yaml.FullLoader)
\ No newline at end of file
+        return yaml.load(yml_f, Loader=yaml.FullLoader)
+
+class MmapFile(io.RawIOBase):
+    """
+    Minimal read-only, seekable file object over a memory map,
+    since `mmap` objects themselves don't implement the full
+    file interface `ZipFile` expects.
+    """
+    def __init__(self, mm: mmap.mmap):
+        self._mm = mm
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._mm.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._mm.tell()
+        elif whence == io.SEEK_END:
+            offset += len(self._mm)
+        if offset < 0:
+            raise OSError('Negative seek position {}'.format(offset))
+        self._mm.seek(min(offset, len(self._mm)))
+        return self._mm.tell()
+
+    def tell(self):
+        return self._mm.tell()
+
+    def close(self):
+        if not self.closed:
+            self._mm.close()
+        super().close()
+
+class MmapZipFile(ZipFile):
+    """
+    A `ZipFile` over an `MmapFile`, which (unlike a `ZipFile` given
+    any other file object) unmaps it when the archive is closed.
+    """
+    def __init__(self, mm_file: MmapFile):
+        self._mm_file = mm_file
+        super().__init__(mm_file)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._mm_file.close()
+
+def mmap_zip(zip_path: str):
+    """
+    Open the zipfile at `zip_path` through a read-only memory map,
+    so that members are paged in from disk as they are read instead
+    of the whole archive being loaded into memory.
+
+    Returns None if the file is empty or not a valid zip. The zip
+    should be closed (or used with `with`) to release the map.
+    """
+    with open(zip_path, 'rb') as zip_f:
+        try:
+            mm = mmap.mmap(zip_f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped.
+            return None
+    mm_file = MmapFile(mm)
+    try:
+        return MmapZipFile(mm_file)
+    except BadZipFile:
+        mm_file.close()
+        return None